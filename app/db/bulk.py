@@ -0,0 +1,71 @@
+import io
+import json
+from datetime import date, datetime, time
+
+
+# значения для COPY ... FROM STDIN WITH (FORMAT csv):
+# NULL — пустое поле без кавычек, всё остальное — в кавычках,
+# чтобы пустая строка не превращалась в NULL;
+# dict и список не для колонки-массива — JSON (json / jsonb)
+
+def _array_literal(items) -> str:
+    parts = []
+    for x in items:
+        if x is None:
+            parts.append("NULL")
+            continue
+        if isinstance(x, (list, tuple)):
+            # многомерный массив: {{...},{...}} без кавычек вокруг подмассивов
+            parts.append(_array_literal(x))
+            continue
+        text = _plain_text(x, array=True).replace("\\", "\\\\").replace('"', '\\"')
+        parts.append(f'"{text}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _json_text(value) -> str:
+    # Decimal, даты и т.п. внутри JSON — строкой
+    return json.dumps(value, ensure_ascii=False, default=str)
+
+
+def _plain_text(value, array: bool = False) -> str:
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, dict):
+        return _json_text(value)
+    if isinstance(value, (list, tuple)):
+        return _array_literal(value) if array else _json_text(value)
+    return str(value)
+
+
+def copy_field(value, array: bool = False) -> str:
+    """Поле CSV для COPY; array — колонка-массив (список -> '{...}', иначе JSON)."""
+    if value is None:
+        return ""
+    text = _plain_text(value, array).replace('"', '""')
+    return f'"{text}"'
+
+
+def rows_to_csv(rows, columns: list[str], array_columns=()) -> io.StringIO:
+    """Пачка словарей -> CSV-буфер для copy_expert()."""
+    arrays = [c in array_columns for c in columns]
+    buf = io.StringIO()
+    for row in rows:
+        buf.write(",".join(copy_field(row.get(c), a) for c, a in zip(columns, arrays)))
+        buf.write("\n")
+    buf.seek(0)
+    return buf
+
+
+def chunks(rows, size: int):
+    """Разбить последовательность строк на пачки по size."""
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
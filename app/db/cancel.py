@@ -0,0 +1,39 @@
+import threading
+
+
+class QueryCancelled(Exception):
+    """Запрос отменён пользователем до того, как взял соединение."""
+
+
+class CancelToken:
+    """Отмена запросов, запущенных внутри with db.cancellable(token).
+
+    Database.lease() регистрирует в токене каждое выданное соединение,
+    cancel() отправляет серверу отмену текущего запроса на всех них.
+    """
+
+    def __init__(self):
+        self.cancelled = False
+        self._lock = threading.Lock()
+        self._conns = []
+
+    def cancel(self):
+        with self._lock:
+            self.cancelled = True
+            conns = list(self._conns)
+        for conn in conns:
+            try:
+                conn.cancel()
+            except Exception:
+                pass
+
+    def attach(self, conn):
+        with self._lock:
+            if self.cancelled:
+                raise QueryCancelled("запрос отменён")
+            self._conns.append(conn)
+
+    def detach(self, conn):
+        with self._lock:
+            if conn in self._conns:
+                self._conns.remove(conn)
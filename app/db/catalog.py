@@ -0,0 +1,282 @@
+import threading
+
+from app.log.log import app_logger
+
+
+# все колонки всех отношений схемы public (+ значения enum) одним запросом;
+# data_type вычисляется так же, как в information_schema.columns
+_COLUMNS_Q = """
+    SELECT
+        c.relname AS table_name,
+        c.relkind,
+        a.attnum AS ordinal_position,
+        a.attname AS column_name,
+        CASE
+            WHEN bt.typelem <> 0 AND bt.typlen = -1 THEN 'ARRAY'
+            WHEN bn.nspname = 'pg_catalog' THEN pg_catalog.format_type(bt.oid, NULL)
+            ELSE 'USER-DEFINED'
+        END AS data_type,
+        pg_catalog.format_type(a.atttypid, a.atttypmod) AS full_type,
+        CASE WHEN a.attnotnull THEN 'NO' ELSE 'YES' END AS is_nullable,
+        pg_catalog.pg_get_expr(d.adbin, d.adrelid) AS column_default,
+        t.typname AS udt_name,
+        CASE
+            WHEN bt.typname IN ('varchar', 'bpchar') AND a.atttypmod > 4
+            THEN a.atttypmod - 4
+        END AS character_maximum_length,
+        ev.labels AS enum_values
+    FROM pg_catalog.pg_class c
+    JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+    LEFT JOIN pg_catalog.pg_attribute a
+           ON a.attrelid = c.oid AND a.attnum > 0 AND NOT a.attisdropped
+    LEFT JOIN pg_catalog.pg_attrdef d
+           ON d.adrelid = c.oid AND d.adnum = a.attnum
+    LEFT JOIN pg_catalog.pg_type t ON t.oid = a.atttypid
+    LEFT JOIN pg_catalog.pg_type bt
+           ON bt.oid = CASE WHEN t.typtype = 'd' THEN t.typbasetype ELSE t.oid END
+    LEFT JOIN pg_catalog.pg_namespace bn ON bn.oid = bt.typnamespace
+    LEFT JOIN (
+        SELECT enumtypid, array_agg(enumlabel ORDER BY enumsortorder) AS labels
+        FROM pg_catalog.pg_enum
+        GROUP BY enumtypid
+    ) ev ON ev.enumtypid = t.oid
+    WHERE n.nspname = 'public'
+      AND c.relkind IN ('r', 'p', 'v', 'm', 'f')
+      -- секции видны через родительскую таблицу
+      AND NOT c.relispartition
+    ORDER BY c.relname, a.attnum;
+"""
+
+# PK / UNIQUE / FK / CHECK всех таблиц схемы public
+_CONSTRAINTS_Q = """
+    SELECT
+        con.conname AS constraint_name,
+        con.contype,
+        c.relname AS table_name,
+        ARRAY(
+            SELECT att.attname
+            FROM unnest(con.conkey) WITH ORDINALITY k(attnum, ord)
+            JOIN pg_catalog.pg_attribute att
+              ON att.attrelid = con.conrelid AND att.attnum = k.attnum
+            ORDER BY k.ord
+        ) AS columns,
+        rc.relname AS ref_table,
+        ARRAY(
+            SELECT att.attname
+            FROM unnest(con.confkey) WITH ORDINALITY k(attnum, ord)
+            JOIN pg_catalog.pg_attribute att
+              ON att.attrelid = con.confrelid AND att.attnum = k.attnum
+            ORDER BY k.ord
+        ) AS ref_columns,
+        pg_catalog.pg_get_expr(con.conbin, con.conrelid) AS check_clause,
+        pg_catalog.pg_get_constraintdef(con.oid) AS definition
+    FROM pg_catalog.pg_constraint con
+    JOIN pg_catalog.pg_class c ON c.oid = con.conrelid
+    JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+    LEFT JOIN pg_catalog.pg_class rc ON rc.oid = con.confrelid
+    WHERE n.nspname = 'public'
+      AND con.contype IN ('p', 'u', 'f', 'c')
+    ORDER BY c.relname, con.conname;
+"""
+
+# индексы таблиц схемы public: ключевые колонки (NULL — выражение) и классы операторов
+_INDEXES_Q = """
+    SELECT
+        c.relname AS table_name,
+        i.relname AS index_name,
+        am.amname AS method,
+        x.indisunique AS is_unique,
+        x.indisvalid AS is_valid,
+        x.indpred IS NOT NULL AS is_partial,
+        ARRAY(
+            SELECT att.attname
+            FROM unnest(x.indkey::int2[]) WITH ORDINALITY k(attnum, ord)
+            LEFT JOIN pg_catalog.pg_attribute att
+              ON att.attrelid = x.indrelid AND att.attnum = k.attnum
+            WHERE k.ord <= x.indnkeyatts
+            ORDER BY k.ord
+        ) AS columns,
+        ARRAY(
+            SELECT oc.opcname
+            FROM unnest(x.indclass::oid[]) WITH ORDINALITY k(opc, ord)
+            JOIN pg_catalog.pg_opclass oc ON oc.oid = k.opc
+            ORDER BY k.ord
+        ) AS opclasses,
+        pg_catalog.pg_get_indexdef(x.indexrelid) AS definition
+    FROM pg_catalog.pg_index x
+    JOIN pg_catalog.pg_class c ON c.oid = x.indrelid
+    JOIN pg_catalog.pg_class i ON i.oid = x.indexrelid
+    JOIN pg_catalog.pg_am am ON am.oid = i.relam
+    JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+    WHERE n.nspname = 'public'
+    ORDER BY c.relname, i.relname;
+"""
+
+# классы операторов pg_trgm: такие индексы ускоряют LIKE / ILIKE '%..%', % и similarity
+TRGM_OPCLASSES = ("gin_trgm_ops", "gist_trgm_ops")
+
+# системные enum-ы (вне public) тоже нужны get_enum_labels()
+_ENUMS_Q = """
+    SELECT t.typname, array_agg(e.enumlabel ORDER BY e.enumsortorder) AS labels
+    FROM pg_catalog.pg_type t
+    JOIN pg_catalog.pg_enum e ON e.enumtypid = t.oid
+    GROUP BY t.typname;
+"""
+
+
+class SchemaCatalog:
+    """Кэш метаданных схемы public: таблицы, колонки, типы, enum-ы, ограничения, индексы.
+
+    Загружается лениво несколькими запросами к pg_catalog и дальше отдаёт всё
+    из памяти. Database.invalidate_catalog() сбрасывает кэш после любого DDL.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self._lock = threading.RLock()
+        self._loaded = False
+
+        self._relkinds: dict[str, str] = {}  # имя -> relkind
+        self._columns: dict[str, list[dict]] = {}  # имя -> колонки
+        self._constraints: dict[str, list[dict]] = {}  # имя таблицы -> ограничения
+        self._enums: dict[str, list[str]] = {}  # имя типа -> значения
+        self._indexes: dict[str, list[dict]] = {}  # имя таблицы -> индексы
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded = False
+
+    def _ensure_loaded(self):
+        with self._lock:
+            if self._loaded:
+                return
+
+            with self.db.read_cursor() as cur:
+                cur.execute(_COLUMNS_Q)
+                col_rows = cur.fetchall()
+                cur.execute(_CONSTRAINTS_Q)
+                con_rows = cur.fetchall()
+                cur.execute(_INDEXES_Q)
+                idx_rows = cur.fetchall()
+                cur.execute(_ENUMS_Q)
+                enum_rows = cur.fetchall()
+
+            relkinds: dict[str, str] = {}
+            columns: dict[str, list[dict]] = {}
+            for r in col_rows:
+                name = r.pop("table_name")
+                relkinds[name] = r.pop("relkind")
+                columns.setdefault(name, [])
+                if r["column_name"] is None:
+                    continue
+                if r["enum_values"] is not None:
+                    r["enum_values"] = list(r["enum_values"])
+                columns[name].append(r)
+
+            constraints: dict[str, list[dict]] = {}
+            for r in con_rows:
+                r["columns"] = list(r["columns"] or [])
+                r["ref_columns"] = list(r["ref_columns"] or [])
+                constraints.setdefault(r["table_name"], []).append(r)
+
+            indexes: dict[str, list[dict]] = {}
+            for r in idx_rows:
+                r["columns"] = list(r["columns"] or [])
+                r["opclasses"] = list(r["opclasses"] or [])
+                indexes.setdefault(r["table_name"], []).append(r)
+
+            self._relkinds = relkinds
+            self._columns = columns
+            self._constraints = constraints
+            self._indexes = indexes
+            self._enums = {r["typname"]: list(r["labels"]) for r in enum_rows}
+            self._loaded = True
+
+            app_logger.info(
+                f"schema catalog loaded: {len(relkinds)} relations, "
+                f"{sum(len(c) for c in columns.values())} columns"
+            )
+
+    # отношения
+    def _names(self, kinds) -> list[str]:
+        self._ensure_loaded()
+        return sorted(n for n, k in self._relkinds.items() if k in kinds)
+
+    def tables(self) -> list[str]:
+        """Как information_schema.tables: таблицы и обычные представления."""
+        return self._names(("r", "p", "v", "f"))
+
+    def base_tables(self) -> list[str]:
+        return self._names(("r", "p"))
+
+    def views(self) -> list[str]:
+        return self._names(("v",))
+
+    def mat_views(self) -> list[str]:
+        return self._names(("m",))
+
+    def relkind(self, name: str) -> str | None:
+        self._ensure_loaded()
+        return self._relkinds.get(name)
+
+    # колонки
+    def columns(self, table: str) -> list[dict]:
+        """Колонки в формате information_schema.columns (+ enum_values, full_type)."""
+        self._ensure_loaded()
+        return [dict(c) for c in self._columns.get(table, [])]
+
+    def column_names(self, table: str) -> list[str]:
+        self._ensure_loaded()
+        return [c["column_name"] for c in self._columns.get(table, [])]
+
+    def column_type(self, table: str, column: str) -> str | None:
+        self._ensure_loaded()
+        for c in self._columns.get(table, []):
+            if c["column_name"] == column:
+                return c["data_type"]
+        return None
+
+    def column_types(self, table: str) -> dict[str, str]:
+        self._ensure_loaded()
+        return {c["column_name"]: c["data_type"] for c in self._columns.get(table, [])}
+
+    # типы
+    def enum_values(self, type_name: str) -> list[str] | None:
+        self._ensure_loaded()
+        labels = self._enums.get(type_name)
+        return list(labels) if labels is not None else None
+
+    # ограничения
+    def constraints(self, table: str, kinds=("p", "u", "f", "c")) -> list[dict]:
+        self._ensure_loaded()
+        return [dict(c) for c in self._constraints.get(table, []) if c["contype"] in kinds]
+
+    def foreign_keys(self, table: str) -> list[dict]:
+        """Пары column -> ref_table.ref_column, как раньше отдавал get_foreign_keys()."""
+        res = []
+        for con in self.constraints(table, ("f",)):
+            for col, ref_col in zip(con["columns"], con["ref_columns"]):
+                res.append({
+                    "constraint_name": con["constraint_name"],
+                    "column": col,
+                    "ref_table": con["ref_table"],
+                    "ref_column": ref_col,
+                })
+        return res
+
+    # индексы
+    def indexes(self, table: str) -> list[dict]:
+        """Индексы таблицы: index_name, method, columns, opclasses, is_valid и т.д."""
+        self._ensure_loaded()
+        return [dict(i) for i in self._indexes.get(table, [])]
+
+    def has_trgm_index(self, table: str, column: str) -> bool:
+        """Есть ли рабочий триграммный индекс (gin / gist_trgm_ops) по колонке."""
+        self._ensure_loaded()
+        for idx in self._indexes.get(table, []):
+            if not idx["is_valid"] or idx["is_partial"] or column not in idx["columns"]:
+                continue
+            pos = idx["columns"].index(column)
+            if pos < len(idx["opclasses"]) and idx["opclasses"][pos] in TRGM_OPCLASSES:
+                return True
+        return False
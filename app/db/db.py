@@ -1,13 +1,45 @@
 import psycopg2
 import psycopg2.extras
-from psycopg2 import sql
+from psycopg2 import errors, sql
 from contextlib import contextmanager
+import json
+import re
+import threading
 from app.log.log import app_logger
+from app.db.bulk import chunks, rows_to_csv
+from app.db.cancel import CancelToken
+from app.db.catalog import SchemaCatalog
+from app.db.front_desk import FrontDeskIndex
+from app.db.incremental import IncrementalViews
+from app.db.index_advisor import IndexAdvisor
+from app.db.metrics import QueryMetrics
+from app.db.partitions import StaysPartitions
+from app.db.listener import ALL_TABLES, ChangeDispatcher, ChangeListener
+from app.db.pool import ConnectionPool
+from app.db.refresh_scheduler import RefreshScheduler
+from app.db.result_cache import ANY_TABLE, ResultCache, normalize_sql
+from app.db.stream import RowStream
 from dotenv import load_dotenv, find_dotenv
 import os
 
 
 
+# сводка по дням (rollup.sql): её меняют триггеры на этих таблицах
+ROLLUP_TABLE = "daily_room_stats"
+ROLLUP_SOURCES = ("stays", "rooms")
+
+# подпись строки при выборе внешнего ключа (EnterDataDialog, search_reference)
+REFERENCE_LABELS = {
+    "clients": "last_name || ' ' || first_name || ', ' || passport",
+    "rooms": "room_number::text || ' (' || comfort::text || ')'",
+}
+
+# колонки поиска гостей: триграммные индексы для text_search() и поиска DataWindow
+SEARCH_COLUMNS = {
+    "clients": ("last_name", "first_name", "patronymic", "passport"),
+}
+
+
 class Database:
     def __init__(self):
         load_dotenv(find_dotenv())
@@ -20,118 +52,405 @@ class Database:
             "dbname": os.getenv("DB_NAME"),
         } # данные
 
-        self.conn = None
+        # размеры пула соединений
+        self.pool_min = int(os.getenv("DB_POOL_MIN", "1"))
+        self.pool_max = int(os.getenv("DB_POOL_MAX", "5"))
+        self.pool_timeout = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+
+        # сколько DDL ждёт блокировку таблицы, мс (0 — без ограничения)
+        self.ddl_lock_timeout_ms = int(os.getenv("DB_DDL_LOCK_TIMEOUT_MS", "5000"))
+
+        self.pool: ConnectionPool | None = None
+
+        # открытая transaction() и CancelToken текущего потока
+        self._local = threading.local()
+
+        # недочитанные RowStream: держат транзакцию и блокировки своих таблиц
+        self._streams: set[RowStream] = set()
+        self._streams_lock = threading.Lock()
+
+        # кэш метаданных схемы, сбрасывается после DDL
+        self.catalog = SchemaCatalog(self)
+
+        # кэш результатов SELECT: размер в МБ и как часто сверяться с сервером
+        self.cache = ResultCache(
+            max_bytes=int(float(os.getenv("DB_CACHE_MB", "64")) * 1024 * 1024),
+            check_after=float(os.getenv("DB_CACHE_CHECK_SEC", "5")),
+        )
+
+        # замеры запросов; медленнее DB_SLOW_MS — в журнал медленных запросов
+        self.metrics = QueryMetrics(slow_ms=float(os.getenv("DB_SLOW_MS", "500")))
+
+        # какие колонки фильтруют / сортируют окна — для советника индексов
+        self.index_advisor = IndexAdvisor(self)
+
+        # агрегатные представления с обновлением по журналу изменений
+        self.incremental = IncrementalViews(self)
+
+        # автообновление MATERIALIZED VIEW по политикам; 0 — без фонового потока
+        self.mv_scheduler = RefreshScheduler(
+            self, poll_interval=float(os.getenv("DB_REFRESH_POLL_SEC", "30"))
+        )
+
+        # секционирование stays по check_in; сколько периодов держать созданными наперёд
+        self.partitions = StaysPartitions(self)
+        self.partitions_ahead = int(os.getenv("DB_PARTITIONS_AHEAD", "3"))
+
+        # гости и номера в памяти для быстрого поиска в главном окне; 0 — выключить
+        self.front_desk_enabled = os.getenv("DB_FRONT_DESK", "1") != "0"
+        self.front_desk = FrontDeskIndex(
+            self, poll_interval=float(os.getenv("DB_FRONT_DESK_POLL_SEC", "60"))
+        )
+
+        # изменения таблиц с других рабочих мест (LISTEN/NOTIFY, см. notify.sql)
+        self.live_refresh = os.getenv("DB_LIVE_REFRESH", "1") != "0"
+        self.changes = ChangeDispatcher()
+        self.changes.subscribe(self._on_table_change)
+        self._listener: ChangeListener | None = None
 
     # подключение
     def connect(self):
         try:
-            self.conn = psycopg2.connect(**self.conn_params)
-            self.conn.autocommit = False
-            app_logger.info("DB connected")
+            self.pool = ConnectionPool(
+                self.conn_params,
+                minconn=self.pool_min,
+                maxconn=self.pool_max,
+                timeout=self.pool_timeout,
+            )
+            app_logger.info(f"DB connected (pool {self.pool_min}..{self.pool_max})")
+            if self.live_refresh and self._listener is None:
+                self._listener = ChangeListener(self.conn_params, self.changes)
+                self._listener.start()
+            self.mv_scheduler.start()
+            if self.front_desk_enabled:
+                self.front_desk.start()
         except Exception as e:
             app_logger.error(f"connection error: {e}")
             raise
 
+        # секции на ближайшие периоды, чтобы новые заезды не копились в stays_default
+        try:
+            self.partitions.ensure_future(self.partitions_ahead)
+        except Exception as e:
+            app_logger.error(f"stays partitions: {e}")
+
     # закрыть подключение
     def close(self):
-        if self.conn:
-            self.conn.close()
+        self.metrics.log_summary()
+        self.mv_scheduler.stop()
+        self.front_desk.stop()
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+        if self.pool:
+            self.pool.closeall()
+            self.pool = None
             app_logger.info("DB closed")
 
+    # взять соединение из пула на время блока with
+    @contextmanager
+    def lease(self):
+        if self.pool is None:
+            self.connect()
+        token = getattr(self._local, "token", None)
+        with self.pool.lease() as conn:
+            if token is None:
+                yield conn
+                return
+            token.attach(conn)
+            try:
+                yield conn
+            finally:
+                token.detach(conn)
+
+    # запросы внутри блока можно отменить через token.cancel()
+    @contextmanager
+    def cancellable(self, token: CancelToken):
+        prev = getattr(self._local, "token", None)
+        self._local.token = token
+        try:
+            yield token
+        finally:
+            self._local.token = prev
+
+    # статистика пула для мониторинга
+    def pool_stats(self) -> dict:
+        if self.pool is None:
+            return {}
+        return self.pool.stats()
+
     # список таблиц
     def get_tables(self):
-        q = """
-            SELECT table_name
-            FROM information_schema.tables
-            WHERE table_schema = 'public'
-            ORDER BY table_name;
-        """
-        with self.cursor() as cur:
-            cur.execute(q)
-            return [r["table_name"] for r in cur.fetchall()]
+        return self.catalog.tables()
 
-    # список полей таблицы
+    # список полей таблицы (с enum значениями)
     def get_table_columns(self, table_name: str):
-        q = """
-            SELECT 
-                column_name,
-                data_type,
-                is_nullable,
-                column_default,
-                udt_name,
-                character_maximum_length
-            FROM information_schema.columns
-            WHERE table_name = %s
-            ORDER BY ordinal_position;
-        """
+        return self.catalog.columns(table_name)
 
+    # значения enum
+    def _get_enum_values(self, type_name):
+        return self.catalog.enum_values(type_name) or []
+
+    # сбросить кэш метаданных
+    def invalidate_catalog(self):
+        # после DDL устаревают и метаданные, и любые закэшированные результаты
+        self.catalog.invalidate()
+        self._after_commit(None)
+
+    # кэш результатов
+    def invalidate_table(self, table: str):
+        """Таблицу изменили: выбросить из кэша зависящие от неё результаты."""
+        self._after_commit(table)
+
+    def _after_commit(self, table: str | None):
+        # внутри transaction() — откладываем до COMMIT, иначе параллельное
+        # чтение успело бы закэшировать ещё не закоммиченное состояние
+        pending = getattr(self._local, "touched", None)
+        if pending is not None:
+            pending.add(table)
+            return
+        if table is None:
+            self.cache.clear()
+            return
+        self.cache.invalidate_table(table)
+        if table in ROLLUP_SOURCES:
+            self.cache.invalidate_table(ROLLUP_TABLE)
+        if table in ("clients", "rooms"):
+            # новые гости / номера — в индекс ресепшена, не дожидаясь опроса
+            self.front_desk.wake()
+
+    def cache_stats(self) -> dict:
+        return self.cache.stats()
+
+    # статистика запросов по отпечаткам (см. metrics.py)
+    def query_stats(self) -> list[dict]:
+        return self.metrics.snapshot()
+
+    # живое обновление
+    def _on_table_change(self, table: str, op: str, ids):
+        # поток слушателя: строки уже закоммичены, кэш сбрасываем сразу
+        if table == ALL_TABLES:
+            self.cache.clear()
+            return
+        self.cache.invalidate_table(table)
+        if table in ROLLUP_SOURCES:
+            # у сводки своих NOTIFY нет: окна с ней перечитывают её целиком
+            self.cache.invalidate_table(ROLLUP_TABLE)
+            self.changes.dispatch(ROLLUP_TABLE, op, None)
+
+    def install_change_triggers(self):
+        """Создать триггеры NOTIFY на clients / rooms / stays (notify.sql)."""
+        path = os.path.join(os.path.dirname(__file__), "notify.sql")
+        with open(path, "r", encoding="utf-8") as f:
+            self.execute_ddl(f.read())
+        app_logger.info("change triggers installed")
+
+    def install_daily_stats(self):
+        """Сводка daily_room_stats и триггеры на stays / rooms (rollup.sql)."""
+        path = os.path.join(os.path.dirname(__file__), "rollup.sql")
+        with open(path, "r", encoding="utf-8") as f:
+            self.execute_ddl(f.read())
+        app_logger.info("daily stats rollup installed")
+
+    def backfill_daily_stats(self) -> int:
+        """Пересчитать сводку по дням заново из stays JOIN rooms; число строк."""
         with self.cursor() as cur:
-            cur.execute(q, (table_name,))
-            columns = cur.fetchall()
-
-        # добавим enum значения если нужно
-        for col in columns:
-            if self._is_enum(col["udt_name"]):
-                col["enum_values"] = self._get_enum_values(col["udt_name"])
-            else:
-                col["enum_values"] = None
+            cur.execute("SELECT daily_stats_backfill() AS n")
+            n = cur.fetchone()["n"]
+        self.invalidate_table(ROLLUP_TABLE)
+        app_logger.info(f"daily stats backfill: {n} rows")
+        return n
+
+    def _query_tables(self, query: str) -> set[str]:
+        """Отношения схемы, упомянутые в запросе (по имени).
+
+        Обычное представление может читать что угодно — такой запрос
+        зависит от всех таблиц (ANY_TABLE). Лишнее совпадение по имени
+        колонки лишь чаще сбрасывает запись, поэтому здесь хватает regex.
+        """
+        text = query.lower()
+        found = set()
+        for name in self.catalog.tables() + self.catalog.mat_views():
+            if re.search(rf"\b{re.escape(name.lower())}\b", text):
+                found.add(name)
+                if self.catalog.relkind(name) == "v":
+                    found.add(ANY_TABLE)
+        return found or {ANY_TABLE}
+
+    def _server_counters(self, cur, tables) -> dict:
+        """Счётчики изменений таблиц на сервере: ловят записи других клиентов."""
+        if ANY_TABLE in tables:
+            cur.execute(
+                "SELECT relname, n_tup_ins + n_tup_upd + n_tup_del AS changes "
+                "FROM pg_stat_user_tables WHERE schemaname = 'public'"
+            )
+        else:
+            cur.execute(
+                "SELECT relname, n_tup_ins + n_tup_upd + n_tup_del AS changes "
+                "FROM pg_stat_user_tables WHERE schemaname = 'public' AND relname = ANY(%s)",
+                (sorted(tables),),
+            )
+        return {r["relname"]: r["changes"] for r in cur.fetchall()}
 
-        return columns
+    def cached_query(self, query, params=None, max_rows: int | None = None) -> dict | None:
+        """SELECT через кэш результатов: {"columns", "rows"}.
 
-    # проверка
-    def _is_enum(self, type_name):
-        q = """
-            SELECT 1
-            FROM pg_type
-            WHERE typname = %s AND typtype = 'e';
+        max_rows — не кэшировать большие результаты: если строк больше,
+        вернётся None, и такой запрос лучше читать потоком (stream()).
+        Строки общие для всех попаданий — не изменяйте их.
         """
-        with self.cursor() as cur:
-            cur.execute(q, (type_name,))
-            return cur.fetchone() is not None
+        # каталог нужен _query_tables(); грузим его до того, как займём
+        # соединение, чтобы не брать из пула второе
+        self.catalog.tables()
+
+        with self.read_cursor() as cur:
+            if not isinstance(query, str):
+                query = query.as_string(cur)
+            key = self.cache.make_key(query, params)
+            if self.cache.is_too_big(key):
+                return None
+
+            entry = self.cache.get(key)
+            if entry is not None:
+                server = None
+                if self.cache.needs_check(entry):
+                    server = self._server_counters(cur, entry.tables)
+                if self.cache.confirm(key, entry, server):
+                    return {"columns": entry.columns, "rows": entry.rows}
+
+            # версии и счётчики снимаем до запроса: запись, пришедшая
+            # во время чтения, не даст закэшировать устаревший результат
+            tables = self._query_tables(query)
+            versions = self.cache.versions(tables)
+            server = self._server_counters(cur, tables)
+
+            q = query
+            if max_rows:
+                # перевод строки перед «)» — на случай «-- комментария» в конце запроса
+                q = f"SELECT * FROM (\n{normalize_sql(query)}\n) AS _cached LIMIT {int(max_rows) + 1}"
+            cur.execute(q, params)
+            rows = cur.fetchall()
+            columns = [d.name for d in cur.description]
 
-    # значения enum
-    def _get_enum_values(self, type_name):
-        q = """
-            SELECT enumlabel
-            FROM pg_enum
-            JOIN pg_type ON pg_type.oid = enumtypid
-            WHERE typname = %s
-            ORDER BY enumsortorder;
+        if max_rows and len(rows) > max_rows:
+            self.cache.mark_too_big(key)
+            return None
+
+        self.cache.put(key, columns, rows, tables, versions, server)
+        return {"columns": columns, "rows": rows}
+
+    @contextmanager
+    def transaction(self):
+        """Один COMMIT на несколько операций.
+
+        Внутри блока cursor(), read_cursor(), insert(), execute_ddl() и т.п.
+        работают на том же соединении и не коммитят сами; ошибка в любой
+        из них откатывает всё. Вложенный transaction() — часть внешнего.
         """
-        with self.cursor() as cur:
-            cur.execute(q, (type_name,))
-            return [r["enumlabel"] for r in cur.fetchall()]
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            cur = conn.cursor(cursor_factory=self.metrics.dict_cursor)
+            try:
+                yield cur
+            finally:
+                cur.close()
+            return
 
+        with self.lease() as conn:
+            self._local.conn = conn
+            self._local.touched = set()
+            cur = conn.cursor(cursor_factory=self.metrics.dict_cursor)
+            try:
+                yield cur
+            except Exception:
+                conn.rollback()
+                raise
+            else:
+                conn.commit()
+            finally:
+                self._local.conn = None
+                touched, self._local.touched = self._local.touched, None
+                cur.close()
+
+            # изменённые в транзакции таблицы — из кэша только после COMMIT
+            for table in touched:
+                self._after_commit(table)
 
+    # курсор для записи: своя транзакция или текущая transaction()
     @contextmanager
     def cursor(self):
-        if self.conn is None:
-            self.connect()
-        cur = self.conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-        try:
+        with self.transaction() as cur:
             yield cur
-        except Exception as e:
-            self.conn.rollback()
-            raise
-        else:
-            self.conn.commit()
-        finally:
-            cur.close()
 
-    # учное управление
-    def commit(self):
-        if getattr(self, "conn", None) is not None:
-            self.conn.commit()
+    @contextmanager
+    def read_cursor(self):
+        """Курсор только для чтения: autocommit, без BEGIN/COMMIT.
+
+        Каждый запрос выполняется в своём снимке и не держит транзакцию
+        открытой. Внутри transaction() читает в ней же (видны свои изменения).
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            cur = conn.cursor(cursor_factory=self.metrics.dict_cursor)
+            try:
+                yield cur
+            finally:
+                cur.close()
+            return
+
+        with self.lease() as conn:
+            conn.autocommit = True
+            cur = conn.cursor(cursor_factory=self.metrics.dict_cursor)
+            try:
+                yield cur
+            finally:
+                cur.close()
+                if not conn.closed:
+                    conn.autocommit = False
 
     # создание схем таблиц типов
+    def _set_lock_timeout(self, cur):
+        # таблицу читает чужая транзакция — DDL падает с LockNotAvailable,
+        # а не висит, заодно блокируя всех, кто встал в очередь за ним
+        cur.execute("SET LOCAL lock_timeout = %s", (f"{self.ddl_lock_timeout_ms}ms",))
+
+    def _run_ddl(self, query: str):
+        def run():
+            with self.cursor() as cur:
+                self._set_lock_timeout(cur)
+                cur.execute(query)
+
+        try:
+            run()
+        except errors.LockNotAvailable:
+            # блокировку могут держать наши же недочитанные таблицы в окнах;
+            # внутри transaction() повторить нельзя — она уже прервана
+            if getattr(self._local, "conn", None) is not None or not self.close_streams():
+                raise
+            run()
+
     def execute_ddl(self, query: str):
-        with self.cursor() as cur:
-            cur.execute(query)
+        self._run_ddl(query)
+        self.invalidate_catalog()
         app_logger.info(f"DDL executed: {query[:80].replace(chr(10),' ')}")
 
+    def execute_autocommit(self, statements: list[str]):
+        """DDL вне транзакции: CREATE INDEX CONCURRENTLY и т.п. не работают в BEGIN."""
+        with self.lease() as conn:
+            conn.autocommit = True
+            try:
+                with conn.cursor(cursor_factory=self.metrics.dict_cursor) as cur:
+                    for st in statements:
+                        cur.execute(st)
+                        app_logger.info(f"DDL executed: {st[:80].replace(chr(10),' ')}")
+            finally:
+                if not conn.closed:
+                    conn.autocommit = False
+        self.invalidate_catalog()
+
     def alter_table(self, query: str):
-        with self.cursor() as cur:
-            cur.execute(query)
+        self._run_ddl(query)
+        self.invalidate_catalog()
         app_logger.info(f"ALTER executed: {query[:80].replace(chr(10),' ')}")
 
     def insert(self, table: str, data: dict):
@@ -152,12 +471,75 @@ class Database:
         with self.cursor() as cur:
             cur.execute(query, values)
 
+        self.invalidate_table(table)
         app_logger.info(f"INSERT INTO {table}: {data}")
 
     # чтобы не переписывать
     def insert_row(self, table: str, data: dict):
         return self.insert(table, data)
 
+    # массовая вставка
+    def insert_many(self, table: str, rows: list[dict], method: str = "values",
+                    batch_size: int = 1000, returning: str | None = None):
+        """Вставить много строк одной транзакцией.
+
+        method="values" — многострочный INSERT ... VALUES через execute_values,
+        можно получить сгенерированные значения (returning="id").
+        method="copy" — COPY ... FROM STDIN, самый быстрый путь, без RETURNING.
+        Все строки должны иметь одинаковый набор ключей.
+        """
+        rows = list(rows)
+        if not rows:
+            return [] if returning else None
+
+        if method not in ("values", "copy"):
+            raise ValueError(f"insert_many(): неизвестный method {method!r}")
+        if method == "copy" and returning:
+            raise ValueError("insert_many(): COPY не умеет RETURNING, используйте method='values'")
+
+        columns = list(rows[0].keys())
+        col_set = set(columns)
+        for i, row in enumerate(rows):
+            if set(row.keys()) != col_set:
+                raise ValueError(f"insert_many(): строка {i} имеет другой набор колонок")
+
+        table_sql = sql.Identifier(table)
+        fields_sql = sql.SQL(", ").join(map(sql.Identifier, columns))
+        returned = []
+
+        with self.transaction() as cur:
+            conn = cur.connection
+            if method == "values":
+                query = sql.SQL("INSERT INTO {table} ({fields}) VALUES %s").format(
+                    table=table_sql, fields=fields_sql
+                )
+                if returning:
+                    query += sql.SQL(" RETURNING {}").format(sql.Identifier(returning))
+                query = query.as_string(conn)
+
+                for batch in chunks(rows, batch_size):
+                    values = [[r[c] for c in columns] for r in batch]
+                    res = psycopg2.extras.execute_values(
+                        cur, query, values, page_size=batch_size,
+                        fetch=bool(returning),
+                    )
+                    if returning:
+                        returned.extend(r[returning] for r in res)
+            else:
+                query = sql.SQL(
+                    "COPY {table} ({fields}) FROM STDIN WITH (FORMAT csv)"
+                ).format(table=table_sql, fields=fields_sql).as_string(conn)
+                # списки в колонках-массивах — литерал '{...}', в остальных — JSON
+                types = self.catalog.column_types(table)
+                arrays = {c for c in columns if types.get(c) == "ARRAY"}
+
+                for batch in chunks(rows, batch_size):
+                    cur.copy_expert(query, rows_to_csv(batch, columns, arrays))
+
+        self.invalidate_table(table)
+        app_logger.info(f"INSERT MANY INTO {table}: {len(rows)} rows via {method}")
+        return returned if returning else None
+
     # все польз. типы
     def get_custom_types(self):
         q = """
@@ -167,19 +549,19 @@ class Database:
               AND typtype IN ('e', 'c')
             ORDER BY typname;
         """
-        with self.cursor() as cur:
+        with self.read_cursor() as cur:
             cur.execute(q)
             return [r['typname'] for r in cur.fetchall()]
 
     # универсальный селект
-    def select(self,
-               table: str,
-               columns="*",
-               where=None,
-               order=None,
-               group=None,
-               having=None,
-               limit=None):
+    def _build_select(self,
+                      table: str,
+                      columns="*",
+                      where=None,
+                      order=None,
+                      group=None,
+                      having=None,
+                      limit=None):
 
         # колонки
         if isinstance(columns, list):
@@ -217,48 +599,377 @@ class Database:
         if limit:
             q += sql.SQL(" LIMIT {}").format(sql.Literal(limit))
 
-        with self.cursor() as cur:
+        return q
+
+    def select(self, table: str, columns="*", where=None, order=None,
+               group=None, having=None, limit=None):
+        q = self._build_select(table, columns, where, order, group, having, limit)
+
+        with self.read_cursor() as cur:
             cur.execute(q)
             rows = cur.fetchall()
             return rows
 
-    def text_search(self, table, column, pattern, mode="like"):
+    # keyset-пагинация
+    def select_page(self, table: str, order_col: str | None = None, direction: str = "ASC",
+                    where=None, params=None, after=None, before=None,
+                    page_size: int = 200, key: str = "id") -> dict:
+        """Страница строк без OFFSET: «после» / «перед» граничной строкой.
+
+        Сортировка — order_col (NULL в конце) и затем key для однозначности.
+        after / before — кортеж (значение order_col, значение key) последней /
+        первой строки соседней страницы; если order_col не задан — (значение key,).
+        При индексе по (order_col, key) любая страница стоит как первая.
+        where — список sql.Composable (как в select()), params — их параметры.
+        Возвращает {"rows", "columns", "has_more"}: has_more — есть ли ещё
+        строки дальше в направлении чтения.
+        """
+        direction = direction.upper()
+        if direction not in ("ASC", "DESC"):
+            raise ValueError(f"select_page(): неизвестное направление {direction!r}")
+        if after is not None and before is not None:
+            raise ValueError("select_page(): after и before одновременно")
+
+        keys = [order_col, key] if order_col and order_col != key else [key]
+        backward = before is not None
+        bound = before if backward else after
+
+        # при чтении назад порядок переворачивается, потом строки разворачиваются
+        asc = (direction == "ASC") != backward
+        dir_sql = sql.SQL("ASC" if asc else "DESC")
+        op = sql.SQL(">" if asc else "<")
+
+        # NULL в колонке сортировки: всегда в конце прямого порядка
+        nullable = len(keys) == 2 and self._column_nullable(table, order_col)
+        nulls = sql.SQL(" NULLS FIRST" if backward else " NULLS LAST") if nullable else sql.SQL("")
+
+        conds = list(where or [])
+        cond_params = list(params or [])
+        if bound is not None:
+            key_ids = [sql.Identifier(k) for k in keys]
+            row_cmp = sql.SQL("({}) {} ({})").format(
+                sql.SQL(", ").join(key_ids), op,
+                sql.SQL(", ").join(sql.Placeholder() * len(keys)),
+            )
+            if not nullable:
+                conds.append(row_cmp)
+                cond_params.extend(bound)
+            elif bound[0] is not None:
+                # дальше — строки с большим ключом; NULL-ы лежат после всех
+                if backward:
+                    conds.append(row_cmp)
+                else:
+                    conds.append(sql.SQL("({} OR {} IS NULL)").format(row_cmp, key_ids[0]))
+                cond_params.extend(bound)
+            else:
+                # граница внутри хвоста из NULL-ов — дальше идём только по key
+                tail = sql.SQL("({} IS NULL AND {} {} %s)").format(key_ids[0], key_ids[1], op)
+                if backward:
+                    conds.append(sql.SQL("({} IS NOT NULL OR {})").format(key_ids[0], tail))
+                else:
+                    conds.append(tail)
+                cond_params.append(bound[1])
+
+        q = sql.SQL("SELECT * FROM {tbl}").format(tbl=sql.Identifier(table))
+        if conds:
+            q += sql.SQL(" WHERE ") + sql.SQL(" AND ").join(conds)
+
+        order_parts = [sql.SQL("{} {}{}").format(sql.Identifier(keys[0]), dir_sql, nulls)]
+        if len(keys) == 2:
+            order_parts.append(sql.SQL("{} {}").format(sql.Identifier(keys[1]), dir_sql))
+        q += sql.SQL(" ORDER BY ") + sql.SQL(", ").join(order_parts)
+        # на одну строку больше — чтобы узнать, есть ли следующая страница
+        q += sql.SQL(" LIMIT {}").format(sql.Literal(page_size + 1))
+
+        # страницы, которые открывают снова и снова, берутся из кэша
+        res = self.cached_query(q, cond_params)
+        rows = list(res["rows"])
+        columns = res["columns"]
+
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if backward:
+            rows.reverse()
+        return {"rows": rows, "columns": columns, "has_more": has_more}
+
+    def select_by_ids(self, table: str, ids, where=None, params=None,
+                      key: str = "id") -> list[dict]:
+        """Строки с key из ids, подходящие под where (список sql.Composable)."""
+        conds = [sql.SQL("{} = ANY(%s)").format(sql.Identifier(key))] + list(where or [])
+        q = sql.SQL("SELECT * FROM {tbl} WHERE ").format(tbl=sql.Identifier(table))
+        q += sql.SQL(" AND ").join(conds)
+        with self.read_cursor() as cur:
+            cur.execute(q, [list(ids)] + list(params or []))
+            return cur.fetchall()
+
+    def _column_nullable(self, table: str, column: str) -> bool:
+        for c in self.catalog.columns(table):
+            if c["column_name"] == column:
+                return c["is_nullable"] == "YES"
+        return True
+
+    # запрет пересечения проживаний (по желанию)
+    def has_stay_overlap_check(self) -> bool:
+        with self.read_cursor() as cur:
+            cur.execute(
+                "SELECT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'ex_stays_room_period') "
+                "OR EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'trg_stays_check_overlap') AS enabled"
+            )
+            return cur.fetchone()["enabled"]
+
+    def install_stay_overlap_check(self) -> str:
+        """Запретить два действующих проживания одного номера в пересекающиеся даты.
+
+        Обычная stays — ограничение ex_stays_room_period (exclusion.sql, нужно
+        расширение btree_gist), секционированная — триггер stays_check_overlap
+        (partitions.sql). Уже имеющиеся пересечения надо сначала исправить.
+        Возвращает, что именно поставлено.
+        """
+        if self.has_stay_overlap_check():
+            return "уже включено"
+
+        with self.read_cursor() as cur:
+            cur.execute(
+                """
+                SELECT count(*) AS n
+                FROM stays a
+                JOIN stays b ON b.room_id = a.room_id AND b.id > a.id
+                WHERE a.status AND b.status
+                  AND daterange(a.check_in, a.check_out) && daterange(b.check_in, b.check_out)
+                """
+            )
+            overlaps = cur.fetchone()["n"]
+            cur.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'btree_gist'")
+            has_btree_gist = cur.fetchone() is not None
+        if overlaps:
+            raise ValueError(
+                f"в stays уже есть пересекающиеся проживания ({overlaps} пар) — "
+                f"исправьте их и повторите"
+            )
+
+        if self.partitions.is_partitioned():
+            script, what = "partitions.sql", "триггер stays_check_overlap"
+        elif has_btree_gist:
+            script, what = "exclusion.sql", "ограничение ex_stays_room_period"
+        else:
+            raise ValueError("на сервере нет расширения btree_gist (пакет postgresql-contrib)")
+
+        path = os.path.join(os.path.dirname(__file__), script)
+        with open(path, "r", encoding="utf-8") as f:
+            self.execute_ddl(f.read())
+        app_logger.info(f"stays overlap check installed: {what}")
+        return what
+
+    # свободные номера
+    def free_rooms(self, date_from, date_to, capacity: int | None = None,
+                   comfort: str | None = None) -> list[dict]:
+        """Номера без действующих проживаний в [date_from, date_to).
+
+        Пересечение периодов проверяется оператором && по
+        daterange(check_in, check_out) — тем же выражением, что в GiST-индексе
+        ix_stays_period (schema.sql), поэтому поиск не читает stays целиком.
+        """
+        if date_to <= date_from:
+            raise ValueError("дата выезда должна быть позже даты заезда")
+
+        conds = [
+            """NOT EXISTS (
+                SELECT 1 FROM stays s
+                WHERE s.room_id = r.id
+                  AND s.status
+                  AND daterange(s.check_in, s.check_out) && daterange(%(from)s, %(to)s)
+                  -- следствие пересечения; у секционированной stays отсекает
+                  -- секции, которые начинаются после периода
+                  AND s.check_in < %(to)s
+            )"""
+        ]
+        params = {"from": date_from, "to": date_to}
+        if capacity:
+            conds.append("r.capacity >= %(capacity)s")
+            params["capacity"] = capacity
+        if comfort:
+            conds.append("r.comfort = %(comfort)s")
+            params["comfort"] = comfort
+
+        q = f"""
+            SELECT r.id, r.room_number, r.capacity, r.comfort, r.price, r.amenities,
+                   (%(to)s::date - %(from)s::date) AS nights,
+                   r.price * (%(to)s::date - %(from)s::date) AS total_price
+            FROM rooms r
+            WHERE {" AND ".join(conds)}
+            ORDER BY r.price, r.room_number;
+        """
+        with self.read_cursor() as cur:
+            cur.execute(q, params)
+            return cur.fetchall()
+
+    # план запроса
+    def explain(self, query: str, params=None, analyze: bool = True) -> dict:
+        """План запроса в формате JSON: {"Plan": {...}, "Execution Time": ...}.
+
+        С analyze=True запрос действительно выполняется (EXPLAIN ANALYZE),
+        поэтому всегда в отдельной транзакции, которая откатывается, —
+        даже INSERT / UPDATE внутри CTE ничего не изменят.
+        """
+        query = query.strip()
+        while query.endswith(";"):
+            query = query[:-1].rstrip()
+        opts = "ANALYZE, BUFFERS, FORMAT JSON" if analyze else "FORMAT JSON"
+
+        with self.lease() as conn:
+            cur = conn.cursor(cursor_factory=self.metrics.dict_cursor)
+            try:
+                cur.execute(f"EXPLAIN ({opts}) {query}", params)
+                row = cur.fetchone()
+            finally:
+                cur.close()
+                conn.rollback()
+
+        plan = row["QUERY PLAN"]
+        # psycopg2 сам разбирает json; на старых версиях приходит строка
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return plan[0]
+
+    # потоковое чтение большого результата
+    def stream(self, query, params=None, batch_size: int = 500) -> RowStream:
+        """Открыть серверный курсор: строки читаются пачками через fetch_batch()."""
+        return RowStream(self, query, params, batch_size)
+
+    def register_stream(self, stream: RowStream):
+        with self._streams_lock:
+            self._streams.add(stream)
+
+    def unregister_stream(self, stream: RowStream):
+        with self._streams_lock:
+            self._streams.discard(stream)
+
+    def close_streams(self) -> int:
+        """Закрыть все недочитанные потоки, вернуть их число.
+
+        Уже полученные строки остаются в окнах, подкачка в них прекращается
+        (RowStream.interrupted), а блокировки таблиц снимаются.
+        """
+        with self._streams_lock:
+            streams = list(self._streams)
+        n = sum(1 for st in streams if st.interrupt())
+        if n:
+            app_logger.info(f"closed {n} unfinished streams to release table locks")
+        return n
+
+    def iter_select(self, table: str, columns="*", where=None, order=None,
+                    group=None, having=None, limit=None, batch_size: int = 500):
+        """То же, что select(), но отдаёт строки пачками (генератор списков)."""
+        q = self._build_select(table, columns, where, order, group, having, limit)
+        with self.stream(q, batch_size=batch_size) as st:
+            yield from st
+
+    def text_search(self, table, column, pattern, mode="auto", limit: int | None = None):
+        """Поиск по текстовой колонке.
+
+        like / regex / regex_i / not_regex / similar / not_similar — как раньше;
+        trgm — похожие значения (оператор % из pg_trgm, порог
+        pg_trgm.similarity_threshold), fuzzy — подстрока без учёта регистра
+        или похожее значение; оба упорядочены по similarity(). auto выбирает
+        fuzzy, если по колонке есть триграммный индекс, иначе like.
+        """
         col = sql.Identifier(column)
+        order = None
+
+        if mode == "auto":
+            mode = "fuzzy" if self.catalog.has_trgm_index(table, column) else "like"
 
         if mode == "like":
             cond = sql.SQL("{} LIKE {}").format(col, sql.Placeholder())
-            value = f"%{pattern}%"
+            params = [f"%{pattern}%"]
+
+        elif mode == "trgm":
+            cond = sql.SQL("{} %% {}").format(col, sql.Placeholder())
+            params = [pattern]
+            order = sql.SQL("similarity({}, {}) DESC").format(col, sql.Placeholder())
+
+        elif mode == "fuzzy":
+            # ILIKE и % берут строки из одного GIN-индекса (BitmapOr)
+            esc = pattern.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            cond = sql.SQL("({c} ILIKE {p} OR {c} %% {p})").format(c=col, p=sql.Placeholder())
+            params = [f"%{esc}%", pattern]
+            order = sql.SQL("similarity({}, {}) DESC").format(col, sql.Placeholder())
 
         elif mode == "regex":
             cond = sql.SQL("{} ~ {}").format(col, sql.Placeholder())
-            value = pattern
+            params = [pattern]
 
         elif mode == "regex_i":
             cond = sql.SQL("{} ~* {}").format(col, sql.Placeholder())
-            value = pattern
+            params = [pattern]
 
         elif mode == "not_regex":
             cond = sql.SQL("{} !~ {}").format(col, sql.Placeholder())
-            value = pattern
+            params = [pattern]
 
         elif mode == "similar":
             cond = sql.SQL("{} SIMILAR TO {}").format(col, sql.Placeholder())
-            value = pattern
+            params = [pattern]
 
         elif mode == "not_similar":
             cond = sql.SQL("{} NOT SIMILAR TO {}").format(col, sql.Placeholder())
-            value = pattern
+            params = [pattern]
 
         else:
             raise ValueError("unknown search mode")
 
         q = sql.SQL("SELECT * FROM {tbl} WHERE ").format(tbl=sql.Identifier(table))
         q += cond
+        if order is not None:
+            q += sql.SQL(" ORDER BY ") + order
+            params.append(pattern)
+        if limit:
+            q += sql.SQL(" LIMIT {}").format(sql.Literal(int(limit)))
 
-        with self.cursor() as cur:
-            cur.execute(q, (value,))
+        self.index_advisor.note(table, column, "search")
+        with self.read_cursor() as cur:
+            cur.execute(q, params)
             return cur.fetchall()
 
+    def install_search_indexes(self) -> list[str]:
+        """pg_trgm, триграммные индексы по SEARCH_COLUMNS и по подписи clients
+        для выбора внешнего ключа; имена созданных."""
+        created = []
+        for table, columns in SEARCH_COLUMNS.items():
+            if self.catalog.relkind(table) not in ("r", "p"):
+                continue
+            for column in columns:
+                if column not in self.catalog.column_names(table):
+                    continue
+                if self.catalog.has_trgm_index(table, column):
+                    continue
+                created.append(
+                    self.index_advisor.create_for(table, column, "trgm", "поиск гостей")
+                )
+
+        # подписи выбора внешнего ключа: триграммы для поиска, btree — для страниц по (подпись, id);
+        # у rooms подпись с enum::text не IMMUTABLE, да и таблица маленькая
+        for table in ("clients",):
+            if self.catalog.relkind(table) not in ("r", "p"):
+                continue
+            names = {i["index_name"] for i in self.catalog.indexes(table)}
+            label = REFERENCE_LABELS[table]
+            statements = {
+                f"ix_{table}_label_trgm": f"USING gin (({label}) gin_trgm_ops)",
+                f"ix_{table}_label": f"(({label}), id)",
+            }
+            for name, body in statements.items():
+                if name in names:
+                    continue
+                self.execute_autocommit([
+                    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+                    f'CREATE INDEX CONCURRENTLY IF NOT EXISTS "{name}" ON public."{table}" {body}',
+                ])
+                created.append(name)
+        if created:
+            app_logger.info(f"search indexes created: {', '.join(created)}")
+        return created
+
 
     def join(self, t1, t2, key1, key2, join_type="INNER"):
 
@@ -273,7 +984,7 @@ class Database:
             jt=sql.SQL(join_type)
         )
 
-        with self.cursor() as cur:
+        with self.read_cursor() as cur:
             cur.execute(q)
             return cur.fetchall()
 
@@ -281,67 +992,121 @@ class Database:
         """выполнить CTE (для будущего UI-конструктора)"""
         q = sql.SQL(f"WITH {name} AS ({cte_query}) {main_query}")
 
-        with self.cursor() as cur:
+        with self.read_cursor() as cur:
             cur.execute(q)
             return cur.fetchall()
 
     def create_view(self, name, query):
-        q = sql.SQL(f"CREATE OR REPLACE VIEW {name} AS {query}")
-        self.execute_ddl(q.as_string(self.conn))
+        self.execute_ddl(f"CREATE OR REPLACE VIEW {name} AS {query}")
 
     def create_mat_view(self, name, query):
-        q = sql.SQL(f"CREATE MATERIALIZED VIEW {name} AS {query}")
-        self.execute_ddl(q.as_string(self.conn))
-
-    def refresh_mat_view(self, name):
-        q = sql.SQL(f"REFRESH MATERIALIZED VIEW {name}")
-        self.execute_ddl(q.as_string(self.conn))
-
-    def get_foreign_keys(self, table):
-        q = """
-            SELECT
-                kcu.column_name AS column,
-                ccu.table_name AS ref_table,
-                ccu.column_name AS ref_column
-            FROM
-                information_schema.table_constraints AS tc
-                JOIN information_schema.key_column_usage AS kcu
-                    ON tc.constraint_name = kcu.constraint_name
-                JOIN information_schema.constraint_column_usage AS ccu
-                    ON ccu.constraint_name = tc.constraint_name
-            WHERE
-                tc.constraint_type = 'FOREIGN KEY'
-                AND tc.table_name = %s;
+        self.execute_ddl(f"CREATE MATERIALIZED VIEW {name} AS {query}")
+
+    def refresh_mat_view(self, name, concurrently: bool = False):
+        # CONCURRENTLY не блокирует чтение, но нужен уникальный индекс
+        how = "CONCURRENTLY " if concurrently else ""
+        self.execute_ddl(f"REFRESH MATERIALIZED VIEW {how}{name}")
+
+    def mat_view_unique_index(self, name: str) -> str | None:
+        """Индекс, с которым возможен REFRESH CONCURRENTLY: уникальный,
+        без WHERE и только по колонкам (без выражений)."""
+        for idx in self.catalog.indexes(name):
+            if (idx["is_unique"] and idx["is_valid"] and not idx["is_partial"]
+                    and None not in idx["columns"]):
+                return idx["index_name"]
+        return None
+
+    def mat_view_key_candidate(self, name: str) -> list[str] | None:
+        """Колонки, значения которых в представлении сейчас не повторяются.
+
+        Пробуем id, затем всё кроме agg_value (ключ группы из DataWindow),
+        затем все колонки. None — уникального набора нет.
         """
-
-        with self.cursor() as cur:
-            cur.execute(q, (table,))
-            return cur.fetchall()
-
-    def get_reference_values(self, table):
-        """получить пары (id, строка-представление) для выпадающих списков FK."""
-        # подбираем человекочитаемое представление в зависимости от таблицы
-        if table == "clients":
-            label_expr = "last_name || ' ' || first_name"
-        elif table == "rooms":
-            label_expr = "room_number::text || ' (' || comfort::text || ')'"
-        else:
-            # на всякий случай дефолт — просто id::text
-            label_expr = "id::text"
-
-        query = sql.SQL(
-            "SELECT id, {label} AS label FROM {tbl} ORDER BY id LIMIT 100"
-        ).format(
-            label=sql.SQL(label_expr),
-            tbl=sql.Identifier(table),
+        cols = self.catalog.column_names(name)
+        candidates = []
+        if "id" in cols:
+            candidates.append(["id"])
+        if "agg_value" in cols and len(cols) > 1:
+            candidates.append([c for c in cols if c != "agg_value"])
+        candidates.append(cols)
+
+        with self.read_cursor() as cur:
+            for key in candidates:
+                q = sql.SQL(
+                    "SELECT NOT EXISTS (SELECT 1 FROM {mv} GROUP BY {cols} HAVING count(*) > 1) AS ok"
+                ).format(
+                    mv=sql.Identifier(name),
+                    cols=sql.SQL(", ").join(map(sql.Identifier, key)),
+                )
+                try:
+                    cur.execute(q)
+                except psycopg2.Error as e:
+                    # у колонки нет оператора равенства (json и т.п.)
+                    app_logger.info(f"mat view key {name}{key}: {e}")
+                    continue
+                if cur.fetchone()["ok"]:
+                    return key
+        return None
+
+    def create_mat_view_unique_index(self, name: str, columns: list[str]) -> str:
+        index = f"ux_{name}"[:63]
+        q = 'CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS "{}" ON public."{}" ({})'.format(
+            index, name, ", ".join(f'"{c}"' for c in columns)
         )
+        self.execute_autocommit([q])
+        return index
 
-        with self.cursor() as cur:
-            cur.execute(query)
-            rows = cur.fetchall()
+    def get_foreign_keys(self, table):
+        return self.catalog.foreign_keys(table)
 
-        # cursor использует RealDictCursor → возвращаем список (id, label)
-        return [(row["id"], row["label"]) for row in rows]
+    def search_reference(self, table, text: str = "", after=None, limit: int = 50) -> dict:
+        """Строки для выбора внешнего ключа: {"rows": [(id, подпись)], "after"}.
+
+        Совпадения по началу подписи (ILIKE 'text%') идут страницами по
+        (подпись, id): after — ключ последней строки прошлой страницы, "after"
+        в ответе — ключ следующей (None — страниц больше нет). Неполную первую
+        страницу добивают похожие подписи (pg_trgm, text <% подпись) — на
+        случай опечатки. Повторные запросы берутся из кэша результатов.
+        """
+        label = sql.SQL(REFERENCE_LABELS.get(table, "id::text"))
+        tbl = sql.Identifier(table)
+        text = (text or "").strip()
+
+        conds, params = [], []
+        if text:
+            esc = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            conds.append(sql.SQL("{} ILIKE %s").format(label))
+            params.append(esc + "%")
+        if after is not None:
+            conds.append(sql.SQL("({}, id) > (%s, %s)").format(label))
+            params.extend(after)
+
+        q = sql.SQL("SELECT id, {label} AS label FROM {tbl}").format(label=label, tbl=tbl)
+        if conds:
+            q += sql.SQL(" WHERE ") + sql.SQL(" AND ").join(conds)
+        q += sql.SQL(" ORDER BY label, id LIMIT %s")
+        params.append(limit + 1)
+
+        rows = [(r["id"], r["label"]) for r in self.cached_query(q, params)["rows"]]
+        next_after = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_after = (rows[-1][1], rows[-1][0])
+
+        if text and after is None and len(rows) < limit:
+            fuzzy = sql.SQL(
+                "SELECT id, {label} AS label FROM {tbl} "
+                "WHERE %s <%% {label} AND NOT {label} ILIKE %s "
+                "ORDER BY word_similarity(%s, {label}) DESC, id LIMIT %s"
+            ).format(label=label, tbl=tbl)
+            try:
+                res = self.cached_query(fuzzy, [text, esc + "%", text, limit - len(rows)])
+                rows += [(r["id"], r["label"]) for r in res["rows"]]
+            except errors.UndefinedFunction:
+                # pg_trgm не установлен — только поиск по началу
+                pass
+
+        return {"rows": rows, "after": next_after}
 
     def get_user_types(self):
         q = """
@@ -360,7 +1125,7 @@ class Database:
                  )
                ORDER BY n.nspname, t.typname;
            """
-        with self.cursor() as cur:
+        with self.read_cursor() as cur:
             cur.execute(q)
             rows = cur.fetchall()
 
@@ -386,7 +1151,7 @@ class Database:
               AND NOT att.attisdropped
             ORDER BY att.attnum;
         """
-        with self.cursor() as cur:
+        with self.read_cursor() as cur:
             cur.execute(q, (type_name,))
             rows = cur.fetchall()
 
@@ -405,6 +1170,7 @@ class Database:
         with self.cursor() as cur:
             cur.execute(query)
 
+        self.invalidate_catalog()
         app_logger.info(f"Создан ENUM-тип {name} со значениями {labels}")
 
     def add_enum_value(self, type_name: str, value: str):
@@ -418,6 +1184,7 @@ class Database:
         with self.cursor() as cur:
             cur.execute(query, (value,))
 
+        self.invalidate_catalog()
         app_logger.info(f"В ENUM-тип {type_name} добавлено значение {value!r}")
 
     def drop_enum_value(self, type_name: str, value: str):
@@ -444,6 +1211,7 @@ class Database:
             )
             cur.execute(query, (value,))
 
+        self.invalidate_catalog()
         app_logger.info(f"Из ENUM-типа {type_name} удалено значение {value!r}")
 
     def create_composite_type(self, name: str, fields: list[tuple[str, str]]):
@@ -475,6 +1243,7 @@ class Database:
         with self.cursor() as cur:
             cur.execute(query)
 
+        self.invalidate_catalog()
         app_logger.info(
             f"Создан составной тип {name} с полями "
             + ", ".join(f"{f[0]} {f[1]}" for f in cleaned_fields)
@@ -488,6 +1257,7 @@ class Database:
         with self.cursor() as cur:
             cur.execute(query)
 
+        self.invalidate_catalog()
         app_logger.info(
             f"Удалён тип {type_name} с опцией "
             f"{'CASCADE' if cascade else 'RESTRICT'}"
@@ -0,0 +1,18 @@
+-- запрет пересечения действующих проживаний одного номера (по желанию,
+-- Database.install_stay_overlap_check()). Нужно расширение btree_gist:
+-- «=» по room_id внутри GiST-индекса. Для секционированной stays вместо
+-- этого скрипта — триггер из partitions.sql.
+-- Скрипт можно выполнять повторно.
+
+CREATE EXTENSION IF NOT EXISTS btree_gist;
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'ex_stays_room_period') THEN
+        ALTER TABLE stays ADD CONSTRAINT ex_stays_room_period EXCLUDE USING gist (
+            room_id WITH =,
+            daterange(check_in, check_out) WITH &&
+        ) WHERE (status);
+    END IF;
+END
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,111 @@
+import gzip
+import os
+
+from psycopg2.extensions import encodings
+
+from app.log.log import app_logger
+
+
+# форматы выгрузки: csv — с шапкой, jsonl — одна строка JSON на запись.
+# Для jsonl используется CSV с «невозможными» кавычкой и разделителем:
+# текстовый формат COPY экранировал бы обратные слэши внутри JSON
+_COPY_OPTIONS = {
+    "csv": "FORMAT csv, HEADER true",
+    "jsonl": "FORMAT csv, QUOTE E'\\x01', DELIMITER E'\\x02'",
+}
+
+
+# как часто (в байтах) сообщать о прогрессе
+PROGRESS_STEP = 256 * 1024
+
+
+class ExportCancelled(Exception):
+    pass
+
+
+class _CountingWriter:
+    """Файл для copy_expert(): пишет байты дальше и считает их.
+
+    Не наследуется от io.TextIOBase, поэтому psycopg2 отдаёт ему bytes
+    без перекодирования.
+    """
+
+    def __init__(self, target, progress=None, is_cancelled=None):
+        self.target = target
+        self.progress = progress
+        self.is_cancelled = is_cancelled
+        self.written = 0
+        self._reported = 0
+
+    def write(self, data):
+        self.target.write(data)
+        self.written += len(data)
+        # COPY пишет построчно — прогресс и отмену проверяем реже
+        if self.written - self._reported < PROGRESS_STEP:
+            return
+        self._reported = self.written
+        if self.is_cancelled and self.is_cancelled():
+            raise ExportCancelled("выгрузка отменена")
+        if self.progress:
+            self.progress(self.written)
+
+
+def _remove_partial(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def strip_query(query: str) -> str:
+    """Убрать пробелы и завершающую ; — запрос будет вложен в COPY (...)."""
+    query = query.strip()
+    while query.endswith(";"):
+        query = query[:-1].rstrip()
+    return query
+
+
+def export_query(db, query: str, path: str, fmt: str = "csv", params=None,
+                 compress: bool | None = None, progress=None, is_cancelled=None) -> dict:
+    """Выгрузить результат запроса в файл через COPY (query) TO STDOUT.
+
+    Строки не проходят через Python: сервер отдаёт готовый CSV/JSONL,
+    который кусками пишется в файл (при compress — через gzip).
+    compress=None — сжимать, если путь заканчивается на .gz.
+    progress(байт) вызывается по мере записи, is_cancelled() — проверка отмены.
+    """
+    if fmt not in _COPY_OPTIONS:
+        raise ValueError(f"неизвестный формат выгрузки: {fmt!r}")
+    if compress is None:
+        compress = path.lower().endswith(".gz")
+
+    query = strip_query(query)
+    if fmt == "jsonl":
+        query = f"SELECT row_to_json(q) FROM ({query}) q"
+
+    opener = gzip.open if compress else open
+    with db.read_cursor() as cur:
+        conn = cur.connection
+        try:
+            # параметры подставляются на клиенте: COPY их не принимает
+            if params:
+                query = cur.mogrify(query, params).decode(encodings.get(conn.encoding, "utf-8"))
+            copy_sql = f"COPY ({query}) TO STDOUT WITH ({_COPY_OPTIONS[fmt]})"
+
+            with opener(path, "wb") as f:
+                writer = _CountingWriter(f, progress, is_cancelled)
+                cur.copy_expert(copy_sql, writer)
+            rows = cur.rowcount
+        except ExportCancelled:
+            # соединение посреди COPY больше не годится — пусть пул его выбросит
+            conn.close()
+            _remove_partial(path)
+            raise
+        except Exception:
+            _remove_partial(path)
+            raise
+
+    app_logger.info(
+        f"EXPORT {fmt}{' gz' if compress else ''} -> {path}: {rows} rows, {writer.written} bytes"
+    )
+    return {"rows": rows, "bytes": writer.written, "path": path}
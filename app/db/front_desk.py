@@ -0,0 +1,267 @@
+import threading
+import time
+from bisect import bisect_left, insort
+
+from app.log.log import app_logger
+from app.db.listener import ALL_TABLES
+
+
+# какие колонки грузим в память и по каким ищем началом строки
+_TABLES = {
+    "clients": {
+        "columns": "id, last_name, first_name, patronymic, passport, is_regular",
+        "keys": ("last_name", "first_name", "passport"),
+    },
+    "rooms": {
+        "columns": "id, room_number, capacity, comfort::text AS comfort, price",
+        "keys": ("room_number",),
+    },
+}
+
+
+def _key(field: str, value) -> str:
+    # паспорт сравниваем без пробела: «4510 123456» и «4510123456» — одно
+    text = str(value).lower()
+    if field == "passport":
+        text = text.replace(" ", "")
+    return text
+
+
+class _PrefixIndex:
+    """Отсортированный список (ключ, id): поиск по началу ключа через bisect."""
+
+    def __init__(self, pairs=()):
+        self._items = sorted(pairs)
+
+    def add(self, key: str, id_: int):
+        insort(self._items, (key, id_))
+
+    def remove(self, key: str, id_: int):
+        i = bisect_left(self._items, (key, id_))
+        if i < len(self._items) and self._items[i] == (key, id_):
+            del self._items[i]
+
+    def prefix(self, prefix: str, limit: int) -> list[int]:
+        res = []
+        i = bisect_left(self._items, (prefix,))
+        while i < len(self._items) and len(res) < limit:
+            key, id_ = self._items[i]
+            if not key.startswith(prefix):
+                break
+            res.append(id_)
+            i += 1
+        return res
+
+
+class FrontDeskIndex:
+    """Локальный индекс гостей и номеров для быстрого поиска на ресепшене.
+
+    clients и rooms читаются в память одним запросом на таблицу; по
+    фамилии, имени, паспорту и номеру комнаты строятся отсортированные
+    списки ключей, lookup() ищет по началу строки без обращения к базе.
+    Актуальность: NOTIFY table_changes (перечитываются изменённые id) и
+    раз в poll_interval — дельта по id (новые строки) со сверкой числа
+    строк (удаления). Правки из приложения без DB_LIVE_REFRESH видны
+    после следующей полной загрузки.
+    """
+
+    def __init__(self, db, poll_interval: float = 60.0):
+        self.db = db
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._records: dict[str, dict[int, dict]] = {t: {} for t in _TABLES}
+        self._indexes: dict[tuple[str, str], _PrefixIndex] = {}
+        self._pending: dict[str, set | None] = {}  # таблица -> id из уведомлений (None — всё)
+        self._loaded = False
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    # поток
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self.db.changes.subscribe(self._on_change)
+        self._thread = threading.Thread(target=self._run, name="front-desk", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 2.0):
+        self.db.changes.unsubscribe(self._on_change)
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join(timeout)
+        self._thread = None
+
+    def wake(self):
+        """Проверить дельту сейчас, не дожидаясь poll_interval."""
+        self._wake.set()
+
+    def reload(self):
+        with self._lock:
+            for table in _TABLES:
+                self._pending[table] = None
+        self._wake.set()
+
+    def _run(self):
+        try:
+            self.load()
+        except Exception as e:
+            app_logger.error(f"Индекс ресепшена: {e}")
+        while not self._stop.is_set():
+            self._wake.wait(self.poll_interval if self.poll_interval > 0 else None)
+            self._wake.clear()
+            if self._stop.is_set():
+                return
+            try:
+                self._apply_pending()
+                self.refresh_delta()
+            except Exception as e:
+                app_logger.error(f"Индекс ресепшена: {e}")
+
+    def _on_change(self, table: str, op: str, ids):
+        # поток слушателя: только запоминаем, читает поток индекса
+        if table == ALL_TABLES:
+            self.reload()
+            return
+        if table not in _TABLES:
+            return
+        with self._lock:
+            if ids is None:
+                self._pending[table] = None
+            elif table not in self._pending:
+                self._pending[table] = set(ids)
+            elif self._pending[table] is not None:
+                self._pending[table].update(ids)
+        self._wake.set()
+
+    # загрузка
+    def _fetch(self, table: str, where: str = "", params=None) -> list[dict]:
+        with self.db.read_cursor() as cur:
+            cur.execute(f"SELECT {_TABLES[table]['columns']} FROM {table} {where}", params)
+            return [dict(r) for r in cur.fetchall()]
+
+    def _load_table(self, table: str):
+        if self.db.catalog.relkind(table) is None:
+            rows = []
+        else:
+            rows = self._fetch(table)
+        records = {r["id"]: r for r in rows}
+        indexes = {
+            (table, f): _PrefixIndex((_key(f, r[f]), r["id"]) for r in rows if r[f] is not None)
+            for f in _TABLES[table]["keys"]
+        }
+        with self._lock:
+            self._records[table] = records
+            self._indexes.update(indexes)
+
+    def load(self):
+        started = time.perf_counter()
+        for table in _TABLES:
+            self._load_table(table)
+        self._loaded = True
+        ms = (time.perf_counter() - started) * 1000
+        app_logger.info(
+            f"front desk index loaded: {len(self._records['clients'])} clients, "
+            f"{len(self._records['rooms'])} rooms, {ms:.0f} ms"
+        )
+
+    def _upsert(self, table: str, rows: list[dict], removed_ids=()):
+        with self._lock:
+            records = self._records[table]
+            for id_ in list(removed_ids) + [r["id"] for r in rows]:
+                old = records.pop(id_, None)
+                if old is None:
+                    continue
+                for f in _TABLES[table]["keys"]:
+                    if old[f] is not None:
+                        self._indexes[(table, f)].remove(_key(f, old[f]), id_)
+            for r in rows:
+                records[r["id"]] = r
+                for f in _TABLES[table]["keys"]:
+                    if r[f] is not None:
+                        self._indexes[(table, f)].add(_key(f, r[f]), r["id"])
+
+    def _apply_pending(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if pending and not self._loaded:
+            self.load()
+            return
+        for table, ids in pending.items():
+            if ids is None:
+                self._load_table(table)
+                continue
+            rows = self._fetch(table, "WHERE id = ANY(%s)", (sorted(ids),))
+            found = {r["id"] for r in rows}
+            self._upsert(table, rows, [i for i in ids if i not in found])
+
+    def refresh_delta(self):
+        """Новые строки по id > последнего известного; при расхождении числа строк — полная загрузка."""
+        if not self._loaded:
+            self.load()
+            return
+        for table in _TABLES:
+            if self.db.catalog.relkind(table) is None:
+                continue
+            with self._lock:
+                last = max(self._records[table], default=0)
+            rows = self._fetch(table, "WHERE id > %s", (last,))
+            if rows:
+                self._upsert(table, rows)
+            with self.db.read_cursor() as cur:
+                cur.execute(f"SELECT count(*) AS n FROM {table}")
+                n = cur.fetchone()["n"]
+            with self._lock:
+                local = len(self._records[table])
+            if n != local:
+                self._load_table(table)
+
+    # поиск
+    def is_loaded(self) -> bool:
+        return self._loaded
+
+    def lookup(self, text: str, limit: int = 20) -> list[dict]:
+        """Гости по началу фамилии / имени («фамилия имя») или паспорта и
+        номера по началу номера комнаты: [{"table", "id", "label", "row"}]."""
+        q = " ".join(text.lower().split())
+        if not q or not self._loaded:
+            return []
+
+        found: list[tuple[str, int]] = []
+        with self._lock:
+            digits = q.replace(" ", "")
+            if digits.isdigit():
+                found += [("clients", i) for i in self._indexes[("clients", "passport")].prefix(digits, limit)]
+                found += [("rooms", i) for i in self._indexes[("rooms", "room_number")].prefix(digits, limit)]
+            else:
+                words = q.split(" ")
+                by_last = self._indexes[("clients", "last_name")].prefix(words[0], limit * 5)
+                if len(words) > 1:
+                    # «иван ив» — фамилия и начало имени
+                    first = words[1]
+                    clients = self._records["clients"]
+                    by_last = [
+                        i for i in by_last
+                        if _key("first_name", clients[i]["first_name"]).startswith(first)
+                    ]
+                    found += [("clients", i) for i in by_last[:limit]]
+                else:
+                    by_first = self._indexes[("clients", "first_name")].prefix(words[0], limit)
+                    ids = list(dict.fromkeys(by_last[:limit] + by_first))
+                    found += [("clients", i) for i in ids]
+
+            res = []
+            for table, id_ in found[:limit]:
+                row = self._records[table].get(id_)
+                if row is not None:
+                    res.append({"table": table, "id": id_, "label": self._label(table, row), "row": row})
+        return res
+
+    @staticmethod
+    def _label(table: str, row: dict) -> str:
+        if table == "clients":
+            name = " ".join(p for p in (row["last_name"], row["first_name"], row["patronymic"]) if p)
+            return f"{name} · паспорт {row['passport']}"
+        return f"Номер {row['room_number']} · {row['comfort']} · мест: {row['capacity']} · {row['price']}"
@@ -0,0 +1,641 @@
+import codecs
+import csv
+import io
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+
+import psycopg2.extras
+from psycopg2 import sql
+
+from app.db.bulk import copy_field
+from app.log.log import app_logger
+
+
+# по какой колонке искать строку в справочнике, если в файле нет самого id:
+# например, в stays можно передать passport вместо client_id
+FK_LOOKUP_COLUMNS = {
+    "clients": "passport",
+    "rooms": "room_number",
+}
+
+# сколько отклонённых строк показывать в отчёте
+REJECTS_REPORT_LIMIT = 1000
+
+_TRUE = ("true", "t", "1", "yes", "y", "да")
+_FALSE = ("false", "f", "0", "no", "n", "нет")
+
+
+class CsvImportError(Exception):
+    """Файл нельзя загрузить в выбранную таблицу (не та шапка и т.п.)."""
+
+
+# ---------------------------------------------------------------------
+# разбор файла (выполняется в процессах-воркерах)
+
+def _column_spec(col: dict | None) -> tuple:
+    """Упрощённое описание типа колонки для предварительной проверки в воркере."""
+    if col is None:
+        return ("lookup", None)
+
+    dt = (col.get("data_type") or "").lower()
+    if col.get("enum_values"):
+        return ("enum", tuple(col["enum_values"]))
+    if dt in ("integer", "bigint", "smallint"):
+        return ("int", None)
+    if dt in ("numeric", "real", "double precision"):
+        return ("num", None)
+    if dt == "boolean":
+        return ("bool", None)
+    if dt == "date":
+        return ("date", None)
+    if dt.startswith("timestamp"):
+        return ("timestamp", None)
+    if dt in ("character varying", "character") and col.get("character_maximum_length"):
+        return ("text", int(col["character_maximum_length"]))
+    return ("any", None)
+
+
+def _check_value(raw: str, spec: tuple):
+    """Вернуть (нормализованное значение, None) или (None, текст ошибки)."""
+    kind, extra = spec
+    try:
+        if kind == "int":
+            int(raw)
+        elif kind == "num":
+            Decimal(raw.replace(",", "."))
+            raw = raw.replace(",", ".")
+        elif kind == "bool":
+            low = raw.lower()
+            if low in _TRUE:
+                raw = "t"
+            elif low in _FALSE:
+                raw = "f"
+            else:
+                return None, f"не логическое значение {raw!r}"
+        elif kind == "date":
+            date.fromisoformat(raw)
+        elif kind == "timestamp":
+            datetime.fromisoformat(raw)
+        elif kind == "enum":
+            if raw not in extra:
+                return None, f"значение {raw!r} не из {list(extra)}"
+        elif kind == "text":
+            if len(raw) > extra:
+                return None, f"длиннее {extra} символов"
+    except (ValueError, InvalidOperation):
+        return None, f"не подходит под тип: {raw!r}"
+    return raw, None
+
+
+def _decode_lines(data: bytes) -> tuple[str, dict[int, str]]:
+    """Строгое декодирование UTF-8; испорченные строки не загружаем.
+
+    Недекодируемая строка возвращается в {номер строки в куске: причина};
+    в текст она попадает с U+FFFD только чтобы не сломать кавычки CSV —
+    запись, которая её захватила, parse_chunk() отклоняет целиком.
+    """
+    try:
+        return data.decode("utf-8"), {}
+    except UnicodeDecodeError:
+        pass
+
+    parts = []
+    bad: dict[int, str] = {}
+    for line_no, line in enumerate(data.splitlines(keepends=True), 1):
+        try:
+            parts.append(line.decode("utf-8"))
+        except UnicodeDecodeError as e:
+            bad[line_no] = (
+                f"строка не в кодировке UTF-8: байт 0x{line[e.start]:02x} "
+                f"в позиции {e.start + 1}"
+            )
+            parts.append(line.decode("utf-8", errors="replace"))
+    return "".join(parts), bad
+
+
+def parse_chunk(args) -> dict:
+    """Разобрать кусок файла [start, end): проверка числа полей и типов.
+
+    Возвращает CSV для COPY в staging-таблицу (chunk_no, line_no, поля...)
+    и список отклонённых строк (line_no, причина) с номерами внутри куска.
+    """
+    path, chunk_no, start, end, delimiter, names, specs = args
+
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    if start == 0 and data.startswith(codecs.BOM_UTF8):
+        data = data[len(codecs.BOM_UTF8):]
+    text, bad = _decode_lines(data)
+
+    n_lines = text.count("\n")
+    if text and not text.endswith("\n"):
+        n_lines += 1
+
+    out = io.StringIO()
+    rejects: list[tuple[int, str]] = []
+    good = 0
+
+    reader = csv.reader(io.StringIO(text, newline=""), delimiter=delimiter)
+    prev_line = 0  # последняя строка предыдущей записи
+    reported: set[int] = set()
+    while True:
+        try:
+            record = next(reader)
+        except StopIteration:
+            break
+        except csv.Error as e:
+            rejects.append((reader.line_num, f"ошибка разбора CSV: {e}"))
+            prev_line = reader.line_num
+            continue
+
+        line_no = reader.line_num
+        # запись (в т.ч. многострочная) захватила недекодируемую строку
+        broken = [ln for ln in range(prev_line + 1, line_no + 1) if ln in bad]
+        prev_line = line_no
+        if broken:
+            rejects.append((line_no, bad[broken[0]]))
+            reported.update(broken)
+            continue
+
+        if not record or record == [""]:
+            continue
+        if len(record) != len(names):
+            rejects.append(
+                (line_no, f"ожидалось полей: {len(names)}, получено: {len(record)}")
+            )
+            continue
+
+        fields = [str(chunk_no), str(line_no)]
+        errors = []
+        for name, raw, spec in zip(names, record, specs):
+            raw = raw.strip()
+            if raw == "":
+                fields.append(copy_field(None))
+                continue
+            value, err = _check_value(raw, spec)
+            if err:
+                errors.append(f"{name}: {err}")
+            fields.append(copy_field(value))
+
+        if errors:
+            rejects.append((line_no, "; ".join(errors)))
+            continue
+
+        out.write(",".join(fields))
+        out.write("\n")
+        good += 1
+
+    rejects.extend((ln, reason) for ln, reason in bad.items() if ln not in reported)
+
+    return {
+        "chunk_no": chunk_no,
+        "n_lines": n_lines,
+        "csv": out.getvalue(),
+        "good": good,
+        "rejects": rejects,
+        "bytes": end - start,
+    }
+
+
+def split_file(path: str, start: int, chunk_bytes: int) -> list[tuple[int, int]]:
+    """Разбить файл на куски примерно по chunk_bytes, выровненные по концу строки."""
+    size = os.path.getsize(path)
+    bounds = []
+    with open(path, "rb") as f:
+        pos = start
+        while pos < size:
+            end = min(pos + chunk_bytes, size)
+            if end < size:
+                f.seek(end)
+                f.readline()
+                end = f.tell()
+            bounds.append((pos, end))
+            pos = end
+    return bounds
+
+
+# ---------------------------------------------------------------------
+# загрузка в БД
+
+class CsvImporter:
+    """Импорт CSV/TSV в таблицу через staging-таблицу и COPY.
+
+    1. файл режется на куски, которые параллельно разбираются в пуле
+       процессов (число полей, грубая проверка типов);
+    2. корректные строки потоково уходят через COPY во временную таблицу;
+    3. в SQL проверяются типы по каталогу, CHECK-и, NOT NULL и ссылки FK
+       (в том числе поиск id по passport / room_number);
+    4. остальное сливается в целевую таблицу INSERT ... ON CONFLICT.
+
+    Всё выполняется в одной транзакции: при ошибке таблица не меняется.
+    Ограничение: поля в кавычках с переводом строки внутри не должны
+    попадать на границу кусков (для таких файлов задайте workers=1).
+    """
+
+    def __init__(self, db, table: str, path: str, delimiter: str = ",",
+                 header: bool = True, conflict_columns: list[str] | None = None,
+                 on_conflict: str = "nothing", workers: int | None = None,
+                 chunk_bytes: int = 32 * 1024 * 1024, progress=None):
+        if on_conflict not in ("nothing", "update", "error"):
+            raise ValueError(f"неизвестный режим on_conflict: {on_conflict!r}")
+
+        self.db = db
+        self.table = table
+        self.path = path
+        self.delimiter = delimiter
+        self.header = header
+        self.conflict_columns = list(conflict_columns or [])
+        self.on_conflict = on_conflict
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_bytes = chunk_bytes
+        self.progress = progress  # progress(текст, сделано_байт, всего_байт)
+
+    def _report(self, text: str, done: int = 0, total: int = 0):
+        if self.progress:
+            self.progress(text, done, total)
+
+    # шапка файла и сопоставление колонок
+    def _read_header(self, target_cols: list[dict]) -> tuple[list[str], int]:
+        with open(self.path, "rb") as f:
+            first = f.readline()
+        if not self.header:
+            names = [
+                c["column_name"] for c in target_cols
+                if "nextval" not in str(c.get("column_default") or "")
+            ]
+            return names, 0
+
+        try:
+            line = first.decode("utf-8-sig")
+        except UnicodeDecodeError as e:
+            raise CsvImportError(f"шапка файла не в кодировке UTF-8: {e}")
+        names = next(csv.reader([line], delimiter=self.delimiter), [])
+        names = [n.strip() for n in names]
+        if not names or any(not n for n in names):
+            raise CsvImportError("в первой строке файла нет названий колонок")
+        return names, len(first)
+
+    def _plan(self, names: list[str]):
+        cols = {c["column_name"]: c for c in self.db.catalog.columns(self.table)}
+        if not cols:
+            raise CsvImportError(f"таблица {self.table} не найдена")
+
+        fks = self.db.catalog.foreign_keys(self.table)
+        lookups = []  # (fk колонка, справочник, колонка справочника, колонка в файле)
+        for fk in fks:
+            lookup_col = FK_LOOKUP_COLUMNS.get(fk["ref_table"])
+            if fk["column"] not in names and lookup_col in names:
+                lookups.append((fk["column"], fk["ref_table"], fk["ref_column"], lookup_col))
+        lookup_names = {lk[3] for lk in lookups}
+
+        unknown = [n for n in names if n not in cols and n not in lookup_names]
+        if unknown:
+            raise CsvImportError(f"колонок нет в таблице {self.table}: {', '.join(unknown)}")
+        if len(set(names)) != len(names):
+            raise CsvImportError("в шапке файла есть повторяющиеся колонки")
+
+        targets = [n for n in names if n in cols] + [lk[0] for lk in lookups]
+        for name, col in cols.items():
+            required = col["is_nullable"] == "NO" and col.get("column_default") is None
+            if required and name not in targets:
+                raise CsvImportError(f"в файле нет обязательной колонки {name}")
+
+        for c in self.conflict_columns:
+            if c not in targets:
+                raise CsvImportError(f"колонки ключа конфликта {c} нет в файле")
+
+        return cols, lookups, targets
+
+    def run(self) -> dict:
+        names, header_len = self._read_header(self.db.catalog.columns(self.table))
+        cols, lookups, targets = self._plan(names)
+        specs = [_column_spec(cols.get(n)) for n in names]
+
+        bounds = split_file(self.path, header_len, self.chunk_bytes)
+        total_bytes = sum(e - s for s, e in bounds)
+        first_line = 1 if self.header else 0
+
+        stage = sql.Identifier("_import_stage")
+        rejects = sql.Identifier("_import_rejects")
+        file_cols = sql.SQL(", ").join(sql.Identifier(n) for n in names)
+
+        with self.db.lease() as conn:
+            cur = conn.cursor(cursor_factory=self.db.metrics.tuple_cursor)
+            try:
+                cur.execute(
+                    sql.SQL(
+                        "CREATE TEMP TABLE {stage} (chunk_no int, line_no int, {cols}) "
+                        "ON COMMIT DROP"
+                    ).format(
+                        stage=stage,
+                        cols=sql.SQL(", ").join(
+                            sql.SQL("{} text").format(sql.Identifier(n)) for n in names
+                        ),
+                    )
+                )
+                cur.execute(
+                    sql.SQL(
+                        "CREATE TEMP TABLE {rej} (chunk_no int, line_no int, reason text) "
+                        "ON COMMIT DROP"
+                    ).format(rej=rejects)
+                )
+
+                copy_q = sql.SQL(
+                    "COPY {stage} (chunk_no, line_no, {cols}) FROM STDIN WITH (FORMAT csv)"
+                ).format(stage=stage, cols=file_cols).as_string(conn)
+
+                # 1-2. параллельный разбор и потоковый COPY
+                chunk_lines: dict[int, int] = {}
+                loaded = 0
+                done_bytes = 0
+                for res in self._parse_all(bounds, names, specs):
+                    chunk_lines[res["chunk_no"]] = res["n_lines"]
+                    if res["csv"]:
+                        cur.copy_expert(copy_q, io.StringIO(res["csv"]))
+                    if res["rejects"]:
+                        psycopg2.extras.execute_values(
+                            cur,
+                            sql.SQL("INSERT INTO {rej} VALUES %s").format(rej=rejects).as_string(conn),
+                            [(res["chunk_no"], ln, reason) for ln, reason in res["rejects"]],
+                        )
+                    loaded += res["good"]
+                    done_bytes += res["bytes"]
+                    self._report(f"Загружено во временную таблицу: {loaded} строк", done_bytes, total_bytes)
+
+                # 3. проверки в SQL
+                self._report("Проверка типов и ссылок…", total_bytes, total_bytes)
+                self._validate_types(cur, conn, names, cols)
+                self._resolve_lookups(cur, lookups)
+                self._validate_fks(cur, names)
+                self._validate_not_null(cur, names, cols, lookups)
+                self._validate_checks(cur, names, cols, lookups)
+
+                # 4. слияние
+                self._report("Запись в таблицу…", total_bytes, total_bytes)
+                inserted, updated = self._merge(cur, names, cols, lookups, targets)
+
+                report = self._collect_report(cur, chunk_lines, first_line)
+                report.update({
+                    "table": self.table,
+                    "loaded": loaded,
+                    "inserted": inserted,
+                    "updated": updated,
+                })
+
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cur.close()
+
+        self.db.invalidate_table(self.table)
+        app_logger.info(
+            f"IMPORT {self.path} -> {self.table}: загружено {report['loaded']}, "
+            f"вставлено {inserted}, обновлено {updated}, отклонено {report['rejected']}"
+        )
+        return report
+
+    def _parse_all(self, bounds, names, specs):
+        tasks = [
+            (self.path, i, s, e, self.delimiter, names, specs)
+            for i, (s, e) in enumerate(bounds)
+        ]
+        if len(tasks) <= 1 or self.workers <= 1:
+            for t in tasks:
+                yield parse_chunk(t)
+            return
+
+        # ограниченное окно задач, чтобы не держать в памяти весь файл
+        window = self.workers * 2
+        # spawn, не fork: в процессе уже работают потоки (слушатель NOTIFY,
+        # планировщик REFRESH, QThreadPool), и fork скопировал бы захваченные
+        # ими блокировки logging / libpq / Qt. parse_chunk и его аргументы
+        # (строки, числа, кортежи) берутся из модуля заново в каждом воркере
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=ctx) as pool:
+            pending = []
+            it = iter(tasks)
+            for t in it:
+                pending.append(pool.submit(parse_chunk, t))
+                if len(pending) >= window:
+                    break
+            while pending:
+                fut = pending.pop(0)
+                nxt = next(it, None)
+                if nxt is not None:
+                    pending.append(pool.submit(parse_chunk, nxt))
+                yield fut.result()
+
+    # проверки
+    def _not_rejected(self):
+        return sql.SQL(
+            "NOT EXISTS (SELECT 1 FROM _import_rejects r "
+            "WHERE r.chunk_no = s.chunk_no AND r.line_no = s.line_no)"
+        )
+
+    def _validate_types(self, cur, conn, names, cols):
+        cur.execute("SHOW server_version_num")
+        ver = int(cur.fetchone()[0])
+        if ver >= 160000:
+            is_valid = "pg_input_is_valid"
+        else:
+            cur.execute(
+                """
+                CREATE OR REPLACE FUNCTION pg_temp.import_is_valid(val text, typ text)
+                RETURNS boolean AS $$
+                BEGIN
+                    EXECUTE format('SELECT %L::%s', val, typ);
+                    RETURN true;
+                EXCEPTION WHEN others THEN
+                    RETURN false;
+                END
+                $$ LANGUAGE plpgsql;
+                """
+            )
+            is_valid = "pg_temp.import_is_valid"
+
+        for n in names:
+            col = cols.get(n)
+            if col is None:
+                continue
+            cur.execute(
+                sql.SQL(
+                    "INSERT INTO _import_rejects "
+                    "SELECT s.chunk_no, s.line_no, {reason} FROM _import_stage s "
+                    "WHERE s.{col} IS NOT NULL AND NOT {fn}(s.{col}, %s)"
+                ).format(
+                    reason=sql.Literal(f"{n}: не приводится к типу {col['full_type']}"),
+                    col=sql.Identifier(n),
+                    fn=sql.SQL(is_valid),
+                ),
+                (col["full_type"],),
+            )
+
+    def _resolve_lookups(self, cur, lookups):
+        for fk_col, ref_table, ref_col, lookup_col in lookups:
+            cur.execute(
+                sql.SQL("ALTER TABLE _import_stage ADD COLUMN {fk} text").format(
+                    fk=sql.Identifier(fk_col)
+                )
+            )
+            cur.execute(
+                sql.SQL(
+                    "UPDATE _import_stage s SET {fk} = ref.{ref_col}::text "
+                    "FROM {ref} ref WHERE ref.{lk}::text = s.{lk}"
+                ).format(
+                    fk=sql.Identifier(fk_col),
+                    ref_col=sql.Identifier(ref_col),
+                    ref=sql.Identifier(ref_table),
+                    lk=sql.Identifier(lookup_col),
+                )
+            )
+            cur.execute(
+                sql.SQL(
+                    "INSERT INTO _import_rejects "
+                    "SELECT s.chunk_no, s.line_no, {lbl} || s.{lk} FROM _import_stage s "
+                    "WHERE s.{lk} IS NOT NULL AND s.{fk} IS NULL"
+                ).format(
+                    lbl=sql.Literal(f"{ref_table}: не найдено {lookup_col} = "),
+                    lk=sql.Identifier(lookup_col),
+                    fk=sql.Identifier(fk_col),
+                )
+            )
+
+    def _validate_fks(self, cur, names):
+        for fk in self.db.catalog.foreign_keys(self.table):
+            if fk["column"] not in names:
+                continue
+            cur.execute(
+                sql.SQL(
+                    "INSERT INTO _import_rejects "
+                    "SELECT s.chunk_no, s.line_no, {lbl} || s.{col} FROM _import_stage s "
+                    "WHERE s.{col} IS NOT NULL AND {ok} "
+                    "AND NOT EXISTS (SELECT 1 FROM {ref} ref WHERE ref.{ref_col}::text = s.{col})"
+                ).format(
+                    lbl=sql.Literal(f"{fk['column']}: нет в {fk['ref_table']}: "),
+                    col=sql.Identifier(fk["column"]),
+                    ok=self._not_rejected(),
+                    ref=sql.Identifier(fk["ref_table"]),
+                    ref_col=sql.Identifier(fk["ref_column"]),
+                )
+            )
+
+    def _validate_not_null(self, cur, names, cols, lookups):
+        check_cols = [n for n in names if n in cols] + [lk[0] for lk in lookups]
+        for n in check_cols:
+            if cols[n]["is_nullable"] != "NO":
+                continue
+            cur.execute(
+                sql.SQL(
+                    "INSERT INTO _import_rejects "
+                    "SELECT s.chunk_no, s.line_no, {lbl} FROM _import_stage s "
+                    "WHERE s.{col} IS NULL AND {ok}"
+                ).format(
+                    lbl=sql.Literal(f"{n}: пустое значение в обязательной колонке"),
+                    col=sql.Identifier(n),
+                    ok=self._not_rejected(),
+                )
+            )
+
+    def _typed_select(self, names, cols, lookups):
+        """SELECT с приведёнными к типам колонками таблицы (без отклонённых строк)."""
+        parts = [sql.SQL("s.chunk_no"), sql.SQL("s.line_no")]
+        for n in [n for n in names if n in cols] + [lk[0] for lk in lookups]:
+            parts.append(
+                sql.SQL("s.{col}::{typ} AS {col}").format(
+                    col=sql.Identifier(n), typ=sql.SQL(cols[n]["full_type"])
+                )
+            )
+        # OFFSET 0 не даёт планировщику поднять внешние условия выше фильтра,
+        # иначе приведение типов сработало бы и на отклонённых строках
+        return sql.SQL("SELECT {parts} FROM _import_stage s WHERE {ok} OFFSET 0").format(
+            parts=sql.SQL(", ").join(parts), ok=self._not_rejected()
+        )
+
+    def _validate_checks(self, cur, names, cols, lookups):
+        present = set(n for n in names if n in cols) | {lk[0] for lk in lookups}
+        typed = self._typed_select(names, cols, lookups)
+        for con in self.db.catalog.constraints(self.table, ("c",)):
+            if not con["check_clause"] or not set(con["columns"]) <= present:
+                continue
+            cur.execute(
+                sql.SQL(
+                    "INSERT INTO _import_rejects "
+                    "SELECT t.chunk_no, t.line_no, {lbl} FROM ({typed}) t "
+                    "WHERE NOT ({clause})"
+                ).format(
+                    lbl=sql.Literal(f"нарушено ограничение {con['constraint_name']}"),
+                    typed=typed,
+                    clause=sql.SQL(con["check_clause"]),
+                )
+            )
+
+    def _merge(self, cur, names, cols, lookups, targets) -> tuple[int, int]:
+        typed = self._typed_select(names, cols, lookups)
+        target_sql = sql.SQL(", ").join(sql.Identifier(n) for n in targets)
+
+        if self.conflict_columns:
+            key_sql = sql.SQL(", ").join(sql.Identifier(c) for c in self.conflict_columns)
+            # при дублях ключа внутри файла побеждает последняя строка
+            source = sql.SQL(
+                "SELECT DISTINCT ON ({key}) {cols} FROM ({typed}) t "
+                "ORDER BY {key}, t.chunk_no DESC, t.line_no DESC"
+            ).format(key=key_sql, cols=target_sql, typed=typed)
+        else:
+            source = sql.SQL("SELECT {cols} FROM ({typed}) t").format(
+                cols=target_sql, typed=typed
+            )
+
+        q = sql.SQL("INSERT INTO {tbl} ({cols}) {src}").format(
+            tbl=sql.Identifier(self.table), cols=target_sql, src=source
+        )
+        if self.conflict_columns and self.on_conflict == "nothing":
+            q += sql.SQL(" ON CONFLICT ({key}) DO NOTHING").format(key=key_sql)
+        elif self.conflict_columns and self.on_conflict == "update":
+            upd = [c for c in targets if c not in self.conflict_columns]
+            if upd:
+                q += sql.SQL(" ON CONFLICT ({key}) DO UPDATE SET {sets}").format(
+                    key=key_sql,
+                    sets=sql.SQL(", ").join(
+                        sql.SQL("{c} = EXCLUDED.{c}").format(c=sql.Identifier(c)) for c in upd
+                    ),
+                )
+            else:
+                q += sql.SQL(" ON CONFLICT ({key}) DO NOTHING").format(key=key_sql)
+
+        # xmax = 0 у только что вставленных строк, у обновлённых — нет
+        q = sql.SQL(
+            "WITH m AS ({q} RETURNING (xmax = 0) AS ins) "
+            "SELECT count(*) FILTER (WHERE ins), count(*) FILTER (WHERE NOT ins) FROM m"
+        ).format(q=q)
+        cur.execute(q)
+        inserted, updated = cur.fetchone()
+        return inserted, updated
+
+    def _collect_report(self, cur, chunk_lines: dict[int, int], first_line: int) -> dict:
+        # номер строки в файле = шапка + строки предыдущих кусков + номер в куске
+        offsets = {}
+        acc = first_line
+        for chunk_no in sorted(chunk_lines):
+            offsets[chunk_no] = acc
+            acc += chunk_lines[chunk_no]
+
+        cur.execute("SELECT count(DISTINCT (chunk_no, line_no)) FROM _import_rejects")
+        rejected = cur.fetchone()[0]
+
+        cur.execute(
+            "SELECT chunk_no, line_no, string_agg(reason, '; ') "
+            "FROM _import_rejects GROUP BY chunk_no, line_no "
+            "ORDER BY chunk_no, line_no LIMIT %s",
+            (REJECTS_REPORT_LIMIT,),
+        )
+        rows = [
+            {"line": offsets.get(chunk_no, 0) + line_no, "reason": reason}
+            for chunk_no, line_no, reason in cur.fetchall()
+        ]
+        return {"rejected": rejected, "rejects": rows}
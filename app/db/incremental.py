@@ -0,0 +1,235 @@
+import json
+import os
+
+from app.log.log import app_logger
+
+
+def _ident(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _literal(text: str) -> str:
+    return "'" + text.replace("'", "''") + "'"
+
+
+class IncrementalViews:
+    """Агрегатные представления из DataWindow с инкрементальным обновлением.
+
+    Представление хранится обычной таблицей (MATERIALIZED VIEW нельзя менять
+    построчно), а его определение — в реестре mv_incremental (incremental.sql).
+    Триггеры на базовых таблицах пишут id изменённых строк и их прежний вид
+    в mv_delta_log. refresh() забирает журнал, находит затронутые группы —
+    по новым строкам и по прежним (jsonb_populate_record) — и пересчитывает
+    только их: DELETE затронутых групп и INSERT тем же запросом с условием
+    на ключ группы.
+
+    Подходит запрос вида: две таблицы через INNER JOIN, обычный GROUP BY,
+    агрегат, WHERE / HAVING без подзапросов к другим таблицам; у обеих
+    таблиц должна быть колонка id.
+    """
+
+    def __init__(self, db):
+        self.db = db
+
+    # определение
+    @staticmethod
+    def build_query(spec: dict, extra_where: list[str] | None = None) -> str:
+        t1, t2 = spec["table1"], spec["table2"]
+        cols = ", ".join(spec["group_cols"] + [spec["aggregate"]])
+        q = (
+            f"SELECT {cols} FROM {t1} INNER JOIN {t2} "
+            f"ON {t1}.{spec['col1']} = {t2}.{spec['col2']}"
+        )
+        where = list(spec.get("where") or []) + list(extra_where or [])
+        if where:
+            q += " WHERE " + " AND ".join(where)
+        q += " GROUP BY " + ", ".join(spec["group_cols"])
+        if spec.get("having"):
+            q += " HAVING " + " AND ".join(spec["having"])
+        return q
+
+    @staticmethod
+    def _keys_query(spec: dict, src1: str, src2: str) -> str:
+        # ключи групп, в которые попадают строки из src1 JOIN src2
+        t1, t2 = spec["table1"], spec["table2"]
+        keys = ", ".join(f"{g} AS k{i}" for i, g in enumerate(spec["group_cols"]))
+        q = (
+            f"SELECT {keys} FROM {src1} AS {t1} INNER JOIN {src2} AS {t2} "
+            f"ON {t1}.{spec['col1']} = {t2}.{spec['col2']}"
+        )
+        if spec.get("where"):
+            q += " WHERE " + " AND ".join(spec["where"])
+        return q
+
+    def check_spec(self, spec: dict):
+        for t in (spec["table1"], spec["table2"]):
+            if "id" not in self.db.catalog.column_names(t):
+                raise ValueError(f"у таблицы {t} нет колонки id — журнал изменений не построить")
+        if spec["table1"] == spec["table2"]:
+            raise ValueError("соединение таблицы с собой не поддерживается")
+        if not spec["group_cols"]:
+            raise ValueError("нужна хотя бы одна колонка группировки")
+
+    # реестр
+    def _installed(self, cur) -> bool:
+        cur.execute("SELECT to_regclass('public.mv_incremental') IS NOT NULL AS ok")
+        return cur.fetchone()["ok"]
+
+    def names(self) -> list[str]:
+        with self.db.read_cursor() as cur:
+            if not self._installed(cur):
+                return []
+            cur.execute("SELECT name FROM mv_incremental ORDER BY name")
+            return [r["name"] for r in cur.fetchall()]
+
+    def get(self, name: str) -> dict | None:
+        with self.db.read_cursor() as cur:
+            if not self._installed(cur):
+                return None
+            cur.execute(
+                "SELECT name, spec, base_tables, key_columns, refreshed_at, "
+                "(SELECT count(*) FROM mv_delta_log l WHERE l.view_name = v.name) AS pending "
+                "FROM mv_incremental v WHERE name = %s",
+                (name,),
+            )
+            return cur.fetchone()
+
+    def create(self, name: str, spec: dict):
+        self.check_spec(spec)
+        path = os.path.join(os.path.dirname(__file__), "incremental.sql")
+        with open(path, "r", encoding="utf-8") as f:
+            script = f.read()
+
+        tables = [spec["table1"], spec["table2"]]
+        with self.db.transaction() as cur:
+            cur.execute(script)
+            cur.execute(f"CREATE TABLE {_ident(name)} AS {self.build_query(spec)}")
+            cur.execute(f"SELECT * FROM {_ident(name)} LIMIT 0")
+            keys = [d.name for d in cur.description][:len(spec["group_cols"])]
+            cur.execute(
+                f"CREATE INDEX {_ident(('ix_' + name + '_key')[:63])} ON {_ident(name)} "
+                f"({', '.join(_ident(k) for k in keys)})"
+            )
+            cur.execute(
+                "INSERT INTO mv_incremental (name, spec, base_tables, key_columns, refreshed_at) "
+                "VALUES (%s, %s, %s, %s, now())",
+                (name, json.dumps(spec, ensure_ascii=False), tables, keys),
+            )
+            for t in tables:
+                cur.execute("SELECT mv_track_table(%s)", (t,))
+        self.db.invalidate_catalog()
+        app_logger.info(f"incremental view {name} created on {', '.join(tables)}")
+
+    def drop(self, name: str):
+        with self.db.transaction() as cur:
+            cur.execute(f"DROP TABLE IF EXISTS {_ident(name)} CASCADE")
+            if self._installed(cur):
+                cur.execute("DELETE FROM mv_incremental WHERE name = %s", (name,))
+        self.db.invalidate_catalog()
+
+    # обновление
+    def refresh(self, name: str) -> dict:
+        """Пересчитать группы, затронутые изменениями из журнала.
+
+        Возвращает {"changes": строк журнала, "groups": затронутых групп}.
+        """
+        with self.db.transaction() as cur:
+            # два обновления одного представления — по очереди
+            cur.execute(
+                "SELECT spec, key_columns FROM mv_incremental WHERE name = %s FOR UPDATE",
+                (name,),
+            )
+            row = cur.fetchone()
+            if row is None:
+                raise ValueError(f"{name} — не инкрементальное представление")
+            spec, view_keys = row["spec"], row["key_columns"]
+
+            # видимые нам строки журнала; закоммиченные позже останутся до следующего раза
+            cur.execute(
+                "CREATE TEMP TABLE _mv_delta ON COMMIT DROP AS "
+                "WITH d AS (DELETE FROM mv_delta_log WHERE view_name = %s "
+                "RETURNING table_name, row_id, old_row) SELECT * FROM d",
+                (name,),
+            )
+            cur.execute(
+                "SELECT table_name, count(*) AS n, count(old_row) AS old "
+                "FROM _mv_delta GROUP BY table_name"
+            )
+            delta = {r["table_name"]: r for r in cur.fetchall()}
+            changes = sum(r["n"] for r in delta.values())
+
+            groups = 0
+            if changes:
+                groups = self._apply(cur, name, spec, view_keys, delta)
+
+            cur.execute("UPDATE mv_incremental SET refreshed_at = now() WHERE name = %s", (name,))
+
+        if changes:
+            self.db.invalidate_table(name)
+        app_logger.info(f"incremental refresh {name}: {changes} changes, {groups} groups")
+        return {"changes": changes, "groups": groups}
+
+    def _apply(self, cur, name: str, spec: dict, view_keys: list[str], delta: dict) -> int:
+        t1, t2 = spec["table1"], spec["table2"]
+
+        def changed(t):
+            return (f"(SELECT * FROM {t} WHERE id IN "
+                    f"(SELECT row_id FROM _mv_delta WHERE table_name = {_literal(t)}))")
+
+        def old(t):
+            return (f"(SELECT (jsonb_populate_record(NULL::{t}, old_row)).* FROM _mv_delta "
+                    f"WHERE table_name = {_literal(t)} AND old_row IS NOT NULL)")
+
+        # новые строки с текущими соседями, прежние строки с текущими
+        # соседями и прежние с прежними — если менялись обе таблицы
+        parts = []
+        if t1 in delta:
+            parts.append(self._keys_query(spec, changed(t1), t2))
+            if delta[t1]["old"]:
+                parts.append(self._keys_query(spec, old(t1), t2))
+        if t2 in delta:
+            parts.append(self._keys_query(spec, t1, changed(t2)))
+            if delta[t2]["old"]:
+                parts.append(self._keys_query(spec, t1, old(t2)))
+        if t1 in delta and t2 in delta and delta[t1]["old"] and delta[t2]["old"]:
+            parts.append(self._keys_query(spec, old(t1), old(t2)))
+
+        cur.execute("CREATE TEMP TABLE _mv_keys ON COMMIT DROP AS " + " UNION ".join(parts))
+        cur.execute("SELECT count(*) AS n FROM _mv_keys")
+        groups = cur.fetchone()["n"]
+        if not groups:
+            return 0
+
+        k = [f"k{i}" for i in range(len(view_keys))]
+        keys_row = ", ".join(k)
+        group_row = ", ".join(spec["group_cols"])
+        view_row = ", ".join(_ident(c) for c in view_keys)
+        view = _ident(name)
+
+        # ключи без NULL — через IN (хэш-соединение, индекс по ключу)
+        cur.execute(f"DELETE FROM {view} WHERE ({view_row}) IN (SELECT {keys_row} FROM _mv_keys)")
+        cur.execute(
+            f"INSERT INTO {view} "
+            + self.build_query(spec, [f"({group_row}) IN (SELECT {keys_row} FROM _mv_keys)"])
+        )
+
+        # с NULL в ключе IN не сработает: такие группы сравниваем IS NOT DISTINCT FROM
+        has_null = " OR ".join(f"{c} IS NULL" for c in k)
+        cur.execute(f"SELECT EXISTS (SELECT 1 FROM _mv_keys WHERE {has_null}) AS yes")
+        if cur.fetchone()["yes"]:
+            def same(exprs):
+                return " AND ".join(
+                    f"k.{c} IS NOT DISTINCT FROM {e}" for c, e in zip(k, exprs)
+                )
+
+            k_null = " OR ".join(f"k.{c} IS NULL" for c in k)
+            null_keys = f"SELECT 1 FROM _mv_keys k WHERE ({k_null}) AND "
+            cur.execute(
+                f"DELETE FROM {view} v WHERE EXISTS ("
+                + null_keys + same([f"v.{_ident(c)}" for c in view_keys]) + ")"
+            )
+            cur.execute(
+                f"INSERT INTO {view} "
+                + self.build_query(spec, [f"EXISTS ({null_keys}{same(spec['group_cols'])})"])
+            )
+        return groups
@@ -0,0 +1,77 @@
+-- инкрементальные агрегатные представления (см. incremental.py):
+-- реестр представлений и журнал изменённых строк их базовых таблиц.
+-- Скрипт можно выполнять повторно.
+
+CREATE TABLE IF NOT EXISTS mv_incremental (
+  name TEXT PRIMARY KEY,
+  spec JSONB NOT NULL,            -- таблицы, JOIN, WHERE, группировка, агрегат
+  base_tables TEXT[] NOT NULL,
+  key_columns TEXT[] NOT NULL,    -- колонки представления с ключом группы
+  refreshed_at TIMESTAMPTZ,
+  created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+-- строка на (представление, изменённая строка базовой таблицы);
+-- обновление представления забирает свои строки DELETE ... RETURNING
+CREATE TABLE IF NOT EXISTS mv_delta_log (
+  id BIGSERIAL PRIMARY KEY,
+  view_name TEXT NOT NULL REFERENCES mv_incremental(name) ON DELETE CASCADE,
+  table_name TEXT NOT NULL,
+  row_id INT NOT NULL,
+  old_row JSONB                   -- строка до изменения (UPDATE / DELETE)
+);
+
+CREATE INDEX IF NOT EXISTS ix_mv_delta_log_view ON mv_delta_log (view_name);
+
+
+CREATE OR REPLACE FUNCTION mv_log_changes() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        INSERT INTO mv_delta_log (view_name, table_name, row_id, old_row)
+        SELECT v.name, TG_TABLE_NAME, o.id, to_jsonb(o)
+        FROM old_rows o
+        CROSS JOIN mv_incremental v
+        WHERE TG_TABLE_NAME = ANY(v.base_tables);
+    END IF;
+
+    -- у UPDATE новая строка находится по тому же id; отдельно — только смена id
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO mv_delta_log (view_name, table_name, row_id)
+        SELECT v.name, TG_TABLE_NAME, n.id
+        FROM new_rows n
+        CROSS JOIN mv_incremental v
+        WHERE TG_TABLE_NAME = ANY(v.base_tables);
+    ELSIF TG_OP = 'UPDATE' THEN
+        INSERT INTO mv_delta_log (view_name, table_name, row_id)
+        SELECT v.name, TG_TABLE_NAME, n.id
+        FROM new_rows n
+        CROSS JOIN mv_incremental v
+        WHERE TG_TABLE_NAME = ANY(v.base_tables)
+          AND n.id NOT IN (SELECT id FROM old_rows);
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+
+-- включить журнал для таблицы (у неё должна быть колонка id)
+CREATE OR REPLACE FUNCTION mv_track_table(t TEXT) RETURNS void AS $$
+BEGIN
+    EXECUTE format('DROP TRIGGER IF EXISTS trg_%s_mv_log_ins ON %I', t, t);
+    EXECUTE format('DROP TRIGGER IF EXISTS trg_%s_mv_log_upd ON %I', t, t);
+    EXECUTE format('DROP TRIGGER IF EXISTS trg_%s_mv_log_del ON %I', t, t);
+
+    EXECUTE format(
+        'CREATE TRIGGER trg_%s_mv_log_ins AFTER INSERT ON %I '
+        'REFERENCING NEW TABLE AS new_rows '
+        'FOR EACH STATEMENT EXECUTE FUNCTION mv_log_changes()', t, t);
+    EXECUTE format(
+        'CREATE TRIGGER trg_%s_mv_log_upd AFTER UPDATE ON %I '
+        'REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows '
+        'FOR EACH STATEMENT EXECUTE FUNCTION mv_log_changes()', t, t);
+    EXECUTE format(
+        'CREATE TRIGGER trg_%s_mv_log_del AFTER DELETE ON %I '
+        'REFERENCING OLD TABLE AS old_rows '
+        'FOR EACH STATEMENT EXECUTE FUNCTION mv_log_changes()', t, t);
+END
+$$ LANGUAGE plpgsql;
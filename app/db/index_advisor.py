@@ -0,0 +1,200 @@
+import threading
+
+from app.log.log import app_logger
+
+
+# как колонку использовали в запросе и насколько индекс это ускоряет
+KINDS = {
+    "filter": ("фильтр", 1.0),
+    "join": ("JOIN", 0.8),
+    "search": ("поиск по подстроке", 1.0),
+    "sort": ("сортировка", 0.5),
+    "group": ("группировка", 0.3),
+}
+
+_TEXT_TYPES = ("character varying", "text", "character")
+
+class IndexAdvisor:
+    """Советник индексов по колонкам, которые окна фильтруют и сортируют.
+
+    Окна вызывают note() при выполнении запроса; proposals() сверяет
+    накопленное с индексами из pg_index (через SchemaCatalog) и предлагает
+    CREATE INDEX: btree для фильтров / JOIN / сортировки, GIN для массивов
+    и триграммный GIN для поиска по подстроке. Оценка выгоды — по размеру
+    таблицы, селективности колонки (pg_stats) и доле seq scan.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self._lock = threading.Lock()
+        self._usage: dict[tuple[str, str, str], int] = {}  # (таблица, колонка, вид) -> раз
+
+    # сбор использования
+    def note(self, table: str, column: str, kind: str):
+        if kind not in KINDS:
+            raise ValueError(f"неизвестный вид использования: {kind!r}")
+        # только настоящие колонки таблиц: алиасы и выражения пропускаем
+        if self.db.catalog.relkind(table) not in ("r", "p"):
+            return
+        if column not in self.db.catalog.column_names(table):
+            return
+        with self._lock:
+            key = (table, column, kind)
+            self._usage[key] = self._usage.get(key, 0) + 1
+
+    def note_ref(self, ref: str, kind: str):
+        """Колонка в виде table.column (как в DataWindow)."""
+        parts = ref.replace('"', "").strip().split(".")
+        if len(parts) == 2:
+            self.note(parts[0], parts[1], kind)
+
+    def reset(self):
+        with self._lock:
+            self._usage.clear()
+
+    # предложения
+    def _method(self, table: str, column: str, kind: str) -> str | None:
+        data_type = self.db.catalog.column_type(table, column) or ""
+        if data_type == "ARRAY":
+            return "gin"
+        if kind == "search":
+            # ILIKE '%..%' помогает только триграммный индекс по текстовой колонке
+            return "trgm" if data_type in _TEXT_TYPES else None
+        return "btree"
+
+    def _covered(self, table: str, column: str, method: str) -> bool:
+        for idx in self.db.catalog.indexes(table):
+            if not idx["is_valid"] or idx["is_partial"]:
+                continue
+            cols = idx["columns"]
+            if method == "btree" and idx["method"] == "btree" and cols[:1] == [column]:
+                return True
+            if method == "gin" and idx["method"] == "gin" and column in cols:
+                return True
+        return method == "trgm" and self.db.catalog.has_trgm_index(table, column)
+
+    def _stats(self, tables: list[str]):
+        with self.db.read_cursor() as cur:
+            cur.execute(
+                """
+                SELECT c.relname, c.reltuples, c.relpages,
+                       COALESCE(s.seq_scan, 0) AS seq_scan,
+                       COALESCE(s.idx_scan, 0) AS idx_scan
+                FROM pg_catalog.pg_class c
+                JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+                LEFT JOIN pg_stat_user_tables s ON s.relid = c.oid
+                WHERE n.nspname = 'public' AND c.relname = ANY(%s);
+                """,
+                (tables,),
+            )
+            rel = {r["relname"]: r for r in cur.fetchall()}
+            cur.execute(
+                """
+                SELECT tablename, attname, n_distinct
+                FROM pg_stats
+                WHERE schemaname = 'public' AND tablename = ANY(%s);
+                """,
+                (tables,),
+            )
+            distinct = {(r["tablename"], r["attname"]): r["n_distinct"] for r in cur.fetchall()}
+        return rel, distinct
+
+    def proposals(self) -> list[dict]:
+        """Недостающие индексы, самые выгодные первыми.
+
+        Элемент: table, column, method, name, uses {вид: раз}, reason,
+        score, statements (список SQL для execute_autocommit).
+        """
+        with self._lock:
+            usage = dict(self._usage)
+
+        # одна колонка может дать два индекса: btree (фильтр) и trgm (поиск)
+        by_index: dict[tuple[str, str, str], dict[str, int]] = {}
+        for (table, column, kind), n in usage.items():
+            method = self._method(table, column, kind)
+            if method is not None:
+                by_index.setdefault((table, column, method), {})[kind] = n
+        if not by_index:
+            return []
+
+        rel, distinct = self._stats(sorted({t for t, _, _ in by_index}))
+
+        res = []
+        for (table, column, method), uses in by_index.items():
+            if self._covered(table, column, method):
+                continue
+
+            r = rel.get(table) or {}
+            rows = max(r.get("reltuples") or 0, 0)  # -1 — таблицу ещё не анализировали
+            pages = max(r.get("relpages") or 0, 1)
+            seq, idx = r.get("seq_scan", 0), r.get("idx_scan", 0)
+
+            # доля строк на одно значение: 1 / число различных значений
+            nd = distinct.get((table, column))
+            if nd is None:
+                nd = 10
+            elif nd < 0:
+                nd = -nd * rows
+            selectivity = 1 / max(nd, 1)
+
+            weight = sum(n * KINDS[k][1] for k, n in uses.items())
+            if method == "btree":
+                saved = pages * (1 - selectivity)
+            else:
+                saved = pages * 0.9
+            score = weight * saved * (1 + seq / (seq + idx + 1))
+
+            # секционированная таблица не поддерживает CREATE INDEX CONCURRENTLY
+            concurrently = self.db.catalog.relkind(table) != "p"
+            name, statements = self._statements(table, column, method, concurrently)
+            res.append({
+                "table": table,
+                "column": column,
+                "method": method,
+                "name": name,
+                "uses": uses,
+                "reason": ", ".join(f"{KINDS[k][0]} ×{n}" for k, n in sorted(uses.items())),
+                "score": round(score, 1),
+                "statements": statements,
+            })
+
+        res.sort(key=lambda p: p["score"], reverse=True)
+        return res
+
+    @staticmethod
+    def _statements(table: str, column: str, method: str, concurrently: bool = True):
+        suffix = {"btree": "", "gin": "_gin", "trgm": "_trgm"}[method]
+        name = f"ix_{table}_{column}{suffix}"[:63]
+        mode = "CONCURRENTLY " if concurrently else ""
+        head = f'CREATE INDEX {mode}IF NOT EXISTS "{name}" ON public."{table}"'
+        if method == "btree":
+            return name, [f'{head} ("{column}")']
+        if method == "gin":
+            return name, [f'{head} USING gin ("{column}")']
+        return name, [
+            "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+            f'{head} USING gin ("{column}" gin_trgm_ops)',
+        ]
+
+    def create_for(self, table: str, column: str, method: str, reason: str) -> str:
+        """Создать индекс без накопленной статистики (например, при установке схемы)."""
+        concurrently = self.db.catalog.relkind(table) != "p"
+        name, statements = self._statements(table, column, method, concurrently)
+        self.create({"table": table, "name": name, "reason": reason, "statements": statements})
+        return name
+
+    def create(self, proposal: dict):
+        try:
+            self.db.execute_autocommit(proposal["statements"])
+        except Exception:
+            # неудачный CONCURRENTLY оставляет INVALID-индекс — убираем его
+            if self.db.catalog.relkind(proposal["table"]) == "p":
+                raise
+            try:
+                self.db.execute_autocommit(
+                    [f'DROP INDEX CONCURRENTLY IF EXISTS public."{proposal["name"]}"']
+                )
+            except Exception as e:
+                app_logger.error(f"Не удалось удалить недостроенный индекс {proposal['name']}: {e}")
+            raise
+        app_logger.info(f"index created by advisor: {proposal['name']} ({proposal['reason']})")
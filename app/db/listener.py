@@ -0,0 +1,115 @@
+import json
+import select
+import threading
+
+import psycopg2
+
+from app.log.log import app_logger
+
+
+# канал, в который пишут триггеры из notify.sql
+CHANNEL = "table_changes"
+
+# событие «могло измениться что угодно»: уведомления пропущены при обрыве связи
+ALL_TABLES = "*"
+
+
+class ChangeDispatcher:
+    """Рассылка изменений таблиц подписчикам.
+
+    callback(table, op, ids): op — INSERT / UPDATE / DELETE (или RESYNC
+    для ALL_TABLES), ids — список id строк или None, если строк слишком
+    много и нужно перечитать всё. Вызывается в потоке слушателя.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subs: list = []
+
+    def subscribe(self, callback):
+        with self._lock:
+            if callback not in self._subs:
+                self._subs.append(callback)
+
+    def unsubscribe(self, callback):
+        with self._lock:
+            if callback in self._subs:
+                self._subs.remove(callback)
+
+    def dispatch(self, table: str, op: str, ids: list | None):
+        with self._lock:
+            subs = list(self._subs)
+        for cb in subs:
+            try:
+                cb(table, op, ids)
+            except Exception as e:
+                app_logger.error(f"Ошибка обработчика изменений {table}: {e}")
+
+
+class ChangeListener(threading.Thread):
+    """Отдельное соединение с LISTEN table_changes в фоновом потоке.
+
+    Соединение не из пула: LISTEN живёт, пока живёт соединение. При обрыве
+    переподключается с нарастающей паузой и рассылает RESYNC — всё, что
+    пришло за время обрыва, потеряно.
+    """
+
+    def __init__(self, conn_params: dict, dispatcher: ChangeDispatcher,
+                 poll_interval: float = 1.0):
+        super().__init__(name="db-listener", daemon=True)
+        self.conn_params = dict(conn_params)
+        self.dispatcher = dispatcher
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._connected_once = False
+
+    def stop(self, timeout: float = 2.0):
+        self._stop.set()
+        if self.is_alive():
+            self.join(timeout)
+
+    def run(self):
+        delay = 1.0
+        while not self._stop.is_set():
+            try:
+                self._listen()
+                delay = 1.0
+            except Exception as e:
+                if self._stop.is_set():
+                    break
+                app_logger.error(f"LISTEN {CHANNEL}: соединение потеряно ({e}), повтор через {delay:.0f} с")
+                self._stop.wait(delay)
+                delay = min(delay * 2, 30.0)
+
+    def _listen(self):
+        conn = psycopg2.connect(**self.conn_params)
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                cur.execute(f"LISTEN {CHANNEL}")
+            app_logger.info(f"LISTEN {CHANNEL}")
+
+            if self._connected_once:
+                self.dispatcher.dispatch(ALL_TABLES, "RESYNC", None)
+            self._connected_once = True
+
+            while not self._stop.is_set():
+                # ждём данных на сокете, не чаще poll_interval проверяем stop
+                if select.select([conn], [], [], self.poll_interval) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    self._handle(conn.notifies.pop(0).payload)
+        finally:
+            conn.close()
+
+    def _handle(self, payload: str):
+        try:
+            data = json.loads(payload)
+            table = data["table"]
+            op = data["op"]
+            ids = data.get("ids")
+        except (ValueError, KeyError, TypeError) as e:
+            app_logger.error(f"NOTIFY {CHANNEL}: непонятное сообщение {payload!r}: {e}")
+            return
+        self.dispatcher.dispatch(table, op, ids)
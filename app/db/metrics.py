@@ -0,0 +1,331 @@
+import json
+import re
+import threading
+import time
+from datetime import datetime
+
+import psycopg2.extensions
+import psycopg2.extras
+from psycopg2 import sql
+
+from app.log.log import app_logger, slow_logger
+
+
+# границы корзин гистограммы задержек, мс (последняя — всё, что дольше)
+BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, float("inf"))
+
+# сколько разных отпечатков держать; остальные копятся в OTHER
+MAX_FINGERPRINTS = 500
+OTHER = "<прочие запросы>"
+
+# для оценки объёма смотрим только первые строки пачки
+_SIZE_SAMPLE = 20
+
+_STR_RE = re.compile(r"'(?:[^']|'')*'")
+_NUM_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WS_RE = re.compile(r"\s+")
+
+
+def fingerprint(query: str) -> str:
+    """Запрос без литералов: одинаковые по форме запросы копятся вместе."""
+    q = _STR_RE.sub("?", query)
+    q = _NUM_RE.sub("?", q)
+    q = q.replace("%s", "?")
+    q = _LIST_RE.sub("(?, ...)", q)
+    q = _WS_RE.sub(" ", q).strip()
+    while q.endswith(";"):
+        q = q[:-1].rstrip()
+    return q
+
+
+def _row_bytes(row) -> int:
+    values = row.values() if isinstance(row, dict) else row
+    return sum(len(str(v)) for v in values if v is not None)
+
+
+def _estimate_bytes(rows) -> int:
+    if not rows:
+        return 0
+    sample = rows[:_SIZE_SAMPLE]
+    return sum(_row_bytes(r) for r in sample) * len(rows) // len(sample)
+
+
+class LatencyHistogram:
+    """Счётчики по корзинам BUCKETS_MS плюс сумма и максимум."""
+
+    __slots__ = ("counts", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS_MS)
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, ms: float):
+        for i, bound in enumerate(BUCKETS_MS):
+            if ms <= bound:
+                self.counts[i] += 1
+                break
+        self.total += ms
+        self.max = max(self.max, ms)
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    def percentile(self, q: float) -> float:
+        """Верхняя граница корзины, в которую попадает q-й процентиль."""
+        n = self.count
+        if not n:
+            return 0.0
+        need = q / 100 * n
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= need:
+                return min(BUCKETS_MS[i], self.max)
+        return self.max
+
+
+class _QueryStats:
+    __slots__ = ("latency", "execute_ms", "fetch_ms", "render", "rows", "bytes", "errors")
+
+    def __init__(self):
+        self.latency = LatencyHistogram()  # execute + fetch
+        self.execute_ms = 0.0
+        self.fetch_ms = 0.0
+        self.render = LatencyHistogram()
+        self.rows = 0
+        self.bytes = 0
+        self.errors = 0
+
+
+class _InstrumentedCursor:
+    """Примесь к курсору psycopg2: время execute / fetch, строки и объём.
+
+    Замер запроса закрывается при следующем execute() или close() —
+    к этому моменту все fetch-и по нему уже сделаны.
+    """
+
+    metrics = None  # QueryMetrics, задаётся в QueryMetrics.__init__
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._rec = None
+
+    def execute(self, query, vars=None):
+        self._finish()
+        self._begin(query)
+        t0 = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        except Exception as e:
+            self._rec["error"] = str(e).strip()
+            raise
+        finally:
+            self._rec["execute"] += (time.perf_counter() - t0) * 1000
+
+    def executemany(self, query, vars_list):
+        self._finish()
+        self._begin(query)
+        t0 = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        except Exception as e:
+            self._rec["error"] = str(e).strip()
+            raise
+        finally:
+            self._rec["execute"] += (time.perf_counter() - t0) * 1000
+
+    def copy_expert(self, sql_, file, size=8192):
+        self._finish()
+        self._begin(sql_)
+        t0 = time.perf_counter()
+        try:
+            return super().copy_expert(sql_, file, size)
+        except Exception as e:
+            self._rec["error"] = str(e).strip()
+            raise
+        finally:
+            self._rec["execute"] += (time.perf_counter() - t0) * 1000
+
+    def fetchone(self):
+        t0 = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(t0, [] if row is None else [row])
+        return row
+
+    def fetchmany(self, size=None):
+        t0 = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._fetched(t0, rows)
+        return rows
+
+    def fetchall(self):
+        t0 = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(t0, rows)
+        return rows
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def _begin(self, query):
+        if isinstance(query, sql.Composable):
+            try:
+                query = query.as_string(self)
+            except Exception:
+                query = repr(query)
+        elif isinstance(query, bytes):
+            query = query.decode("utf-8", "replace")
+        self._rec = {"query": query, "execute": 0.0, "fetch": 0.0,
+                     "rows": 0, "bytes": 0, "fetched": False, "error": None}
+        self.metrics._set_last(query)
+
+    def _fetched(self, t0: float, rows):
+        rec = self._rec
+        if rec is None:
+            return
+        rec["fetch"] += (time.perf_counter() - t0) * 1000
+        rec["rows"] += len(rows)
+        rec["bytes"] += _estimate_bytes(rows)
+        rec["fetched"] = True
+
+    def _finish(self):
+        rec, self._rec = self._rec, None
+        if rec is None:
+            return
+        if not rec["fetched"] and self.rowcount > 0:
+            # INSERT / UPDATE / COPY — строк не читали, берём rowcount
+            rec["rows"] = self.rowcount
+        self.metrics.record(
+            rec["query"], rec["execute"], rec["fetch"], rec["rows"], rec["bytes"], rec["error"],
+        )
+
+
+class QueryMetrics:
+    """Замеры запросов по отпечаткам + журнал медленных запросов.
+
+    dict_cursor / tuple_cursor — фабрики курсоров для conn.cursor():
+    любой запрос через них попадает в статистику. Запрос дольше slow_ms
+    (execute + fetch) пишется строкой JSON в logs/slow_*.jsonl; туда же —
+    отрисовка результата в окне дольше slow_ms (record_render).
+    """
+
+    def __init__(self, slow_ms: float = 500.0):
+        self.slow_ms = slow_ms
+        self._lock = threading.Lock()
+        self._stats: dict[str, _QueryStats] = {}
+        self._local = threading.local()
+
+        self.dict_cursor = type(
+            "InstrumentedDictCursor",
+            (_InstrumentedCursor, psycopg2.extras.RealDictCursor),
+            {"metrics": self},
+        )
+        self.tuple_cursor = type(
+            "InstrumentedCursor",
+            (_InstrumentedCursor, psycopg2.extensions.cursor),
+            {"metrics": self},
+        )
+
+    def _set_last(self, query: str):
+        self._local.last = query
+
+    def reset_last(self):
+        # поток пула переходит к новой задаче
+        self._local.last = None
+
+    def last_fingerprint(self) -> str | None:
+        """Отпечаток последнего запроса, начатого в текущем потоке."""
+        query = getattr(self._local, "last", None)
+        return fingerprint(query) if query else None
+
+    def _slot(self, fp: str) -> _QueryStats:
+        st = self._stats.get(fp)
+        if st is None:
+            if len(self._stats) >= MAX_FINGERPRINTS:
+                fp = OTHER
+                st = self._stats.get(fp)
+            if st is None:
+                st = self._stats[fp] = _QueryStats()
+        return st
+
+    def record(self, query: str, execute_ms: float, fetch_ms: float,
+               rows: int, nbytes: int, error: str | None = None):
+        fp = fingerprint(query)
+        total = execute_ms + fetch_ms
+        with self._lock:
+            st = self._slot(fp)
+            st.latency.add(total)
+            st.execute_ms += execute_ms
+            st.fetch_ms += fetch_ms
+            st.rows += rows
+            st.bytes += nbytes
+            if error:
+                st.errors += 1
+
+        if total >= self.slow_ms:
+            self._log_slow({
+                "phase": "query",
+                "fingerprint": fp,
+                "sql": query[:2000],
+                "execute_ms": round(execute_ms, 1),
+                "fetch_ms": round(fetch_ms, 1),
+                "total_ms": round(total, 1),
+                "rows": rows,
+                "bytes": nbytes,
+                "error": error,
+            })
+
+    def record_render(self, fp: str | None, ms: float):
+        """Время, за которое окно применило результат (поток GUI)."""
+        if not fp:
+            return
+        with self._lock:
+            self._slot(fp).render.add(ms)
+        if ms >= self.slow_ms:
+            self._log_slow({"phase": "render", "fingerprint": fp, "render_ms": round(ms, 1)})
+
+    def _log_slow(self, entry: dict):
+        entry = {"ts": datetime.now().isoformat(timespec="milliseconds"), **entry}
+        slow_logger.info(json.dumps(entry, ensure_ascii=False, default=str))
+
+    def snapshot(self) -> list[dict]:
+        """Статистика по отпечаткам, самые затратные по суммарному времени — первыми."""
+        with self._lock:
+            res = []
+            for fp, st in self._stats.items():
+                n = st.latency.count
+                res.append({
+                    "fingerprint": fp,
+                    "calls": n,
+                    "total_ms": st.latency.total,
+                    "avg_ms": st.latency.total / n if n else 0.0,
+                    "p50_ms": st.latency.percentile(50),
+                    "p95_ms": st.latency.percentile(95),
+                    "max_ms": st.latency.max,
+                    "execute_ms": st.execute_ms,
+                    "fetch_ms": st.fetch_ms,
+                    "render_ms": st.render.total,
+                    "render_p95_ms": st.render.percentile(95),
+                    "rows": st.rows,
+                    "bytes": st.bytes,
+                    "errors": st.errors,
+                    "histogram": list(zip(BUCKETS_MS, st.latency.counts)),
+                })
+        res.sort(key=lambda r: r["total_ms"], reverse=True)
+        return res
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+    def log_summary(self, top: int = 10):
+        for s in self.snapshot()[:top]:
+            app_logger.info(
+                f"query stats: {s['calls']} calls, avg {s['avg_ms']:.1f} ms, "
+                f"p95 <= {s['p95_ms']:g} ms, max {s['max_ms']:.1f} ms, "
+                f"{s['rows']} rows, ~{s['bytes'] // 1024} KB | {s['fingerprint'][:160]}"
+            )
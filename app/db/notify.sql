@@ -0,0 +1,55 @@
+-- уведомления об изменениях строк для живого обновления окон (LISTEN table_changes).
+-- Триггеры уровня оператора: один NOTIFY на INSERT/UPDATE/DELETE с id строк,
+-- а не на каждую строку. Если строк больше 500, ids = null — «перечитать всё».
+-- Скрипт можно выполнять повторно.
+
+CREATE OR REPLACE FUNCTION notify_table_change() RETURNS trigger AS $$
+DECLARE
+    ids INT[];
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        SELECT array_agg(id) INTO ids FROM (SELECT id FROM old_rows LIMIT 501) s;
+    ELSE
+        SELECT array_agg(id) INTO ids FROM (SELECT id FROM new_rows LIMIT 501) s;
+    END IF;
+
+    IF ids IS NULL THEN
+        RETURN NULL;
+    END IF;
+    IF cardinality(ids) > 500 THEN
+        ids := NULL;
+    END IF;
+
+    PERFORM pg_notify(
+        'table_changes',
+        json_build_object('table', TG_TABLE_NAME, 'op', TG_OP, 'ids', ids)::text
+    );
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+
+DO $$
+DECLARE
+    t TEXT;
+BEGIN
+    FOREACH t IN ARRAY ARRAY['clients', 'rooms', 'stays'] LOOP
+        EXECUTE format('DROP TRIGGER IF EXISTS trg_%s_notify_ins ON %I', t, t);
+        EXECUTE format('DROP TRIGGER IF EXISTS trg_%s_notify_upd ON %I', t, t);
+        EXECUTE format('DROP TRIGGER IF EXISTS trg_%s_notify_del ON %I', t, t);
+
+        EXECUTE format(
+            'CREATE TRIGGER trg_%s_notify_ins AFTER INSERT ON %I '
+            'REFERENCING NEW TABLE AS new_rows '
+            'FOR EACH STATEMENT EXECUTE FUNCTION notify_table_change()', t, t);
+        EXECUTE format(
+            'CREATE TRIGGER trg_%s_notify_upd AFTER UPDATE ON %I '
+            'REFERENCING NEW TABLE AS new_rows '
+            'FOR EACH STATEMENT EXECUTE FUNCTION notify_table_change()', t, t);
+        EXECUTE format(
+            'CREATE TRIGGER trg_%s_notify_del AFTER DELETE ON %I '
+            'REFERENCING OLD TABLE AS old_rows '
+            'FOR EACH STATEMENT EXECUTE FUNCTION notify_table_change()', t, t);
+    END LOOP;
+END
+$$ LANGUAGE plpgsql;
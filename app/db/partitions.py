@@ -0,0 +1,285 @@
+import os
+import re
+from datetime import date
+
+from app.log.log import app_logger
+
+
+# шаг секционирования stays по check_in
+GRANULARITIES = {"month": "по месяцам", "year": "по годам"}
+
+DEFAULT_PARTITION = "stays_default"
+ARCHIVE_SCHEMA = "archive"
+
+_NAME_RE = re.compile(r"^stays_p(\d{4})(?:_(\d{2}))?$")
+_BOUND_RE = re.compile(r"FROM \('([^']+)'\) TO \('([^']+)'\)")
+
+_PARTITIONS_Q = """
+    SELECT c.relname AS name,
+           pg_catalog.pg_get_expr(c.relpartbound, c.oid) AS bound,
+           GREATEST(c.reltuples, 0)::bigint AS rows,
+           pg_catalog.pg_total_relation_size(c.oid) AS bytes
+    FROM pg_catalog.pg_inherits i
+    JOIN pg_catalog.pg_class c ON c.oid = i.inhrelid
+    WHERE i.inhparent = to_regclass('public.stays')
+    ORDER BY c.relname;
+"""
+
+# представления, которые читают stays: после пересоздания таблицы они
+# остались бы привязаны к старой
+_DEPENDENT_VIEWS_Q = """
+    SELECT DISTINCT v.relname
+    FROM pg_catalog.pg_depend d
+    JOIN pg_catalog.pg_rewrite r ON r.oid = d.objid
+    JOIN pg_catalog.pg_class v ON v.oid = r.ev_class
+    WHERE d.classid = 'pg_catalog.pg_rewrite'::regclass
+      AND d.refobjid = 'public.stays'::regclass
+      AND v.oid <> d.refobjid;
+"""
+
+# индексы stays, не связанные с ограничениями
+_PLAIN_INDEXES_Q = """
+    SELECT i.relname AS name, x.indisunique AS is_unique,
+           pg_catalog.pg_get_indexdef(x.indexrelid) AS definition
+    FROM pg_catalog.pg_index x
+    JOIN pg_catalog.pg_class i ON i.oid = x.indexrelid
+    WHERE x.indrelid = 'public.stays'::regclass
+      AND NOT EXISTS (SELECT 1 FROM pg_catalog.pg_constraint c WHERE c.conindid = x.indexrelid);
+"""
+
+
+def _period_start(day: date, granularity: str) -> date:
+    if granularity == "year":
+        return date(day.year, 1, 1)
+    return date(day.year, day.month, 1)
+
+
+def _next_period(start: date, granularity: str) -> date:
+    if granularity == "year":
+        return date(start.year + 1, 1, 1)
+    if start.month == 12:
+        return date(start.year + 1, 1, 1)
+    return date(start.year, start.month + 1, 1)
+
+
+def _partition_name(start: date, granularity: str) -> str:
+    if granularity == "year":
+        return f"stays_p{start.year}"
+    return f"stays_p{start.year}_{start.month:02d}"
+
+
+class StaysPartitions:
+    """Секционирование stays по диапазонам check_in (месяц или год).
+
+    convert() пересоздаёт stays как PARTITION BY RANGE (check_in) в одной
+    транзакции: колонки, умолчания и CHECK берутся LIKE-ом, внешние ключи
+    и обычные индексы переносятся, первичный ключ становится (id, check_in),
+    а ex_stays_room_period, если оно было, заменяет триггер
+    stays_check_overlap (partitions.sql). Строки вне секций попадают в stays_default.
+
+    ensure_future() заранее создаёт секции на ahead периодов вперёд,
+    detach() отсоединяет старую секцию (archive=True — и переносит её в
+    схему archive). Сводка daily_room_stats отсоединённые проживания
+    сохраняет до пересчёта.
+    """
+
+    def __init__(self, db):
+        self.db = db
+
+    # состояние
+    def is_partitioned(self) -> bool:
+        return self.db.catalog.relkind("stays") == "p"
+
+    def partitions(self) -> list[dict]:
+        """Секции: name, start, end (None у DEFAULT), is_default, rows, bytes."""
+        with self.db.read_cursor() as cur:
+            cur.execute(_PARTITIONS_Q)
+            rows = cur.fetchall()
+
+        res = []
+        for r in rows:
+            m = _BOUND_RE.search(r["bound"] or "")
+            res.append({
+                "name": r["name"],
+                "start": date.fromisoformat(m.group(1)) if m else None,
+                "end": date.fromisoformat(m.group(2)) if m else None,
+                "is_default": r["bound"] == "DEFAULT",
+                "rows": r["rows"],
+                "bytes": r["bytes"],
+            })
+        return res
+
+    def granularity(self) -> str | None:
+        found = None
+        for p in self.partitions():
+            m = _NAME_RE.match(p["name"])
+            if m:
+                found = "month" if m.group(2) else "year"
+                if found == "month":
+                    break
+        return found
+
+    # секции
+    def _create_partition(self, cur, start: date, granularity: str) -> str | None:
+        name = _partition_name(start, granularity)
+        end = _next_period(start, granularity)
+        cur.execute("SELECT to_regclass(%s) IS NOT NULL AS ok", (f"public.{name}",))
+        if cur.fetchone()["ok"]:
+            return None
+
+        # строки нового периода могли уже лечь в DEFAULT — без переноса ATTACH не пройдёт;
+        # перенос идёт мимо родительской таблицы, её триггеры не срабатывают
+        cur.execute(f'CREATE TABLE "{name}" (LIKE stays INCLUDING DEFAULTS INCLUDING CONSTRAINTS)')
+        cur.execute("SELECT to_regclass('public.stays_default') IS NOT NULL AS ok")
+        if cur.fetchone()["ok"]:
+            cur.execute(
+                f'WITH moved AS (DELETE FROM {DEFAULT_PARTITION} '
+                f'WHERE check_in >= %s AND check_in < %s RETURNING *) '
+                f'INSERT INTO "{name}" SELECT * FROM moved',
+                (start, end),
+            )
+        cur.execute(
+            f'ALTER TABLE stays ATTACH PARTITION "{name}" FOR VALUES FROM (%s) TO (%s)',
+            (start, end),
+        )
+        return name
+
+    def convert(self, granularity: str = "month", ahead: int = 3):
+        """Преобразовать обычную stays в секционированную."""
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"неизвестный шаг секционирования: {granularity!r}")
+        if self.is_partitioned():
+            raise ValueError("stays уже секционирована")
+
+        path = os.path.join(os.path.dirname(__file__), "partitions.sql")
+        with open(path, "r", encoding="utf-8") as f:
+            overlap_script = f.read()
+
+        with self.db.transaction() as cur:
+            cur.execute("LOCK TABLE stays IN ACCESS EXCLUSIVE MODE")
+
+            cur.execute(_DEPENDENT_VIEWS_Q)
+            views = [r["relname"] for r in cur.fetchall()]
+            if views:
+                raise ValueError(
+                    "от stays зависят представления: " + ", ".join(views)
+                    + ". Удалите их и создайте заново после преобразования."
+                )
+            cur.execute(
+                "SELECT conrelid::regclass::text AS t FROM pg_constraint "
+                "WHERE contype = 'f' AND confrelid = 'public.stays'::regclass"
+            )
+            refs = [r["t"] for r in cur.fetchall()]
+            if refs:
+                # первичный ключ станет (id, check_in) — ссылаться только на id будет нельзя
+                raise ValueError("на stays ссылаются внешние ключи из: " + ", ".join(refs))
+
+            cur.execute(
+                "SELECT tgname FROM pg_trigger "
+                "WHERE tgrelid = 'public.stays'::regclass AND NOT tgisinternal"
+            )
+            triggers = {r["tgname"] for r in cur.fetchall()}
+            cur.execute("SELECT pg_get_serial_sequence('public.stays', 'id') AS seq")
+            seq = cur.fetchone()["seq"]
+            cur.execute(
+                "SELECT conname, contype, pg_get_constraintdef(oid) AS definition "
+                "FROM pg_constraint WHERE conrelid = 'public.stays'::regclass "
+                "AND contype IN ('f', 'p', 'u', 'x')"
+            )
+            cons = cur.fetchall()
+            cur.execute(_PLAIN_INDEXES_Q)
+            indexes = cur.fetchall()
+            cur.execute("SELECT min(check_in) AS lo FROM stays")
+            lo = cur.fetchone()["lo"] or date.today()
+
+            # имена индексов уникальны в схеме — у старой таблицы их освобождаем
+            cur.execute("ALTER TABLE stays RENAME TO stays_unpartitioned")
+            for con in cons:
+                if con["contype"] != "f":
+                    cur.execute(f'ALTER TABLE stays_unpartitioned DROP CONSTRAINT "{con["conname"]}"')
+            for idx in indexes:
+                cur.execute(f'DROP INDEX "{idx["name"]}"')
+
+            cur.execute(
+                "CREATE TABLE stays (LIKE stays_unpartitioned "
+                "INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING GENERATED INCLUDING COMMENTS) "
+                "PARTITION BY RANGE (check_in)"
+            )
+            cur.execute("ALTER TABLE stays ADD CONSTRAINT stays_pkey PRIMARY KEY (id, check_in)")
+            for con in cons:
+                if con["contype"] == "f":
+                    cur.execute(f'ALTER TABLE stays ADD CONSTRAINT "{con["conname"]}" {con["definition"]}')
+            if seq:
+                # иначе последовательность id удалится вместе со старой таблицей
+                cur.execute(f"ALTER SEQUENCE {seq} OWNED BY stays.id")
+
+            cur.execute(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF stays DEFAULT")
+            start = _period_start(lo, granularity)
+            last = _period_start(date.today(), granularity)
+            for _ in range(ahead):
+                last = _next_period(last, granularity)
+            while start <= last:
+                self._create_partition(cur, start, granularity)
+                start = _next_period(start, granularity)
+
+            # триггеров на новой stays ещё нет: перенос не меняет сводку и журналы
+            cur.execute("INSERT INTO stays SELECT * FROM stays_unpartitioned")
+            cur.execute("DROP TABLE stays_unpartitioned")
+
+            for idx in indexes:
+                if idx["is_unique"] and "check_in" not in idx["definition"]:
+                    # уникальный индекс секционированной таблицы обязан включать check_in
+                    app_logger.info(f"stays partitioning: unique index {idx['name']} dropped")
+                    continue
+                cur.execute(idx["definition"])
+
+            # поиск свободных номеров (Database.free_rooms)
+            cur.execute(
+                "CREATE INDEX IF NOT EXISTS ix_stays_period ON stays "
+                "USING gist (daterange(check_in, check_out)) WHERE (status)"
+            )
+            if any(con["conname"] == "ex_stays_room_period" for con in cons):
+                self.db.execute_ddl(overlap_script)
+            # триггеры из других скриптов ставим заново на новую таблицу
+            if "trg_stays_daily_stats_ins" in triggers:
+                self.db.install_daily_stats()
+            if "trg_stays_notify_ins" in triggers:
+                self.db.install_change_triggers()
+            if "trg_stays_mv_log_ins" in triggers:
+                cur.execute("SELECT mv_track_table('stays')")
+
+        self.db.invalidate_catalog()
+        app_logger.info(f"stays partitioned by {granularity}, from {lo}")
+
+    def ensure_future(self, ahead: int = 3) -> list[str]:
+        """Создать недостающие секции от текущего периода на ahead вперёд."""
+        if not self.is_partitioned():
+            return []
+        granularity = self.granularity() or "month"
+        start = _period_start(date.today(), granularity)
+
+        created = []
+        with self.db.transaction() as cur:
+            for _ in range(ahead + 1):
+                name = self._create_partition(cur, start, granularity)
+                if name:
+                    created.append(name)
+                start = _next_period(start, granularity)
+        if created:
+            app_logger.info(f"stays partitions created: {', '.join(created)}")
+        return created
+
+    def detach(self, name: str, archive: bool = False):
+        if name == DEFAULT_PARTITION:
+            raise ValueError("секцию по умолчанию отсоединять нельзя")
+        if not _NAME_RE.match(name):
+            raise ValueError(f"{name} — не секция stays")
+
+        with self.db.transaction() as cur:
+            cur.execute(f'ALTER TABLE stays DETACH PARTITION "{name}"')
+            if archive:
+                cur.execute(f"CREATE SCHEMA IF NOT EXISTS {ARCHIVE_SCHEMA}")
+                cur.execute(f'ALTER TABLE "{name}" SET SCHEMA {ARCHIVE_SCHEMA}')
+        self.db.invalidate_catalog()
+        where = f"{ARCHIVE_SCHEMA}.{name}" if archive else name
+        app_logger.info(f"stays partition detached: {where}")
@@ -0,0 +1,37 @@
+-- проверка пересечения проживаний для секционированной stays (см. partitions.py);
+-- ставится, только если пересечения запрещены (Database.install_stay_overlap_check()).
+-- Ограничение EXCLUDE на секционированной таблице должно включать ключ
+-- секционирования через «=», а проживание может переходить через границу
+-- месяца / года, поэтому вместо ex_stays_room_period — триггер.
+-- Скрипт можно выполнять повторно.
+
+CREATE OR REPLACE FUNCTION stays_check_overlap() RETURNS trigger AS $$
+BEGIN
+    IF NOT NEW.status THEN
+        RETURN NEW;
+    END IF;
+
+    -- проживания одного номера проверяются по очереди: без блокировки две
+    -- транзакции не увидели бы незакоммиченные строки друг друга
+    PERFORM pg_advisory_xact_lock(hashtext('stays.room_id'), NEW.room_id);
+
+    IF EXISTS (
+        SELECT 1 FROM stays s
+        WHERE s.room_id = NEW.room_id
+          AND s.status
+          AND s.id <> NEW.id
+          AND s.check_in < NEW.check_out
+          AND daterange(s.check_in, s.check_out) && daterange(NEW.check_in, NEW.check_out)
+    ) THEN
+        RAISE EXCEPTION 'номер % уже занят в период % — %', NEW.room_id, NEW.check_in, NEW.check_out
+            USING ERRCODE = 'exclusion_violation', CONSTRAINT = 'ex_stays_room_period';
+    END IF;
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_stays_check_overlap ON stays;
+
+CREATE TRIGGER trg_stays_check_overlap
+    BEFORE INSERT OR UPDATE OF room_id, check_in, check_out, status ON stays
+    FOR EACH ROW EXECUTE FUNCTION stays_check_overlap();
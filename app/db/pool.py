@@ -0,0 +1,237 @@
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2 import extensions
+
+from app.log.log import app_logger
+
+
+class PoolTimeout(Exception):
+    """Не дождались свободного соединения за отведённое время."""
+
+
+class ConnectionPool:
+    """Ограниченный пул соединений psycopg2.
+
+    - держит от minconn до maxconn соединений;
+    - getconn() ждёт свободное соединение, если все заняты;
+    - при выдаче проверяет, что соединение живое;
+    - считает статистику (создано, выдано, ожиданий и т.п.).
+    """
+
+    def __init__(self, conn_params: dict, minconn: int = 1, maxconn: int = 5,
+                 timeout: float = 30.0, health_check_after: float = 30.0):
+        if minconn < 0 or maxconn < 1 or minconn > maxconn:
+            raise ValueError(f"некорректные размеры пула: min={minconn}, max={maxconn}")
+
+        self.conn_params = dict(conn_params)
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        # соединение, простоявшее дольше этого (сек), пингуем перед выдачей
+        self.health_check_after = health_check_after
+
+        self._cond = threading.Condition()
+        self._idle: list[tuple[object, float]] = []  # (conn, время возврата)
+        self._in_use: set = set()
+        self._reserved = 0
+        self._closed = False
+
+        self._stats = {
+            "created": 0,
+            "discarded": 0,
+            "checkouts": 0,
+            "waits": 0,
+            "wait_time": 0.0,
+            "timeouts": 0,
+            "health_failures": 0,
+        }
+
+        for _ in range(minconn):
+            self._idle.append((self._new_conn(), time.monotonic()))
+            self._stats["created"] += 1
+
+    # внутр. функции
+    def _new_conn(self):
+        conn = psycopg2.connect(**self.conn_params)
+        conn.autocommit = False
+        return conn
+
+    def _total(self) -> int:
+        # _reserved — слоты, под которые соединение сейчас открывается
+        return len(self._idle) + len(self._in_use) + self._reserved
+
+    def _is_healthy(self, conn, idle_since: float) -> bool:
+        if conn.closed:
+            return False
+        status = conn.get_transaction_status()
+        if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+            return False
+        if status != extensions.TRANSACTION_STATUS_IDLE:
+            # кто-то вернул соединение с незакрытой транзакцией
+            try:
+                conn.rollback()
+            except Exception:
+                return False
+        if time.monotonic() - idle_since < self.health_check_after:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _close(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    # выдача / возврат
+    def getconn(self):
+        """Свободное соединение или новое, если пул не заполнен; иначе ждём.
+
+        Под блокировкой только выбор: соединение из _idle или резерв слота.
+        Подключение и проверка SELECT 1 идут без неё — медленный connect или
+        мёртвый сокет не задерживают остальные потоки.
+        """
+        deadline = time.monotonic() + self.timeout
+        waited = False
+        started = time.monotonic()
+
+        while True:
+            conn = None
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise psycopg2.InterfaceError("пул соединений закрыт")
+                    if self._idle:
+                        conn, idle_since = self._idle.pop()
+                        # пока проверяем, соединение числится занятым
+                        self._in_use.add(conn)
+                        break
+                    if self._total() < self.maxconn:
+                        self._reserved += 1
+                        break
+
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        raise PoolTimeout(
+                            f"нет свободных соединений ({self.maxconn} заняты) "
+                            f"в течение {self.timeout} с"
+                        )
+                    if not waited:
+                        waited = True
+                        self._stats["waits"] += 1
+                    self._cond.wait(remaining)
+
+            if conn is None:
+                # новый слот: подключаемся вне блокировки
+                try:
+                    conn = self._new_conn()
+                except Exception:
+                    with self._cond:
+                        self._reserved -= 1
+                        self._cond.notify()
+                    raise
+                with self._cond:
+                    self._reserved -= 1
+                    self._stats["created"] += 1
+                    if not self._closed:
+                        return self._checkout(conn, waited, started)
+                    # closeall() прошёл, пока подключались: соединение не выдаём
+                    self._stats["discarded"] += 1
+                    self._cond.notify()
+                self._close(conn)
+                raise psycopg2.InterfaceError("пул соединений закрыт")
+
+            if self._is_healthy(conn, idle_since):
+                with self._cond:
+                    if not self._closed:
+                        return self._checkout(conn, waited, started)
+                    self._in_use.discard(conn)
+                    self._stats["discarded"] += 1
+                self._close(conn)
+                raise psycopg2.InterfaceError("пул соединений закрыт")
+
+            app_logger.error("pool: соединение не прошло проверку, пересоздаём")
+            self._close(conn)
+            with self._cond:
+                self._in_use.discard(conn)
+                self._stats["health_failures"] += 1
+                self._stats["discarded"] += 1
+                self._cond.notify()
+
+    def _checkout(self, conn, waited: bool, started: float):
+        self._in_use.add(conn)
+        self._stats["checkouts"] += 1
+        if waited:
+            self._stats["wait_time"] += time.monotonic() - started
+        return conn
+
+    def putconn(self, conn, discard: bool = False):
+        with self._cond:
+            if conn not in self._in_use:
+                # уже возвращено
+                return
+
+        # откат незакрытой транзакции — без блокировки: соединение ещё за нами
+        if not discard and not conn.closed:
+            if conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                try:
+                    conn.rollback()
+                except Exception:
+                    discard = True
+
+        with self._cond:
+            self._in_use.discard(conn)
+            keep = not (discard or self._closed or conn.closed)
+            if keep:
+                self._idle.append((conn, time.monotonic()))
+            else:
+                self._stats["discarded"] += 1
+            self._cond.notify()
+        if not keep:
+            self._close(conn)
+
+    @contextmanager
+    def lease(self):
+        """with pool.lease() as conn: ... — соединение вернётся в пул само."""
+        conn = self.getconn()
+        broken = False
+        try:
+            yield conn
+        except extensions.QueryCanceledError:
+            # отмена по cancel() / statement_timeout — соединение исправно
+            raise
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            broken = True
+            raise
+        finally:
+            self.putconn(conn, discard=broken or conn.closed)
+
+    def stats(self) -> dict:
+        with self._cond:
+            res = dict(self._stats)
+            res["in_use"] = len(self._in_use)
+            res["idle"] = len(self._idle)
+            res["size"] = self._total()
+            res["min"] = self.minconn
+            res["max"] = self.maxconn
+            return res
+
+    def closeall(self):
+        with self._cond:
+            self._closed = True
+            for conn, _ in self._idle:
+                self._stats["discarded"] += 1
+                self._close(conn)
+            self._idle.clear()
+            # занятые закроются при возврате
+            self._cond.notify_all()
@@ -0,0 +1,214 @@
+import threading
+import time
+
+from app.log.log import app_logger
+
+
+_POLICY_DDL = """
+CREATE TABLE IF NOT EXISTS mv_refresh_policy (
+  name TEXT PRIMARY KEY,
+  interval_sec INT,               -- обновлять не реже, чем раз в N секунд
+  after_changes INT,              -- или после N изменённых строк базовых таблиц
+  last_refresh_at TIMESTAMPTZ,
+  last_duration_ms REAL,
+  last_error TEXT,
+  changes_mark BIGINT             -- счётчик изменений базовых таблиц на момент обновления
+)
+"""
+
+# таблицы, из которых читает материализованное представление
+_MATVIEW_TABLES_Q = """
+    SELECT DISTINCT c.relname
+    FROM pg_catalog.pg_rewrite r
+    JOIN pg_catalog.pg_depend d
+      ON d.classid = 'pg_catalog.pg_rewrite'::regclass AND d.objid = r.oid
+     AND d.refclassid = 'pg_catalog.pg_class'::regclass
+    JOIN pg_catalog.pg_class c ON c.oid = d.refobjid
+    WHERE r.ev_class = to_regclass(%s) AND c.oid <> r.ev_class AND c.relkind IN ('r', 'p')
+"""
+
+
+class RefreshScheduler:
+    """Фоновое обновление материализованных представлений по политикам.
+
+    Политика хранится в mv_refresh_policy: интервал и / или число
+    изменений строк базовых таблиц (n_tup_ins + n_tup_upd + n_tup_del из
+    pg_stat_user_tables) с прошлого обновления. Поток раз в poll_interval
+    проверяет политики и обновляет просроченные на соединении из пула —
+    окна при этом не ждут. Любое обновление через refresh(), и ручное из
+    ViewsWindow, записывает время, длительность и ошибку.
+    """
+
+    def __init__(self, db, poll_interval: float = 30.0):
+        self.db = db
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._busy: set[str] = set()
+        self._lock = threading.Lock()
+
+    # поток
+    def start(self):
+        if self.poll_interval <= 0 or (self._thread and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="mv-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 2.0):
+        self._stop.set()
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.run_due()
+            except Exception as e:
+                app_logger.error(f"Планировщик обновления представлений: {e}")
+
+    def run_due(self):
+        for st in self.status():
+            if self._stop.is_set():
+                return
+            if not st["due"]:
+                continue
+            try:
+                self.refresh(st["name"])
+            except Exception:
+                # ошибка уже записана в mv_refresh_policy.last_error
+                pass
+
+    # политики
+    def set_policy(self, name: str, interval_sec: int | None, after_changes: int | None):
+        with self.db.cursor() as cur:
+            cur.execute(_POLICY_DDL)
+            cur.execute(
+                """
+                INSERT INTO mv_refresh_policy (name, interval_sec, after_changes)
+                VALUES (%s, %s, %s)
+                ON CONFLICT (name) DO UPDATE
+                    SET interval_sec = EXCLUDED.interval_sec,
+                        after_changes = EXCLUDED.after_changes
+                """,
+                (name, interval_sec or None, after_changes or None),
+            )
+        app_logger.info(f"refresh policy {name}: every {interval_sec} s / after {after_changes} changes")
+
+    def _base_tables(self, cur, name: str) -> list[str]:
+        cur.execute(_MATVIEW_TABLES_Q, (f'public."{name}"',))
+        tables = [r["relname"] for r in cur.fetchall()]
+        if not tables:
+            info = self.db.incremental.get(name)
+            if info:
+                tables = list(info["base_tables"])
+        return tables
+
+    def _changes(self, cur, tables: list[str]) -> int:
+        if not tables:
+            return 0
+        cur.execute(
+            "SELECT COALESCE(sum(n_tup_ins + n_tup_upd + n_tup_del), 0) AS n "
+            "FROM pg_stat_user_tables WHERE schemaname = 'public' AND relname = ANY(%s)",
+            (tables,),
+        )
+        return int(cur.fetchone()["n"])
+
+    def status(self) -> list[dict]:
+        """Записи mv_refresh_policy с возрастом, числом изменений с прошлого
+        обновления (changes) и признаком due — пора обновлять."""
+        with self.db.read_cursor() as cur:
+            cur.execute("SELECT to_regclass('public.mv_refresh_policy') IS NOT NULL AS ok")
+            if not cur.fetchone()["ok"]:
+                return []
+            cur.execute(
+                "SELECT *, EXTRACT(EPOCH FROM now() - last_refresh_at) AS age_sec "
+                "FROM mv_refresh_policy ORDER BY name"
+            )
+            rows = [dict(r) for r in cur.fetchall()]
+
+            res = []
+            for r in rows:
+                # представление удалили — политика больше не нужна
+                cur.execute("SELECT to_regclass(%s) IS NOT NULL AS ok", (f'public."{r["name"]}"',))
+                if not cur.fetchone()["ok"]:
+                    continue
+                now = self._changes(cur, self._base_tables(cur, r["name"]))
+                mark = r["changes_mark"]
+                # счётчики pg_stat могли сбросить — тогда считаем от нуля
+                r["changes"] = None if mark is None else (now - mark if now >= mark else now)
+
+                due = False
+                if r["interval_sec"] and (r["age_sec"] is None or r["age_sec"] >= r["interval_sec"]):
+                    due = True
+                if r["after_changes"] and (r["changes"] is None or r["changes"] >= r["after_changes"]):
+                    due = True
+                r["due"] = due
+                res.append(r)
+        return res
+
+    # обновление
+    def refresh(self, name: str) -> dict:
+        """Обновить представление и записать результат.
+
+        INCREMENTAL — по журналу изменений, MATERIALIZED VIEW — CONCURRENTLY,
+        если есть подходящий уникальный индекс. Возвращает {"duration_ms", ...}.
+        """
+        with self._lock:
+            if name in self._busy:
+                raise RuntimeError(f"{name} уже обновляется")
+            self._busy.add(name)
+        try:
+            with self.db.read_cursor() as cur:
+                mark = self._changes(cur, self._base_tables(cur, name))
+
+            res: dict = {}
+            error = None
+            started = time.perf_counter()
+            try:
+                if name in self.db.incremental.names():
+                    res = self.db.incremental.refresh(name)
+                else:
+                    concurrently = self.db.mat_view_unique_index(name) is not None
+                    self.db.refresh_mat_view(f'public."{name}"', concurrently=concurrently)
+                    res = {"concurrently": concurrently}
+            except Exception as e:
+                error = e
+            duration_ms = (time.perf_counter() - started) * 1000
+
+            self._record(name, duration_ms, mark, error)
+            if error is not None:
+                app_logger.error(f"REFRESH {name}: {error}")
+                raise error
+            app_logger.info(f"REFRESH {name}: {duration_ms:.0f} ms")
+            res["duration_ms"] = duration_ms
+            return res
+        finally:
+            with self._lock:
+                self._busy.discard(name)
+
+    def _record(self, name: str, duration_ms: float, mark: int, error: Exception | None):
+        with self.db.cursor() as cur:
+            cur.execute(_POLICY_DDL)
+            if error is None:
+                cur.execute(
+                    """
+                    INSERT INTO mv_refresh_policy (name, last_refresh_at, last_duration_ms, changes_mark)
+                    VALUES (%s, now(), %s, %s)
+                    ON CONFLICT (name) DO UPDATE
+                        SET last_refresh_at = now(),
+                            last_duration_ms = EXCLUDED.last_duration_ms,
+                            changes_mark = EXCLUDED.changes_mark,
+                            last_error = NULL
+                    """,
+                    (name, duration_ms, mark),
+                )
+            else:
+                cur.execute(
+                    """
+                    INSERT INTO mv_refresh_policy (name, last_error) VALUES (%s, %s)
+                    ON CONFLICT (name) DO UPDATE SET last_error = EXCLUDED.last_error
+                    """,
+                    (name, str(error)[:500]),
+                )
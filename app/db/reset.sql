@@ -43,6 +43,11 @@ CREATE TABLE IF NOT EXISTS stays (
   CONSTRAINT ck_dates CHECK (check_out > check_in)
 );
 
+-- поиск свободных номеров (Database.free_rooms): пересечение периодов по GiST,
+-- встроенный класс range_ops — расширения не нужны
+CREATE INDEX IF NOT EXISTS ix_stays_period ON stays
+    USING gist (daterange(check_in, check_out)) WHERE (status);
+
 -- Базовые клиенты
 INSERT INTO clients (last_name, first_name, patronymic, passport, comment, is_regular)
 VALUES
@@ -0,0 +1,194 @@
+import threading
+import time
+from collections import OrderedDict
+
+from app.log.log import app_logger
+
+
+# зависимость «от всех таблиц» — для запросов к обычным представлениям,
+# чьи базовые таблицы мы не разбираем
+ANY_TABLE = "*"
+
+def normalize_sql(query: str) -> str:
+    """Текст запроса без завершающих ; и пробелов — чтобы его можно было обернуть.
+
+    Внутри ничего не переписываем: пробелы в строковых литералах значимы,
+    а схлопнутый перевод строки превратил бы «-- комментарий» в конец запроса.
+    """
+    query = query.strip()
+    while query.endswith(";"):
+        query = query[:-1].rstrip()
+    return query
+
+
+def _estimate_size(columns, rows) -> int:
+    # грубая оценка: текстовое представление значений + накладные на строку
+    size = 64 + sum(len(c) for c in columns)
+    for row in rows:
+        size += 56 + 8 * len(row)
+        for v in (row.values() if isinstance(row, dict) else row):
+            if v is not None:
+                size += len(str(v))
+    return size
+
+
+class _Entry:
+    __slots__ = ("columns", "rows", "tables", "size", "server", "checked")
+
+    def __init__(self, columns, rows, tables, size, server):
+        self.columns = columns
+        self.rows = rows
+        self.tables = tables
+        self.size = size
+        self.server = server  # счётчики изменений pg_stat_user_tables на момент чтения
+        self.checked = time.monotonic()
+
+
+class ResultCache:
+    """LRU-кэш результатов SELECT с ограничением по памяти.
+
+    Ключ — текст SQL (без завершающей ;) + параметры. Каждая запись помнит, от каких
+    таблиц зависит; invalidate_table() выбрасывает записи таблицы и
+    увеличивает её версию. Версии снимаются до выполнения запроса, и put()
+    не сохранит результат, если за это время таблицу успели изменить.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, check_after: float = 5.0):
+        self.max_bytes = max_bytes
+        self.check_after = check_after  # через сколько секунд сверять счётчики сервера
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[tuple, _Entry]" = OrderedDict()
+        self._versions: dict[str, int] = {}
+        self._bytes = 0
+        self._too_big: set[tuple] = set()  # ключи результатов больше max_rows
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "stale": 0,  # выброшено по счётчикам сервера
+            "evictions": 0,
+            "invalidations": 0,
+            "too_big": 0,
+        }
+
+    @staticmethod
+    def make_key(query: str, params=None) -> tuple:
+        if params is None:
+            p = ()
+        elif isinstance(params, dict):
+            p = tuple(sorted((k, repr(v)) for k, v in params.items()))
+        else:
+            p = tuple(repr(v) for v in params)
+        return normalize_sql(query), p
+
+    # версии таблиц
+    def versions(self, tables) -> tuple:
+        with self._lock:
+            return tuple(self._versions.get(t, 0) for t in sorted(tables)) + (
+                self._versions.get(ANY_TABLE, 0),
+            )
+
+    def invalidate_table(self, table: str):
+        with self._lock:
+            self._versions[table] = self._versions.get(table, 0) + 1
+            # запросы к представлениям зависят от любой таблицы
+            self._versions[ANY_TABLE] = self._versions.get(ANY_TABLE, 0) + 1
+            dropped = [
+                k for k, e in self._entries.items()
+                if table in e.tables or ANY_TABLE in e.tables
+            ]
+            for k in dropped:
+                self._drop(k)
+            self._stats["invalidations"] += len(dropped)
+            self._too_big.clear()
+
+    def clear(self):
+        """После DDL: структура могла поменяться у чего угодно."""
+        with self._lock:
+            for t in list(self._versions):
+                self._versions[t] += 1
+            self._versions[ANY_TABLE] = self._versions.get(ANY_TABLE, 0) + 1
+            self._stats["invalidations"] += len(self._entries)
+            self._entries.clear()
+            self._bytes = 0
+            self._too_big.clear()
+
+    # чтение / запись
+    def get(self, key: tuple):
+        """Запись или None; запись может требовать сверки с сервером (needs_check)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def needs_check(self, entry: _Entry) -> bool:
+        return time.monotonic() - entry.checked >= self.check_after
+
+    def confirm(self, key: tuple, entry: _Entry, server: dict | None) -> bool:
+        """Сверка со счётчиками сервера: True — запись актуальна (попадание)."""
+        with self._lock:
+            if server is not None and server != entry.server:
+                self._stats["stale"] += 1
+                self._stats["misses"] += 1
+                if self._entries.get(key) is entry:
+                    self._drop(key)
+                return False
+            entry.checked = time.monotonic()
+            self._stats["hits"] += 1
+            return True
+
+    def put(self, key: tuple, columns, rows, tables, versions: tuple, server: dict | None):
+        size = _estimate_size(columns, rows)
+        with self._lock:
+            if size > self.max_bytes // 4:
+                self._stats["too_big"] += 1
+                return
+            now = tuple(self._versions.get(t, 0) for t in sorted(tables)) + (
+                self._versions.get(ANY_TABLE, 0),
+            )
+            if now != versions:
+                # таблицу изменили, пока шёл запрос — результат уже устарел
+                return
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = _Entry(columns, rows, frozenset(tables), size, server)
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._entries:
+                old_key = next(iter(self._entries))
+                self._drop(old_key)
+                self._stats["evictions"] += 1
+
+    def mark_too_big(self, key: tuple):
+        with self._lock:
+            if len(self._too_big) > 1000:
+                self._too_big.clear()
+            self._too_big.add(key)
+            self._stats["too_big"] += 1
+
+    def is_too_big(self, key: tuple) -> bool:
+        with self._lock:
+            return key in self._too_big
+
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+
+    def stats(self) -> dict:
+        with self._lock:
+            res = dict(self._stats)
+            res["entries"] = len(self._entries)
+            res["bytes"] = self._bytes
+            res["max_bytes"] = self.max_bytes
+            total = res["hits"] + res["misses"]
+            res["hit_ratio"] = res["hits"] / total if total else 0.0
+            return res
+
+    def log_stats(self):
+        s = self.stats()
+        app_logger.info(
+            f"result cache: {s['hits']} hits, {s['misses']} misses, "
+            f"{s['entries']} entries, {s['bytes'] // 1024} KB"
+        )
@@ -0,0 +1,148 @@
+-- сводка по дням: занятые ночи и выручка по номерам (daily_room_stats).
+-- Поддерживается триггерами: каждый INSERT / UPDATE / DELETE в stays
+-- добавляет в сводку только свою разницу, а не пересчитывает её целиком.
+-- Учитываются все проживания, и текущие, и завершённые; ночь — день от check_in
+-- до check_out - 1, выручка за ночь — текущая цена номера (как в stays JOIN rooms).
+-- Скрипт можно выполнять повторно.
+
+CREATE TABLE IF NOT EXISTS daily_room_stats (
+  day DATE NOT NULL,
+  room_id INT NOT NULL REFERENCES rooms(id) ON DELETE CASCADE,
+  comfort comfort_enum NOT NULL,
+  nights INT NOT NULL DEFAULT 0,
+  revenue NUMERIC(12,2) NOT NULL DEFAULT 0,
+  PRIMARY KEY (day, room_id)
+);
+
+-- сводка по комфортности за период без JOIN с rooms
+CREATE INDEX IF NOT EXISTS ix_daily_room_stats_comfort_day ON daily_room_stats (comfort, day);
+
+
+-- применить разницу: для каждого проживания sign = +1 (добавилось) или -1 (ушло)
+CREATE OR REPLACE FUNCTION daily_stats_apply(
+    room_ids INT[], check_ins DATE[], check_outs DATE[], signs INT[]
+) RETURNS void AS $$
+DECLARE
+    empty_days DATE[];
+    empty_rooms INT[];
+BEGIN
+    WITH up AS (
+        INSERT INTO daily_room_stats AS t (day, room_id, comfort, nights, revenue)
+        SELECT d::date, r.id, r.comfort, sum(s.sign), sum(s.sign * r.price)
+        FROM unnest(room_ids, check_ins, check_outs, signs) AS s(room_id, check_in, check_out, sign)
+        -- удалённого номера уже нет: его строки сводки убрал ON DELETE CASCADE
+        JOIN rooms r ON r.id = s.room_id
+        CROSS JOIN generate_series(s.check_in, s.check_out - 1, interval '1 day') AS d
+        GROUP BY 1, 2, 3
+        -- UPDATE без смены номера и дат ничего не меняет
+        HAVING sum(s.sign) <> 0
+        ON CONFLICT (day, room_id) DO UPDATE
+            SET nights = t.nights + EXCLUDED.nights,
+                revenue = t.revenue + EXCLUDED.revenue
+        RETURNING t.day, t.room_id, t.nights
+    )
+    SELECT array_agg(day), array_agg(room_id) INTO empty_days, empty_rooms
+    FROM up WHERE nights = 0;
+
+    IF empty_days IS NOT NULL THEN
+        DELETE FROM daily_room_stats t
+        USING unnest(empty_days, empty_rooms) AS e(day, room_id)
+        WHERE t.day = e.day AND t.room_id = e.room_id AND t.nights = 0;
+    END IF;
+END
+$$ LANGUAGE plpgsql;
+
+
+CREATE OR REPLACE FUNCTION daily_stats_on_stays() RETURNS trigger AS $$
+DECLARE
+    room_ids INT[] := '{}';
+    check_ins DATE[] := '{}';
+    check_outs DATE[] := '{}';
+    signs INT[] := '{}';
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        SELECT coalesce(array_agg(room_id), '{}'), coalesce(array_agg(check_in), '{}'),
+               coalesce(array_agg(check_out), '{}'), coalesce(array_agg(-1), '{}')
+        INTO room_ids, check_ins, check_outs, signs
+        FROM old_rows;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        SELECT room_ids || coalesce(array_agg(room_id), '{}'),
+               check_ins || coalesce(array_agg(check_in), '{}'),
+               check_outs || coalesce(array_agg(check_out), '{}'),
+               signs || coalesce(array_agg(1), '{}')
+        INTO room_ids, check_ins, check_outs, signs
+        FROM new_rows;
+    END IF;
+
+    IF cardinality(room_ids) > 0 THEN
+        PERFORM daily_stats_apply(room_ids, check_ins, check_outs, signs);
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+
+-- сменили цену или комфортность номера — его строки сводки пересчитываются
+CREATE OR REPLACE FUNCTION daily_stats_on_rooms() RETURNS trigger AS $$
+BEGIN
+    UPDATE daily_room_stats t
+    SET comfort = NEW.comfort,
+        revenue = t.nights * NEW.price
+    WHERE t.room_id = NEW.id;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+
+-- полный пересчёт из stays JOIN rooms; возвращает число строк сводки
+CREATE OR REPLACE FUNCTION daily_stats_backfill() RETURNS INT AS $$
+DECLARE
+    n INT;
+BEGIN
+    LOCK TABLE daily_room_stats IN EXCLUSIVE MODE;
+    DELETE FROM daily_room_stats;
+
+    INSERT INTO daily_room_stats (day, room_id, comfort, nights, revenue)
+    SELECT d::date, r.id, r.comfort, count(*), sum(r.price)
+    FROM stays s
+    JOIN rooms r ON r.id = s.room_id
+    CROSS JOIN generate_series(s.check_in, s.check_out - 1, interval '1 day') AS d
+    GROUP BY 1, 2, 3;
+
+    GET DIAGNOSTICS n = ROW_COUNT;
+    RETURN n;
+END
+$$ LANGUAGE plpgsql;
+
+
+DROP TRIGGER IF EXISTS trg_stays_daily_stats_ins ON stays;
+DROP TRIGGER IF EXISTS trg_stays_daily_stats_upd ON stays;
+DROP TRIGGER IF EXISTS trg_stays_daily_stats_del ON stays;
+DROP TRIGGER IF EXISTS trg_rooms_daily_stats ON rooms;
+
+CREATE TRIGGER trg_stays_daily_stats_ins AFTER INSERT ON stays
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION daily_stats_on_stays();
+CREATE TRIGGER trg_stays_daily_stats_upd AFTER UPDATE ON stays
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION daily_stats_on_stays();
+CREATE TRIGGER trg_stays_daily_stats_del AFTER DELETE ON stays
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION daily_stats_on_stays();
+
+CREATE TRIGGER trg_rooms_daily_stats AFTER UPDATE OF price, comfort ON rooms
+    FOR EACH ROW
+    WHEN (OLD.price IS DISTINCT FROM NEW.price OR OLD.comfort IS DISTINCT FROM NEW.comfort)
+    EXECUTE FUNCTION daily_stats_on_rooms();
+
+
+-- первая установка: заполнить сводку по уже существующим проживаниям
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM daily_room_stats) THEN
+        PERFORM daily_stats_backfill();
+    END IF;
+END
+$$ LANGUAGE plpgsql;
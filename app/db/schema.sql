@@ -38,4 +38,9 @@ CREATE TABLE IF NOT EXISTS stays (
   note TEXT,
   status BOOLEAN NOT NULL DEFAULT true,
   CONSTRAINT ck_dates CHECK (check_out > check_in)
-);
\ No newline at end of file
+);
+
+-- поиск свободных номеров (Database.free_rooms): пересечение периодов по GiST,
+-- встроенный класс range_ops — расширения не нужны
+CREATE INDEX IF NOT EXISTS ix_stays_period ON stays
+    USING gist (daterange(check_in, check_out)) WHERE (status);
\ No newline at end of file
@@ -0,0 +1,109 @@
+import threading
+import uuid
+
+from app.log.log import app_logger
+
+
+class RowStream:
+    """Потоковое чтение результата через именованный (серверный) курсор.
+
+    Строки забираются с сервера пачками по batch_size, поэтому первая
+    пачка доступна сразу, а весь результат никогда не лежит в памяти целиком.
+
+    Пока поток открыт, он держит соединение из пула и свою транзакцию, а с
+    ней — блокировку ACCESS SHARE на прочитанные таблицы; не забывайте
+    close(). DDL / REFRESH, упёршиеся в такую блокировку, закрывают открытые
+    потоки через Database.close_streams() — тогда interrupted = True, а уже
+    прочитанные строки остаются у того, кто их читал.
+    """
+
+    def __init__(self, db, query, params=None, batch_size: int = 500):
+        self.batch_size = batch_size
+        self.exhausted = False
+        self.interrupted = False
+        self.fetched = 0
+        self._columns: list[str] | None = None
+        # fetch_batch() и close() могут прийти из разных потоков
+        self._lock = threading.Lock()
+        self._db = db
+
+        self._cur = None
+        self._lease = db.lease()
+        self._conn = self._lease.__enter__()
+        try:
+            name = f"stream_{uuid.uuid4().hex[:12]}"
+            self._cur = self._conn.cursor(name=name, cursor_factory=db.metrics.dict_cursor)
+            self._cur.itersize = batch_size
+            self._cur.execute(query, params)
+        except Exception as e:
+            self._release(error=e)
+            raise
+        db.register_stream(self)
+
+    @property
+    def columns(self) -> list[str]:
+        return self._columns or []
+
+    def fetch_batch(self, size: int | None = None) -> list[dict]:
+        """Следующая пачка строк; пустой список — данных больше нет."""
+        size = size or self.batch_size
+        with self._lock:
+            if self.exhausted:
+                return []
+            try:
+                rows = self._cur.fetchmany(size)
+            except Exception as e:
+                self._release(error=e)
+                raise
+
+            # у серверного курсора description появляется после первого FETCH,
+            # запоминаем колонки до закрытия курсора
+            if self._columns is None and self._cur.description:
+                self._columns = [d.name for d in self._cur.description]
+            self.fetched += len(rows)
+            if len(rows) < size:
+                self._release()
+        return rows
+
+    def __iter__(self):
+        while True:
+            batch = self.fetch_batch()
+            if not batch:
+                return
+            yield batch
+
+    def close(self):
+        with self._lock:
+            if not self.exhausted:
+                self._release()
+
+    def interrupt(self):
+        """Закрыть недочитанный поток ради чужой блокировки (см. Database.close_streams())."""
+        with self._lock:
+            if self.exhausted:
+                return False
+            self.interrupted = True
+            self._release()
+            return True
+
+    def _release(self, error: Exception | None = None):
+        self.exhausted = True
+        self._db.unregister_stream(self)
+        cur, self._cur = self._cur, None
+        try:
+            if cur is not None and not cur.closed:
+                cur.close()
+            self._conn.rollback()
+        except Exception as e:
+            app_logger.error(f"stream: ошибка при закрытии курсора: {e}")
+        if error is not None:
+            self._lease.__exit__(type(error), error, error.__traceback__)
+        else:
+            self._lease.__exit__(None, None, None)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
@@ -37,6 +37,20 @@ if not app_logger.handlers:
     app_logger.addHandler(file_handler)
     app_logger.addHandler(console_handler)
 
+# журнал медленных запросов: одна строка JSON на запрос, файл slow_2025-11-13.jsonl
+slow_logger = logging.getLogger("app.slow")
+slow_logger.setLevel(logging.INFO)
+slow_logger.propagate = False
+
+slow_handler = logging.FileHandler(
+    os.path.join(LOG_DIR, f"slow_{datetime.now().strftime('%Y-%m-%d')}.jsonl"),
+    encoding="utf-8",
+)
+slow_handler.setFormatter(logging.Formatter("%(message)s"))
+
+if not slow_logger.handlers:
+    slow_logger.addHandler(slow_handler)
+
 # короткая функция для внешних модулей
 def log_info(msg: str):
     app_logger.info(msg)
@@ -1,4 +1,8 @@
-from PySide6.QtWidgets import QMainWindow, QMessageBox
+import time
+
+from PySide6.QtWidgets import QMainWindow, QMessageBox, QLabel, QCompleter
+from PySide6.QtCore import QTimer, Qt, QModelIndex
+from PySide6.QtGui import QStandardItemModel, QStandardItem
 from app.ui.ui_main_window import UIMainWindow
 from app.ui.enter_data_dialog import EnterDataDialog
 from app.ui.join_master_dialog import JoinMasterDialog
@@ -9,6 +13,11 @@ from app.log.log import app_logger
 from app.ui.quick_view_window import QuickViewWindow
 from app.ui.cte_builder_window import CteBuilderWindow
 from app.ui.views_window import ViewsWindow
+from app.ui.import_window import ImportWindow
+from app.ui.index_advisor_window import IndexAdvisorWindow
+from app.ui.availability_window import AvailabilityWindow
+from app.ui.partitions_window import PartitionsWindow
+from app.ui.query_runner import QueryRunner
 from PySide6.QtWidgets import QDialog
 
 
@@ -22,6 +31,19 @@ class MainWindow(QMainWindow):
 
         self._types_window = None
 
+        # schema.sql / reset.sql выполняются в фоне, с кнопкой отмены
+        self.runner = QueryRunner(self.db, self)
+        self.centralWidget().layout().addWidget(self.runner.panel)
+
+        # попадания кэша результатов — в строке состояния
+        self.lbl_cache = QLabel("")
+        self.statusBar().addPermanentWidget(self.lbl_cache)
+        self._cache_timer = QTimer(self)
+        self._cache_timer.timeout.connect(self._update_cache_status)
+        self._cache_timer.start(2000)
+        self._update_cache_status()
+
+        self._setup_quick_search()
         self._connect_signals()
 
 
@@ -35,30 +57,106 @@ class MainWindow(QMainWindow):
         self.ui.btn_types.clicked.connect(self.on_manage_types) # енам
         self.ui.btn_views.clicked.connect(self.on_views) # представления окно
         self.ui.btn_cte_builder.clicked.connect(self.on_cte_builder) # билдер cte
+        self.ui.btn_import.clicked.connect(self.on_import) # импорт csv
+        self.ui.btn_free_rooms.clicked.connect(self.on_free_rooms) # свободные номера
+        self.ui.btn_daily_stats.clicked.connect(self.on_backfill_daily_stats) # пересчёт сводки
+        self.ui.btn_index_advisor.clicked.connect(self.on_index_advisor) # советник индексов
+        self.ui.btn_partitions.clicked.connect(self.on_partitions) # секции stays
+
+    # быстрый поиск: индекс гостей и номеров в памяти (Database.front_desk)
+    def _setup_quick_search(self):
+        box = self.ui.quick_search
+        if not self.db.front_desk_enabled:
+            box.hide()
+            return
+        self._quick_model = QStandardItemModel(self)
+        self._quick_completer = QCompleter(self._quick_model, self)
+        self._quick_completer.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+        self._quick_completer.setMaxVisibleItems(15)
+        box.setCompleter(self._quick_completer)
+        box.textEdited.connect(self._on_quick_search)
+        self._quick_completer.activated[QModelIndex].connect(self._on_quick_pick)
+
+    def _on_quick_search(self, text: str):
+        if not self.db.front_desk.is_loaded():
+            self.statusBar().showMessage("Индекс гостей ещё загружается…", 2000)
+            return
+        started = time.perf_counter()
+        found = self.db.front_desk.lookup(text)
+        ms = (time.perf_counter() - started) * 1000
+
+        self._quick_model.clear()
+        for r in found:
+            item = QStandardItem(r["label"])
+            item.setData(r, Qt.UserRole)
+            self._quick_model.appendRow(item)
+        if found:
+            self._quick_completer.complete()
+        if text.strip():
+            self.statusBar().showMessage(f"Найдено: {len(found)} за {ms:.2f} мс", 3000)
+
+    def _on_quick_pick(self, index):
+        r = index.data(Qt.UserRole)
+        if not r:
+            return
+        title = "Гость" if r["table"] == "clients" else "Номер"
+        details = "\n".join(f"{k}: {v}" for k, v in r["row"].items())
+        QMessageBox.information(self, title, details)
 
     # внутр. функции
     def _error(self, text: str): # вывод ошибок, запись в лог
         QMessageBox.critical(self, "Ошибка", text)
         app_logger.error(text)
 
+    def _update_cache_status(self):
+        s = self.db.cache_stats()
+        self.lbl_cache.setText(
+            f"Кэш: {s['hits']} попаданий / {s['misses']} промахов "
+            f"({s['hit_ratio']:.0%}), {s['entries']} записей, {s['bytes'] // 1024} КБ"
+        )
+
     # обработчики
+    def _reload_types_window(self):
+        if self._types_window is not None: # обновляем вручную
+            try:
+                self._types_window.reload_types()
+            except Exception as e:
+                app_logger.error(f"Не удалось обновить окно типов: {e}")
+
+    def _apply_schema(self, script: str):
+        # выполняется в фоне; триггеры NOTIFY — для живого обновления окон
+        self.db.execute_ddl(script)
+        self.db.install_daily_stats()
+        if self.db.live_refresh:
+            self.db.install_change_triggers()
+        # таблицы пересозданы — индекс ресепшена читаем заново
+        self.db.front_desk.reload()
+        # у секционированной stays — недостающие секции наперёд
+        self.db.partitions.ensure_future(self.db.partitions_ahead)
+        # триграммные индексы поиска гостей; без прав на CREATE EXTENSION схема всё равно готова
+        try:
+            self.db.install_search_indexes()
+        except Exception as e:
+            app_logger.error(f"Не удалось создать индексы поиска: {e}")
+
     def on_create_schema(self):
         try:
             with open("db/schema.sql", "r", encoding="utf-8") as f:
                 script = f.read()
+        except Exception as e:
+            self._error(f"Ошибка создания схемы:\n{e}")
+            return
 
-            self.db.execute_ddl(script)
+        def done(_):
             QMessageBox.information(self, "Готово", "Схема успешно создана.")
             app_logger.info("schema created")
+            self._reload_types_window()
 
-        except Exception as e:
+        def failed(e):
             self._error(f"Ошибка создания схемы:\n{e}")
+            self._reload_types_window()
 
-        if self._types_window is not None: # обновляем вручную
-            try:
-                self._types_window.reload_types()
-            except Exception as e:
-                app_logger.error(f"Не удалось обновить окно типов после создания схемы: {e}")
+        self.runner.run(lambda: self._apply_schema(script), done, failed, text="Создание схемы…")
 
     def on_add_data(self):
         try:
@@ -89,6 +187,43 @@ class MainWindow(QMainWindow):
         except Exception as e:
             self._error(f"Ошибка загрузки данных:\n{e}")
 
+    def on_import(self):
+        try:
+            wnd = ImportWindow(self.db, self)
+            wnd.show()
+        except Exception as e:
+            self._error(f"Ошибка при открытии импорта:\n{e}")
+
+    def on_free_rooms(self):
+        try:
+            wnd = AvailabilityWindow(self.db, self)
+            wnd.show()
+        except Exception as e:
+            self._error(f"Ошибка при открытии поиска номеров:\n{e}")
+
+    def on_backfill_daily_stats(self):
+        def done(n):
+            QMessageBox.information(self, "Готово", f"Сводка по дням пересчитана: {n} строк.")
+
+        def failed(e):
+            self._error(f"Ошибка пересчёта сводки по дням:\n{e}")
+
+        self.runner.run(self.db.backfill_daily_stats, done, failed, text="Пересчёт сводки по дням…")
+
+    def on_index_advisor(self):
+        try:
+            wnd = IndexAdvisorWindow(self.db, self)
+            wnd.show()
+        except Exception as e:
+            self._error(f"Ошибка при открытии советника индексов:\n{e}")
+
+    def on_partitions(self):
+        try:
+            wnd = PartitionsWindow(self.db, self)
+            wnd.show()
+        except Exception as e:
+            self._error(f"Ошибка при открытии секций stays:\n{e}")
+
     def on_alter(self):
         try:
             dlg = AlterTableWindow(self.db, self)
@@ -124,20 +259,20 @@ class MainWindow(QMainWindow):
         try:
             with open("db/reset.sql", "r", encoding="utf-8") as f:
                 script = f.read()
+        except Exception as e:
+            self._error(f"Ошибка при сбросе базы:\n{e}")
+            return
 
-            self.db.execute_ddl(script)
+        def done(_):
             QMessageBox.information(self, "Сброс", "База данных успешно сброшена.")
             app_logger.info("schema reset by user")
+            self._reload_types_window()
 
-        except Exception as e:
+        def failed(e):
             self._error(f"Ошибка при сбросе базы:\n{e}")
+            self._reload_types_window()
 
-
-        if self._types_window is not None:
-            try:
-                self._types_window.reload_types()
-            except Exception as e:
-                app_logger.error(f"Не удалось обновить окно типов после сброса: {e}")
+        self.runner.run(lambda: self._apply_schema(script), done, failed, text="Сброс базы…")
 
     def on_quick_view(self):
         try:
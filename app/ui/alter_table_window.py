@@ -7,6 +7,7 @@ from PySide6.QtCore import Qt
 from PySide6.QtGui import QFont
 
 from app.log.log import app_logger
+from app.ui.query_runner import QueryRunner
 from app.ui.theme import *
 
 def setup_wide_combo(cmb: QComboBox, min_chars: int = 18, popup_width: int = 260):
@@ -186,6 +187,10 @@ class AlterTableWindow(QDialog):
         scroll.setWidgetResizable(True)
         main_layout.addWidget(scroll)
 
+        # ALTER выполняется в фоне: ждёт блокировку таблицы, не замораживая окно
+        self.runner = QueryRunner(self.db, self)
+        main_layout.addWidget(self.runner.panel)
+
         container = QWidget()
         container.setStyleSheet(f"background-color: {WINDOW_BG};")
         scroll.setWidget(container)
@@ -708,65 +713,32 @@ class AlterTableWindow(QDialog):
         self.cb_check_drop.clear()
 
         try:
-            with self.db.cursor() as cur:
-                # UNIQUE
-                cur.execute(
-                    """
-                    SELECT tc.constraint_name, kcu.column_name
-                    FROM information_schema.table_constraints tc
-                    JOIN information_schema.key_column_usage kcu
-                      ON tc.constraint_name = kcu.constraint_name
-                     AND tc.table_schema = kcu.table_schema
-                    WHERE tc.table_schema = 'public'
-                      AND tc.table_name = %s
-                      AND tc.constraint_type = 'UNIQUE'
-                    ORDER BY kcu.ordinal_position;
-                    """,
-                    (table,),
-                )
-                self.unique_constraints = cur.fetchall()
-
-                # FK
-                cur.execute(
-                    """
-                    SELECT
-                        tc.constraint_name,
-                        kcu.column_name AS local_column,
-                        ccu.table_name AS foreign_table,
-                        ccu.column_name AS foreign_column
-                    FROM information_schema.table_constraints AS tc
-                    JOIN information_schema.key_column_usage AS kcu
-                      ON tc.constraint_name = kcu.constraint_name
-                     AND tc.table_schema = kcu.table_schema
-                    JOIN information_schema.constraint_column_usage AS ccu
-                      ON ccu.constraint_name = tc.constraint_name
-                     AND ccu.table_schema = tc.table_schema
-                    WHERE tc.table_schema = 'public'
-                      AND tc.table_name = %s
-                      AND tc.constraint_type = 'FOREIGN KEY';
-                    """,
-                    (table,),
-                )
-                self.fk_constraints = cur.fetchall()
-
-                # CHECK
-                cur.execute(
-                    """
-                    SELECT con.constraint_name, con.check_clause
-                    FROM information_schema.check_constraints con
-                    JOIN information_schema.table_constraints tc
-                      ON con.constraint_name = tc.constraint_name
-                    WHERE tc.table_schema = 'public'
-                      AND tc.table_name = %s;
-                    """,
-                    (table,),
-                )
-                raw_checks = cur.fetchall()
-
+            cons = self.db.catalog.constraints(table, ("u", "f", "c"))
         except Exception as e:
             app_logger.error(f"Ошибка загрузки ограничений для {table}: {e}")
             return
 
+        raw_checks = []
+        for con in cons:
+            name = con["constraint_name"]
+            if con["contype"] == "u":
+                for col in con["columns"]:
+                    self.unique_constraints.append(
+                        {"constraint_name": name, "column_name": col}
+                    )
+            elif con["contype"] == "f":
+                for col, ref_col in zip(con["columns"], con["ref_columns"]):
+                    self.fk_constraints.append({
+                        "constraint_name": name,
+                        "local_column": col,
+                        "foreign_table": con["ref_table"],
+                        "foreign_column": ref_col,
+                    })
+            else:
+                raw_checks.append(
+                    {"constraint_name": name, "check_clause": con["check_clause"]}
+                )
+
         for uc in self.unique_constraints:
             name = uc.get("constraint_name")
             col = uc.get("column_name")
@@ -853,9 +825,11 @@ class AlterTableWindow(QDialog):
             return
 
         sql = f'ALTER TABLE public."{old}" RENAME TO "{new}";'
-        self._execute(sql, f"Таблица {old} переименована в {new}.")
-        self._load_tables()
-        self.cb_table.setCurrentText(new)
+        def after():
+            self._load_tables()
+            self.cb_table.setCurrentText(new)
+
+        self._execute(sql, f"Таблица {old} переименована в {new}.", after)
 
     def _rename_column(self):
         table = self.cb_table.currentText()
@@ -915,7 +889,6 @@ class AlterTableWindow(QDialog):
 
         sql = f'ALTER TABLE public."{table}" ADD CONSTRAINT "{name}" UNIQUE ("{col}");'
         self._execute(sql, f"UNIQUE {name} добавлен.")
-        self._load_constraints()
 
     def _drop_unique(self):
         table = self.cb_table.currentText()
@@ -932,7 +905,6 @@ class AlterTableWindow(QDialog):
 
         sql = f'ALTER TABLE public."{table}" DROP CONSTRAINT "{name}";'
         self._execute(sql, f"UNIQUE {name} удалён.")
-        self._load_constraints()
 
     def _add_fk(self):
         table = self.cb_table.currentText()
@@ -955,7 +927,6 @@ class AlterTableWindow(QDialog):
             f'ON DELETE {on_delete} ON UPDATE {on_update};'
         )
         self._execute(sql, f"FK {name} добавлен.")
-        self._load_constraints()
 
     def _drop_fk(self):
         table = self.cb_table.currentText()
@@ -972,7 +943,6 @@ class AlterTableWindow(QDialog):
 
         sql = f'ALTER TABLE public."{table}" DROP CONSTRAINT "{name}";'
         self._execute(sql, f"FK {name} удалён.")
-        self._load_constraints()
 
     # CHECK
 
@@ -1011,7 +981,6 @@ class AlterTableWindow(QDialog):
         self._execute(sql, f"CHECK {name} добавлен.")
         self.le_check_val1.clear()
         self.le_check_name.clear()
-        self._load_constraints()
 
     def _add_custom_check(self):
         # пользователь вводит руками
@@ -1033,7 +1002,6 @@ class AlterTableWindow(QDialog):
         self._execute(sql, f"CHECK {name} добавлен.")
         self.le_check_custom_expr.clear()
         self.le_check_name.clear()
-        self._load_constraints()
 
     def _drop_check(self):
         table = self.cb_table.currentText()
@@ -1050,15 +1018,23 @@ class AlterTableWindow(QDialog):
 
         sql = f'ALTER TABLE public."{table}" DROP CONSTRAINT "{name}";'
         self._execute(sql, f"CHECK {name} удалён.")
-        self._load_constraints()
 
 
-    def _execute(self, sql: str, msg: str):
-        try:
-            self.db.execute_ddl(sql)
+    def _execute(self, sql: str, msg: str, after=None):
+        # после успеха перечитываем колонки и ограничения, after — доп. действие
+        def done(_):
             QMessageBox.information(self, "Готово", msg)
             app_logger.info(sql)
             self._load_table_info()
-        except Exception as e:
+            if after:
+                after()
+
+        def failed(e):
             QMessageBox.critical(self, "Ошибка", str(e))
             app_logger.error(e)
+
+        self.runner.run(lambda: self.db.execute_ddl(sql), done, failed, text="Изменение таблицы…")
+
+    def done(self, result):
+        self.runner.cancel()
+        super().done(result)
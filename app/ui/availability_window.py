@@ -0,0 +1,179 @@
+from PySide6.QtWidgets import (
+    QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QComboBox,
+    QPushButton, QSpinBox, QDateEdit, QMessageBox,
+)
+from PySide6.QtCore import QDate
+
+from app.log.log import app_logger
+from app.ui.query_runner import QueryRunner
+from app.ui.result_model import ResultTableModel, make_result_view
+from app.ui.theme import *
+
+
+# поиск свободных номеров на период (Database.free_rooms)
+class AvailabilityWindow(QMainWindow):
+    def __init__(self, db, parent=None):
+        super().__init__(parent)
+        self.db = db
+
+        self.setWindowTitle("Свободные номера")
+        self.resize(900, 560)
+
+        self.setStyleSheet(f"""
+            QMainWindow {{
+                background-color: {WINDOW_BG};
+                color: {TEXT_MAIN};
+            }}
+            QLabel {{
+                color: {TEXT_SOFT};
+            }}
+            QComboBox, QSpinBox, QDateEdit {{
+                background-color: {CENTRAL_BG};
+                color: {TEXT_MAIN};
+                border: 1px solid {CARD_BORDER};
+                border-radius: 6px;
+                padding: 4px 8px;
+            }}
+            QTableView {{
+                background-color: {CENTRAL_BG};
+                color: {TEXT_MAIN};
+                gridline-color: #404040;
+                border: 1px solid {CARD_BORDER};
+                border-radius: 8px;
+            }}
+            QHeaderView::section {{
+                background-color: {CARD_BG};
+                color: {TEXT_SOFT};
+                padding: 6px;
+                border: none;
+                border-right: 1px solid {CARD_BORDER};
+                font-weight: bold;
+            }}
+            QPushButton {{
+                background-color: {BTN_BG};
+                color: {BTN_TEXT};
+                border: 1px solid {BTN_BORDER};
+                border-radius: 8px;
+                padding: 6px 14px;
+            }}
+            QPushButton:hover {{
+                background-color: {BTN_BG_HOVER};
+            }}
+        """)
+
+        self._build_ui()
+        self._search()
+
+    def _build_ui(self):
+        central = QWidget()
+        self.setCentralWidget(central)
+        layout = QVBoxLayout(central)
+        layout.setContentsMargins(12, 12, 12, 12)
+        layout.setSpacing(10)
+
+        top = QHBoxLayout()
+        layout.addLayout(top)
+
+        today = QDate.currentDate()
+        top.addWidget(QLabel("Заезд"))
+        self.date_from = QDateEdit(today)
+        self.date_from.setCalendarPopup(True)
+        top.addWidget(self.date_from)
+
+        top.addWidget(QLabel("Выезд"))
+        self.date_to = QDateEdit(today.addDays(1))
+        self.date_to.setCalendarPopup(True)
+        top.addWidget(self.date_to)
+
+        top.addWidget(QLabel("Мест от"))
+        self.sb_capacity = QSpinBox()
+        self.sb_capacity.setRange(0, 20)
+        self.sb_capacity.setSpecialValueText("любое")
+        top.addWidget(self.sb_capacity)
+
+        top.addWidget(QLabel("Комфорт"))
+        self.cb_comfort = QComboBox()
+        self.cb_comfort.addItem("любой", None)
+        for label in self.db.catalog.enum_values("comfort_enum") or []:
+            self.cb_comfort.addItem(label, label)
+        top.addWidget(self.cb_comfort)
+
+        top.addStretch(1)
+        self.btn_search = QPushButton("Найти")
+        self.btn_search.clicked.connect(self._search)
+        top.addWidget(self.btn_search)
+
+        # заезд сдвигает выезд, чтобы период не стал пустым
+        self.date_from.dateChanged.connect(self._on_from_changed)
+
+        bottom_row = QHBoxLayout()
+        self.lbl_result = QLabel("")
+        bottom_row.addWidget(self.lbl_result, 1)
+        # ограничение-исключение не входит в схему: нужен btree_gist и данные без пересечений
+        self.btn_overlap = QPushButton("Запретить пересечения…")
+        self.btn_overlap.clicked.connect(self._install_overlap_check)
+        bottom_row.addWidget(self.btn_overlap)
+        layout.addLayout(bottom_row)
+
+        self.result_model = ResultTableModel(self)
+        self.table = make_result_view(self.result_model, stretch=True)
+        layout.addWidget(self.table, 1)
+
+        self.runner = QueryRunner(self.db, self)
+        layout.addWidget(self.runner.panel)
+
+    def _on_from_changed(self, date: QDate):
+        if self.date_to.date() <= date:
+            self.date_to.setDate(date.addDays(1))
+
+    def _search(self):
+        date_from = self.date_from.date().toPython()
+        date_to = self.date_to.date().toPython()
+        if date_to <= date_from:
+            QMessageBox.warning(self, "Даты", "Дата выезда должна быть позже даты заезда.")
+            return
+        capacity = self.sb_capacity.value() or None
+        comfort = self.cb_comfort.currentData()
+
+        def job():
+            return self.db.free_rooms(date_from, date_to, capacity, comfort)
+
+        def done(rows: list[dict]):
+            nights = (date_to - date_from).days
+            self.lbl_result.setText(
+                f"Свободно номеров: {len(rows)} · {date_from:%d.%m.%Y} — {date_to:%d.%m.%Y} ({nights} ноч.)"
+            )
+            if rows:
+                self.result_model.set_rows(list(rows[0].keys()), rows)
+            else:
+                self.result_model.show_message("Свободных номеров на эти даты нет")
+
+        self.runner.run(job, done, self._on_error, text="Поиск свободных номеров…")
+
+    def _install_overlap_check(self):
+        answer = QMessageBox.question(
+            self, "Запрет пересечений",
+            "Запретить два действующих проживания одного номера на пересекающиеся даты?\n\n"
+            "Для обычной таблицы stays нужно расширение btree_gist; уже имеющиеся "
+            "пересечения придётся сначала исправить.",
+        )
+        if answer != QMessageBox.Yes:
+            return
+
+        def done(what: str):
+            QMessageBox.information(self, "Готово", f"Пересечения запрещены: {what}.")
+
+        def failed(e: Exception):
+            app_logger.error(f"stays overlap check error: {e}")
+            QMessageBox.critical(self, "Ошибка", f"Не удалось запретить пересечения:\n{e}")
+
+        self.runner.run(self.db.install_stay_overlap_check, done, failed,
+                        text="Установка запрета пересечений…")
+
+    def _on_error(self, e: Exception):
+        QMessageBox.critical(self, "Ошибка", f"Ошибка поиска номеров:\n{e}")
+        app_logger.error(f"free_rooms error: {e}")
+
+    def closeEvent(self, event):
+        self.runner.cancel()
+        super().closeEvent(event)
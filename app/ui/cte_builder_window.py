@@ -1,15 +1,19 @@
 from PySide6.QtWidgets import (
-    QMainWindow, QVBoxLayout, QWidget, QTableWidget, QTableWidgetItem,
+    QMainWindow, QVBoxLayout, QWidget,
     QHBoxLayout, QLabel, QLineEdit, QPushButton, QComboBox, QMessageBox,
-    QListWidget, QListWidgetItem, QFrame, QScrollArea, QHeaderView,
-    QTabWidget, QInputDialog, QAbstractItemView,   # ← ДОБАВЬ ЭТО
+    QListWidget, QListWidgetItem, QFrame, QScrollArea,
+    QTabWidget, QInputDialog,
 )
 from PySide6.QtCore import Qt, QRegularExpression
-from PySide6.QtGui import QColor, QRegularExpressionValidator
+from PySide6.QtGui import QRegularExpressionValidator
 
 from app.log.log import app_logger
 from app.ui.collapsible_section import CollapsibleSection
 from app.ui.data_window import WhereBuilderWidget, HavingBuilderWidget
+from app.ui.explain_window import ExplainWindow
+from app.ui.export_dialog import export_result
+from app.ui.result_model import ResultTableModel, make_result_view
+from app.ui.query_runner import QueryRunner
 
 import re
 from app.ui.theme import *
@@ -96,7 +100,7 @@ class CteBuilderWindow(QMainWindow):
                 color: {ACCENT_PRIMARY};
                 font-weight: bold;
             }}
-            QTableWidget {{
+            QTableView {{
                 background-color: {CENTRAL_BG};
                 color: {TEXT_MAIN};
                 gridline-color: #404040;
@@ -104,13 +108,13 @@ class CteBuilderWindow(QMainWindow):
                 border-radius: 8px;
                 alternate-background-color: {CARD_BG};
             }}
-            QTableWidget::item {{
+            QTableView::item {{
                 background-color: {CENTRAL_BG};
                 color: {TEXT_MAIN};
                 padding: 6px;
                 border-bottom: 1px solid {CARD_BORDER};
             }}
-            QTableWidget::item:selected {{
+            QTableView::item:selected {{
                 background-color: {ACCENT_PRIMARY};
                 color: {WINDOW_BG};
                 font-weight: bold;
@@ -422,7 +426,15 @@ class CteBuilderWindow(QMainWindow):
         self.btn_save_mat_view = QPushButton("Сохранить как MATERIALIZED VIEW")
         self.btn_save_mat_view.clicked.connect(self._save_as_mat_view)
 
+        self.btn_export = QPushButton("Экспорт…")
+        self.btn_export.clicked.connect(self._export_result)
+
+        self.btn_explain = QPushButton("Explain")
+        self.btn_explain.clicked.connect(self._explain_result)
+
         bl.addWidget(self.btn_run)
+        bl.addWidget(self.btn_explain)
+        bl.addWidget(self.btn_export)
         bl.addStretch()
         bl.addWidget(self.btn_save_cte)
         bl.addWidget(self.btn_save_view)
@@ -433,15 +445,19 @@ class CteBuilderWindow(QMainWindow):
         body_layout.addWidget(left, 0)
 
         # ---- правая таблица результата ----
-        self.table = QTableWidget()
-        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
-        self.table.setSelectionBehavior(QTableWidget.SelectRows)
-        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        # результат читается пачками по мере прокрутки
+        self.result_model = ResultTableModel(self)
+        self.table = make_result_view(self.result_model, stretch=True)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
 
         body_layout.addWidget(self.table, 1)
 
         main_layout.addWidget(body)
 
+        # запрос выполняется в фоне: крутилка и кнопка отмены
+        self.runner = QueryRunner(self.db, self)
+        main_layout.addWidget(self.runner.panel)
+
     def _build_case_null_section(self, parent_layout: QVBoxLayout):
         """Секция 'CASE / Работа с NULL' во вкладке CASE / NULL."""
 
@@ -598,24 +614,10 @@ class CteBuilderWindow(QMainWindow):
         items: list[str] = []
 
         try:
-            with self.db.cursor() as cur:
-                if kind == "Таблица":
-                    q = """
-                        SELECT table_name
-                        FROM information_schema.tables
-                        WHERE table_schema = 'public' AND table_type = 'BASE TABLE'
-                        ORDER BY table_name;
-                    """
-                else:
-                    q = """
-                        SELECT table_name
-                        FROM information_schema.views
-                        WHERE table_schema = 'public'
-                        ORDER BY table_name;
-                    """
-                cur.execute(q)
-                rows = cur.fetchall()
-                items = [r["table_name"] for r in rows]
+            if kind == "Таблица":
+                items = self.db.catalog.base_tables()
+            else:
+                items = self.db.catalog.views()
         except Exception as e:
             app_logger.error(f"Ошибка загрузки списка источников для CTE: {e}")
             items = []
@@ -651,15 +653,7 @@ class CteBuilderWindow(QMainWindow):
         self.col_types.clear()
 
         try:
-            q = """
-                SELECT column_name, data_type
-                FROM information_schema.columns
-                WHERE table_schema = %s AND table_name = %s
-                ORDER BY ordinal_position;
-            """
-            with self.db.cursor() as cur:
-                cur.execute(q, (self.current_source_schema, name))
-                rows = cur.fetchall()
+            rows = self.db.catalog.columns(name)
         except Exception as e:
             app_logger.error(f"Ошибка получения колонок для CTE-источника {name}: {e}")
             rows = []
@@ -667,7 +661,7 @@ class CteBuilderWindow(QMainWindow):
         for r in rows:
             col_name = r["column_name"]
             self.all_columns.append(col_name)
-            self.col_types[col_name] = r.get("data_type", "text")
+            self.col_types[col_name] = r.get("data_type") or "text"
 
         # SELECT список
         self.columns_list.clear()
@@ -950,39 +944,47 @@ class CteBuilderWindow(QMainWindow):
 
         app_logger.info(f"CTEBuilder SQL: {sql}")
 
-        # 2. Выполняем SQL
-        try:
-            with self.db.cursor() as cur:
-                cur.execute(sql)
-                rows = cur.fetchall()
-        except Exception as e:
-            app_logger.error(f"Ошибка выполнения CTE-запроса: {e}")
-            QMessageBox.critical(self, "Ошибка", f"Ошибка выполнения запроса:\n{e}")
-            return
+        # 2. Выполняем SQL в фоне, первая пачка строк придёт в _on_result_loaded
+        self.result_model.start_async(
+            self.runner,
+            lambda: self.db.stream(sql),
+            on_done=self._on_result_loaded,
+            on_error=self._on_result_error,
+        )
+
+    def _on_result_error(self, e: Exception):
+        app_logger.error(f"Ошибка выполнения CTE-запроса: {e}")
+        QMessageBox.critical(self, "Ошибка", f"Ошибка выполнения запроса:\n{e}")
 
+    def _on_result_loaded(self, rows_count: int):
         # 3. Обработка результата
-        if not rows:
-            self.table.clear()
-            self.table.setRowCount(0)
-            self.table.setColumnCount(0)
+        if not rows_count:
+            self.result_model.clear()
             app_logger.info("CTEBuilder: запрос выполнен, но вернул 0 строк")
             QMessageBox.information(
                 self,
                 "Результат CTE",
                 "Запрос успешно выполнен, но не вернул ни одной строки.",
             )
-            return
 
-        cols = list(rows[0].keys())
-        self.table.setColumnCount(len(cols))
-        self.table.setRowCount(len(rows))
-        self.table.setHorizontalHeaderLabels(cols)
+    def _export_result(self):
+        try:
+            sql = self._build_cte_sql()
+        except Exception as e:
+            QMessageBox.critical(self, "Ошибка", f"Ошибка при сборке SQL:\n{e}")
+            return
+        name = self.cte_name_edit.text().strip() or "cte_result"
+        export_result(self, self.db, sql, default_name=name)
 
-        for r_idx, row in enumerate(rows):
-            for c_idx, col in enumerate(cols):
-                val = row[col]
-                text = "" if val is None else str(val)
-                self.table.setItem(r_idx, c_idx, QTableWidgetItem(text))
+    def _explain_result(self):
+        try:
+            sql = self._build_cte_sql()
+        except Exception as e:
+            QMessageBox.critical(self, "Ошибка", f"Ошибка при сборке SQL:\n{e}")
+            return
+        name = self.cte_name_edit.text().strip() or "cte_result"
+        wnd = ExplainWindow(self.db, sql, name, self)
+        wnd.show()
 
     def _validate_object_name(self, name: str, title: str) -> bool:
         name = name.strip()
@@ -1045,8 +1047,7 @@ class CteBuilderWindow(QMainWindow):
             return
 
         try:
-            with self.db.cursor() as cur:
-                cur.execute(f"CREATE OR REPLACE VIEW {name} AS {sql_select}")
+            self.db.create_view(name, sql_select)
             QMessageBox.information(self, "VIEW", f"Представление {name} успешно создано.")
             app_logger.info(f"Создано VIEW {name} через CTE-конструктор")
         except Exception as e:
@@ -1061,8 +1062,7 @@ class CteBuilderWindow(QMainWindow):
             return
 
         try:
-            with self.db.cursor() as cur:
-                cur.execute(f"CREATE MATERIALIZED VIEW {name} AS {sql_select}")
+            self.db.create_mat_view(name, sql_select)
 
             QMessageBox.information(
                 self,
@@ -1078,4 +1078,9 @@ class CteBuilderWindow(QMainWindow):
                 self,
                 "Ошибка",
                 f"Не удалось создать MATERIALIZED VIEW {name}:\n{e}"
-            )
\ No newline at end of file
+            )
+
+    def closeEvent(self, event):
+        self.runner.cancel()
+        self.result_model.close()
+        super().closeEvent(event)
@@ -3,16 +3,23 @@ import re
 
 from PySide6.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QInputDialog,
-    QLabel, QPushButton, QTableWidget, QTableWidgetItem, QDialog,
+    QLabel, QPushButton, QDialog,
     QListWidget, QListWidgetItem, QLineEdit, QComboBox, QTabWidget,
-    QMessageBox, QHeaderView, QAbstractItemView, QScrollArea, QFrame,
+    QMessageBox, QScrollArea, QFrame, QCheckBox,
 )
-from PySide6.QtCore import Qt, QRegularExpression
-from PySide6.QtGui import QColor, QRegularExpressionValidator
+from PySide6.QtCore import Qt, QRegularExpression, QTimer
+from PySide6.QtGui import QRegularExpressionValidator
 
+from app.db.listener import ALL_TABLES
 from app.log.log import app_logger
 from app.ui.collapsible_section import CollapsibleSection
 from app.ui.cte_storage import GLOBAL_SAVED_CTES
+from app.ui.result_model import ResultTableModel, make_result_view, show_sort_indicator
+from app.ui.result_filter import ALL_COLUMNS, ResultFilter, ResultFilterProxy
+from app.ui.export_dialog import export_result
+from app.ui.explain_window import ExplainWindow
+from app.ui.query_runner import QueryRunner
+from app.ui.live_refresh import LiveRefresh
 
 import re
 from app.ui.theme import *
@@ -578,6 +585,8 @@ class DataWindow(QMainWindow):
         self.search_column = QComboBox()
         self.search_mode = QComboBox()
         self.search_mode.addItems([
+            "АВТО",
+            "%",
             "LIKE",
             "ILIKE",
             "~",
@@ -589,6 +598,11 @@ class DataWindow(QMainWindow):
         ])
         self.search_value = QLineEdit()
         self.search_value.setPlaceholderText("Строка / шаблон для поиска")
+        self.search_mode.setToolTip(
+            "АВТО — по колонке с триграммным индексом: подстрока или похожее значение\n"
+            "(с опечатками), лучшие совпадения первыми; без индекса — ILIKE.\n"
+            "% — похожие значения (pg_trgm)."
+        )
 
         self.btn_apply_search = QPushButton("Применить поиск")
         self.btn_apply_search.clicked.connect(self._load_data)
@@ -601,7 +615,7 @@ class DataWindow(QMainWindow):
         sh.addWidget(self.search_value)
         sh.addWidget(self.btn_apply_search)
 
-        search_section = CollapsibleSection("Поиск по строкам (LIKE / Regex / SIMILAR)", search_widget)
+        search_section = CollapsibleSection("Поиск по строкам (триграммы / LIKE / Regex / SIMILAR)", search_widget)
         filters_layout.addWidget(search_section)
 
         # Подзапросы ANY / ALL / EXISTS
@@ -773,7 +787,17 @@ class DataWindow(QMainWindow):
         # Кнопка обновления под табами
         self.btn_refresh = QPushButton("Обновить данные")
         self.btn_refresh.clicked.connect(self._load_data)
-        left_layout.addWidget(self.btn_refresh, alignment=Qt.AlignRight)
+        self.btn_export = QPushButton("Экспорт…")
+        self.btn_export.clicked.connect(self._export_result)
+        self.btn_explain = QPushButton("Explain")
+        self.btn_explain.clicked.connect(self._explain_result)
+
+        refresh_row = QHBoxLayout()
+        refresh_row.addStretch()
+        refresh_row.addWidget(self.btn_explain)
+        refresh_row.addWidget(self.btn_export)
+        refresh_row.addWidget(self.btn_refresh)
+        left_layout.addLayout(refresh_row)
 
         split.addWidget(scroll, 3)
 
@@ -791,29 +815,68 @@ class DataWindow(QMainWindow):
         search_row.addWidget(self.result_search_column)
 
         self.result_search_edit = QLineEdit()
-        self.result_search_edit.setPlaceholderText("Введите текст для фильтрации")
+        self.result_search_edit.setPlaceholderText("Слова через пробел, колонка:текст")
         search_row.addWidget(self.result_search_edit)
 
-        # фильтрация при вводе и смене колонки
-        self.result_search_edit.textChanged.connect(self._apply_result_filter)
+        self.result_search_regex = QCheckBox("Regex")
+        search_row.addWidget(self.result_search_regex)
+
+        self.lbl_result_filter = QLabel("")
+        search_row.addWidget(self.lbl_result_filter)
+
+        # фильтрация после паузы во вводе, при смене колонки / режима — сразу
+        self._filter_timer = QTimer(self)
+        self._filter_timer.setSingleShot(True)
+        self._filter_timer.setInterval(200)
+        self._filter_timer.timeout.connect(self._apply_result_filter)
+        self.result_search_edit.textChanged.connect(self._filter_timer.start)
         self.result_search_column.currentIndexChanged.connect(self._apply_result_filter)
+        self.result_search_regex.toggled.connect(self._apply_result_filter)
 
         main_layout.addLayout(search_row)
 
-        self.table = QTableWidget()
+        # таблицы запроса изменились на другом рабочем месте: результат JOIN /
+        # группировки по id не обновить, поэтому предлагаем перечитать
+        self.stale_panel = QWidget()
+        stale_row = QHBoxLayout(self.stale_panel)
+        stale_row.setContentsMargins(0, 0, 0, 0)
+        self.lbl_stale = QLabel("")
+        self.lbl_stale.setStyleSheet(f"color: {ACCENT_WARNING};")
+        btn_stale = QPushButton("Обновить")
+        btn_stale.clicked.connect(self._load_data)
+        stale_row.addWidget(self.lbl_stale, 1)
+        stale_row.addWidget(btn_stale)
+        self.stale_panel.hide()
+        main_layout.addWidget(self.stale_panel)
+
+        # модель результата: строки подкачиваются пачками при прокрутке,
+        # ячейки не создаются как отдельные Qt-объекты
+        self.result_model = ResultTableModel(self, none_text="None")
+        self.result_model.on_batch = self._on_result_batch
+
+        # нормальные размеры колонок (можно руками тянуть) + горизонтальный скролл
+        # клик по заголовку сортирует полученные строки; недочитанный поток — запросом
+        self.table = make_result_view(self.result_model, sortable=True)
+        self.result_model.on_sort_request = self._sort_on_server
+        self._header_sort = None  # (колонка, порядок) сортировки, отданной серверу
         self.table.setAlternatingRowColors(True)
-        self.table.verticalHeader().setVisible(False)
-
-        # нормальные размеры колонок + горизонтальный скролл
-        header = self.table.horizontalHeader()
-        header.setStretchLastSection(False)
-        header.setSectionResizeMode(QHeaderView.Interactive)  # можно руками тянуть
 
-        self.table.setHorizontalScrollMode(QAbstractItemView.ScrollPerPixel)
-        self.table.setHorizontalScrollBarPolicy(Qt.ScrollBarAsNeeded)
+        # фильтр по полученным строкам — через прокси с маской строк
+        self.result_filter = ResultFilter(self.result_model)
+        self.result_proxy = ResultFilterProxy(self)
+        self.result_proxy.setSourceModel(self.result_model)
+        self.table.setModel(self.result_proxy)
+        # после сортировки строки переставлены — маску считаем заново
+        self.result_model.layoutChanged.connect(self._apply_result_filter)
 
         main_layout.addWidget(self.table)
 
+        # запросы выполняются в фоне, панель с крутилкой и кнопкой отмены
+        self.runner = QueryRunner(self.db, self)
+        main_layout.addWidget(self.runner.panel)
+
+        self.live = LiveRefresh(self.db, self)
+        self.live.changed.connect(self._on_live_change)
 
         # служебная инфа
         self._load_all_column_lists()
@@ -824,7 +887,7 @@ class DataWindow(QMainWindow):
         self._load_string_op_columns()
 
         self.table.setStyleSheet("""
-                    QTableWidget {
+                    QTableView {
                         background-color: #111827;
                         gridline-color: #374151;
                         selection-background-color: #4B5563;
@@ -848,50 +911,46 @@ class DataWindow(QMainWindow):
         if not hasattr(self, "result_search_column"):
             return
 
+        current = self.result_search_column.currentText()
         self.result_search_column.blockSignals(True)
         self.result_search_column.clear()
 
-        headers = []
-        for c in range(self.table.columnCount()):
-            item = self.table.horizontalHeaderItem(c)
-            if item:
-                headers.append(item.text())
+        headers = list(self.result_model.columns)
 
         if headers:
+            self.result_search_column.addItem(ALL_COLUMNS)
             self.result_search_column.addItems(headers)
+            # выбранная колонка остаётся, если она есть и в новом результате
+            idx = self.result_search_column.findText(current)
+            if idx >= 0:
+                self.result_search_column.setCurrentIndex(idx)
 
         self.result_search_column.blockSignals(False)
 
     def _apply_result_filter(self):
-        """Фильтр по подстроке внутри выбранной колонки"""
-        if not hasattr(self, "result_search_edit") or self.table.rowCount() == 0:
+        """Фильтр по подстрокам (или regex) в выбранной колонке / во всех колонках"""
+        if not hasattr(self, "result_proxy"):
             return
+        self._filter_timer.stop()
 
-        text = self.result_search_edit.text().strip().lower()
-        col_name = self.result_search_column.currentText() if hasattr(self, "result_search_column") else ""
-
-        # если строка пустая — показываем всё
-        if not text or not col_name:
-            for r in range(self.table.rowCount()):
-                self.table.setRowHidden(r, False)
-            return
-
-        # ищем индекс выбранной колонки
-        col_idx = -1
-        for c in range(self.table.columnCount()):
-            item = self.table.horizontalHeaderItem(c)
-            if item and item.text() == col_name:
-                col_idx = c
-                break
-
-        if col_idx == -1:
+        try:
+            mask = self.result_filter.mask(
+                self.result_search_edit.text(),
+                self.result_search_column.currentText(),
+                self.result_search_regex.isChecked(),
+            )
+        except re.error as e:
+            # прежний фильтр остаётся, пока выражение не исправят
+            self.lbl_result_filter.setStyleSheet(f"color: {DANGER_BG};")
+            self.lbl_result_filter.setText(f"Ошибка в regex: {e}")
             return
 
-        # прячем строки, где нет подстроки
-        for r in range(self.table.rowCount()):
-            item = self.table.item(r, col_idx)
-            value = item.text().lower() if item else ""
-            self.table.setRowHidden(r, text not in value)
+        self.result_proxy.set_mask(mask)
+        self.lbl_result_filter.setStyleSheet(f"color: {TEXT_SOFT};")
+        if mask is None:
+            self.lbl_result_filter.setText("")
+        else:
+            self.lbl_result_filter.setText(f"{sum(mask)} из {len(mask)}")
 
     # ---------------------------------------------------------
     # Панель строковых операций (справа)
@@ -1356,25 +1415,29 @@ class DataWindow(QMainWindow):
     def _load_column_types(self):
         self.col_types.clear()
         tables = {self.join_info["table1"], self.join_info["table2"]}
+        enum_orders: dict[str, list[str]] = {}
 
         for table in tables:
             try:
-                q = """
-                    SELECT column_name, data_type
-                    FROM information_schema.columns
-                    WHERE table_schema = 'public' AND table_name = %s;
-                """
-                with self.db.cursor() as cur:
-                    cur.execute(q, (table,))
-                    cols = cur.fetchall()
+                columns = self.db.catalog.columns(table)
             except Exception as e:
                 app_logger.error(f"Ошибка получения типов для {table}: {e}")
                 continue
 
-            for col in cols:
-                full_name = f"{table}.{col['column_name']}"
-                dt = col.get("data_type", "text")
-                self.col_types[full_name] = dt
+            for col in columns:
+                col_name, dt = col["column_name"], col["data_type"]
+                full_name = f"{table}.{col_name}"
+                self.col_types[full_name] = dt or "text"
+
+                # порядок меток enum — для сортировки по заголовку; в результате
+                # колонка называется table_col (alias) или col (группировка)
+                if dt == "USER-DEFINED":
+                    labels = self.db.get_enum_labels(col["udt_name"])
+                    if labels:
+                        enum_orders[f"{table}_{col_name}"] = labels
+                        enum_orders[col_name] = labels
+
+        self.result_model.enum_orders = enum_orders
 
     def _apply_columns_to_builders(self):
         all_cols = list(self.join_info.get("selected_columns", []))
@@ -1409,15 +1472,7 @@ class DataWindow(QMainWindow):
     # Подзапросы: таблицы и их колонки
 
     def _load_subquery_tables(self):
-        q = """
-            SELECT table_name
-            FROM information_schema.tables
-            WHERE table_schema='public'
-            ORDER BY table_name;
-        """
-        with self.db.cursor() as cur:
-            cur.execute(q)
-            tables = [r["table_name"] for r in cur.fetchall()]
+        tables = self.db.catalog.tables()
 
         self.sub_table.clear()
         self.sub_table.addItems(tables)
@@ -1429,15 +1484,7 @@ class DataWindow(QMainWindow):
         if not table:
             return
 
-        q = """
-            SELECT column_name
-            FROM information_schema.columns
-            WHERE table_schema = 'public' AND table_name = %s
-            ORDER BY ordinal_position;
-        """
-        with self.db.cursor() as cur:
-            cur.execute(q, (table,))
-            cols = [r["column_name"] for r in cur.fetchall()]
+        cols = self.db.catalog.column_names(table)
 
         self.sub_right_col.clear()
         self.sub_right_col.addItems(cols)
@@ -1728,13 +1775,33 @@ class DataWindow(QMainWindow):
         if not name:
             return
 
+        # агрегат по двум таблицам можно обновлять по журналу изменений
+        spec = self._incremental_spec()
+        if spec is not None:
+            reply = QMessageBox.question(
+                self,
+                title,
+                "Этот агрегатный запрос можно обновлять инкрементально:\n"
+                "изменения базовых таблиц пишутся в журнал, а при обновлении\n"
+                "пересчитываются только затронутые группы.\n\n"
+                "Создать инкрементальное представление (таблица с журналом)?\n"
+                "«Нет» — обычный MATERIALIZED VIEW.",
+                QMessageBox.Yes | QMessageBox.No | QMessageBox.Cancel,
+            )
+            if reply == QMessageBox.Cancel:
+                return
+            if reply == QMessageBox.Yes:
+                self._save_as_incremental(name, spec)
+                return
+
         try:
             self.db.create_mat_view(name, sql)
             QMessageBox.information(
                 self,
                 title,
                 f'Материализованное представление "{name}" создано.\n'
-                "Его можно обновлять через REFRESH в окне «Представления и CTE».",
+                "Его можно обновлять через REFRESH или по расписанию\n"
+                "в окне «Представления и CTE».",
             )
             app_logger.info(f"MATERIALIZED VIEW {name} создано из DataWindow")
         except Exception as e:
@@ -1748,6 +1815,59 @@ class DataWindow(QMainWindow):
                 "в окне «Представления и CTE» и повторите попытку.",
             )
 
+    def _incremental_spec(self) -> dict | None:
+        """Описание запроса для IncrementalViews или None, если не подходит.
+
+        Нужны: INNER JOIN, агрегат, обычный GROUP BY и условия без
+        подзапроса к третьей таблице (её изменения журнал не видит).
+        """
+        info = self.join_info
+        if (info.get("join_type") or "").upper() != "INNER":
+            return None
+        if not (self.aggregate_func.currentText() and self.aggregate_target.currentText()):
+            return None
+        if self.group_mode.currentData() != "plain":
+            return None
+        group_cols = self._get_group_columns()
+        if not group_cols:
+            return None
+        if self.search_value.text().strip() and (self.sub_mode.currentText() or "").strip():
+            return None
+        for t in (info["table1"], info["table2"]):
+            if "id" not in self.db.catalog.column_names(t):
+                return None
+
+        return {
+            "table1": info["table1"],
+            "table2": info["table2"],
+            "col1": info["col1"],
+            "col2": info["col2"],
+            "where": self._where_clauses(),
+            "group_cols": group_cols,
+            "aggregate": f"{self.aggregate_func.currentText()}({self.aggregate_target.currentText()}) AS agg_value",
+            "having": self.having_builder.get_conditions(),
+        }
+
+    def _save_as_incremental(self, name: str, spec: dict):
+        title = "Сохранить как MATERIALIZED VIEW"
+        try:
+            self.db.incremental.create(name, spec)
+            QMessageBox.information(
+                self,
+                title,
+                f'Инкрементальное представление "{name}" создано.\n'
+                "REFRESH в окне «Представления и CTE» пересчитает только\n"
+                "группы, затронутые изменениями с прошлого обновления.",
+            )
+            app_logger.info(f"incremental view {name} создано из DataWindow")
+        except Exception as e:
+            app_logger.error(f"Ошибка создания инкрементального представления {name}: {e}")
+            QMessageBox.critical(
+                self,
+                title,
+                f"Не удалось создать инкрементальное представление:\n{e}",
+            )
+
     def _save_as_cte(self):
         # Сохранить текущий SELECT как CTE в менеджере предста
         title = "Сохранить как CTE"
@@ -1783,6 +1903,104 @@ class DataWindow(QMainWindow):
     # ---------------------------------------------------------
     # SQL builder
 
+    def _where_clauses(self) -> list[str]:
+        """Условия WHERE: конструктор, поиск и подзапрос."""
+        where_clauses = []
+
+        # WHERE из конструктора
+        where_clauses.extend(self.where_builder.get_conditions())
+
+        # поиск
+        if self.search_value.text().strip():
+            col = self.search_column.currentText()
+            mode = self.search_mode.currentText()
+            val = self.search_value.text().strip()
+            esc = val.replace("'", "''")
+
+            # тип колонки
+            data_type = self.col_types.get(col, "").lower()
+            is_text = any(x in data_type for x in ("char", "text"))
+
+            # для нетекстовых колонок ищем по col::text
+            col_expr = col if (is_text or not data_type) else f"{col}::text"
+
+            if mode == "АВТО":
+                sub = esc if ("%" in esc or "_" in esc) else f"%{esc}%"
+                if self._trgm_indexed(col):
+                    # ILIKE и % берут строки из одного триграммного индекса
+                    cond = f"({col} ILIKE '{sub}' OR {col} % '{esc}')"
+                else:
+                    cond = f"{col_expr} ILIKE '{sub}'"
+            elif mode == "%":
+                cond = f"{col_expr} % '{esc}'"
+            elif mode in ("LIKE", "ILIKE"):
+                if "%" not in esc and "_" not in esc:
+                    esc = f"%{esc}%"
+                cond = f"{col_expr} {mode} '{esc}'"
+            elif mode in ("~", "~*", "!~", "!~*"):
+                cond = f"{col_expr} {mode} '{esc}'"
+            elif mode == "SIMILAR TO":
+                cond = f"{col_expr} SIMILAR TO '{esc}'"
+            elif mode == "NOT SIMILAR TO":
+                cond = f"{col_expr} NOT SIMILAR TO '{esc}'"
+            else:
+                cond = f"{col_expr} LIKE '{esc}'"
+
+            where_clauses.append(cond)
+
+            # подзапрос ANY / ALL / EXISTS
+            mode = (self.sub_mode.currentText() or "").strip().upper()
+            if mode:
+                table = (self.sub_table.currentText() or "").strip()
+                where_expr = self.sub_where.currentText().strip()
+                cond = ""
+
+                if mode in ("EXISTS", "NOT EXISTS"):
+                    if table:
+                        sub_sql = f"(SELECT 1 FROM {table}"
+                        if where_expr:
+                            sub_sql += f" WHERE {where_expr}"
+                        sub_sql += ")"
+                        cond = f"{mode} {sub_sql}"
+
+                elif mode in ("ANY", "ALL"):
+                    # left op ANY/ALL (SELECT right_col FROM table [WHERE ...])
+                    left = (self.sub_left_col.currentText() or "").strip()
+                    right_col = (self.sub_right_col.currentText() or "").strip()
+                    op = (self.sub_operator.currentText() or "=").strip()
+
+                    if left and right_col and table:
+                        sub_sql = f"(SELECT {right_col} FROM {table}"
+                        if where_expr:
+                            sub_sql += f" WHERE {where_expr}"
+                        sub_sql += ")"
+                        cond = f"{left} {op} {mode} {sub_sql}"
+
+                if cond:
+                    where_clauses.append(cond)
+
+        return where_clauses
+
+    def _trgm_indexed(self, col: str) -> bool:
+        parts = col.replace('"', "").split(".")
+        return len(parts) == 2 and self.db.catalog.has_trgm_index(parts[0], parts[1])
+
+    def _search_rank(self) -> str | None:
+        """similarity() для сортировки нечёткого поиска или None."""
+        val = self.search_value.text().strip()
+        if not val:
+            return None
+        col = self.search_column.currentText()
+        mode = self.search_mode.currentText()
+        if mode == "АВТО" and not self._trgm_indexed(col):
+            return None
+        if mode not in ("АВТО", "%"):
+            return None
+        data_type = self.col_types.get(col, "").lower()
+        is_text = any(x in data_type for x in ("char", "text"))
+        col_expr = col if (is_text or not data_type) else f"{col}::text"
+        return f"similarity({col_expr}, '{val.replace(chr(39), chr(39) * 2)}') DESC"
+
     def _build_sql(self) -> str:
         info = self.join_info
         all_cols = info.get("selected_columns", [])
@@ -1851,70 +2069,7 @@ class DataWindow(QMainWindow):
             f"ON {info['table1']}.{info['col1']} = {info['table2']}.{info['col2']}"
         )
 
-        where_clauses = []
-
-        # WHERE из конструктора
-        where_clauses.extend(self.where_builder.get_conditions())
-
-        # поиск
-        if self.search_value.text().strip():
-            col = self.search_column.currentText()
-            mode = self.search_mode.currentText()
-            val = self.search_value.text().strip()
-            esc = val.replace("'", "''")
-
-            # тип колонки
-            data_type = self.col_types.get(col, "").lower()
-            is_text = any(x in data_type for x in ("char", "text"))
-
-            # для нетекстовых колонок ищем по col::text
-            col_expr = col if (is_text or not data_type) else f"{col}::text"
-
-            if mode in ("LIKE", "ILIKE"):
-                if "%" not in esc and "_" not in esc:
-                    esc = f"%{esc}%"
-                cond = f"{col_expr} {mode} '{esc}'"
-            elif mode in ("~", "~*", "!~", "!~*"):
-                cond = f"{col_expr} {mode} '{esc}'"
-            elif mode == "SIMILAR TO":
-                cond = f"{col_expr} SIMILAR TO '{esc}'"
-            elif mode == "NOT SIMILAR TO":
-                cond = f"{col_expr} NOT SIMILAR TO '{esc}'"
-            else:
-                cond = f"{col_expr} LIKE '{esc}'"
-
-            where_clauses.append(cond)
-
-            # подзапрос ANY / ALL / EXISTS
-            mode = (self.sub_mode.currentText() or "").strip().upper()
-            if mode:
-                table = (self.sub_table.currentText() or "").strip()
-                where_expr = self.sub_where.currentText().strip()
-                cond = ""
-
-                if mode in ("EXISTS", "NOT EXISTS"):
-                    if table:
-                        sub_sql = f"(SELECT 1 FROM {table}"
-                        if where_expr:
-                            sub_sql += f" WHERE {where_expr}"
-                        sub_sql += ")"
-                        cond = f"{mode} {sub_sql}"
-
-                elif mode in ("ANY", "ALL"):
-                    # left op ANY/ALL (SELECT right_col FROM table [WHERE ...])
-                    left = (self.sub_left_col.currentText() or "").strip()
-                    right_col = (self.sub_right_col.currentText() or "").strip()
-                    op = (self.sub_operator.currentText() or "=").strip()
-
-                    if left and right_col and table:
-                        sub_sql = f"(SELECT {right_col} FROM {table}"
-                        if where_expr:
-                            sub_sql += f" WHERE {where_expr}"
-                        sub_sql += ")"
-                        cond = f"{left} {op} {mode} {sub_sql}"
-
-                if cond:
-                    where_clauses.append(cond)
+        where_clauses = self._where_clauses()
 
         if where_clauses:
             q += " WHERE " + " AND ".join(where_clauses)
@@ -1949,8 +2104,15 @@ class DataWindow(QMainWindow):
 
         # ORDER BY
         order_col = self.order_col.currentText().strip()
+        order_parts = []
+        # нечёткий поиск: лучшие совпадения первыми, выбранная сортировка — при равенстве
+        rank = None if aggregate_mode else self._search_rank()
+        if rank:
+            order_parts.append(rank)
         if order_col:
-            q += f" ORDER BY {order_col} {self.order_dir.currentText().strip()}"
+            order_parts.append(f"{order_col} {self.order_dir.currentText().strip()}")
+        if order_parts:
+            q += " ORDER BY " + ", ".join(order_parts)
 
         return q + ";"
 
@@ -1962,33 +2124,8 @@ class DataWindow(QMainWindow):
         if not alias:
             return
 
-        col_index = -1
-        for c in range(self.table.columnCount()):
-            header_item = self.table.horizontalHeaderItem(c)
-            if header_item and header_item.text() == alias:
-                col_index = c
-                break
-
-        if col_index == -1:
-            return
-
-        # спокойный, но заметный цвет для нового столбца
-        highlight_bg = QColor("#064e3b") # тёмно-зелёный
-        header_bg = QColor("#047857") # чуть ярче для заголовка
-
-        for r in range(self.table.rowCount()):
-            item = self.table.item(r, col_index)
-            if not item:
-                item = QTableWidgetItem("")
-                self.table.setItem(r, col_index, item)
-            item.setBackground(highlight_bg)
-
-        header_item = self.table.horizontalHeaderItem(col_index)
-        if header_item:
-            header_item.setBackground(header_bg)
-            f = header_item.font()
-            f.setBold(True)
-            header_item.setFont(f)
+        # цвет столбца и заголовка задаёт модель (тёмно-зелёный / чуть ярче)
+        self.result_model.set_highlight_column(alias)
 
     # ---------------------------------------------------------
     # Загрузка и отображение данных
@@ -1996,34 +2133,133 @@ class DataWindow(QMainWindow):
     def _load_data(self):
         try:
             sql = self._build_sql()
-            app_logger.info(f"DataWindow SQL: {sql}")
+        except Exception as e:
+            QMessageBox.critical(self, "Ошибка", f"Ошибка при сборке SQL:\n{e}")
+            app_logger.error(f"DataWindow SQL build error: {e}")
+            return
 
-            with self.db.cursor() as cur:
-                cur.execute(sql)
-                rows = cur.fetchall()
+        app_logger.info(f"DataWindow SQL: {sql}")
+        self.stale_panel.hide()
+        self._note_index_usage()
+        # запрос и первая пачка строк — в фоне, окно не замирает
+        self.result_model.start_async(
+            self.runner,
+            lambda: self.db.stream(sql),
+            on_done=self._on_data_loaded,
+            on_error=self._on_data_error,
+        )
 
-            if not rows:
-                self.table.setRowCount(0)
-                self.table.setColumnCount(0)
-                return
+    def _note_index_usage(self):
+        """Колонки фильтров, JOIN, группировки и сортировки — советнику индексов."""
+        advisor = self.db.index_advisor
+        info = self.join_info
+        try:
+            advisor.note(info["table1"], info["col1"], "join")
+            advisor.note(info["table2"], info["col2"], "join")
+
+            for cond in self.where_builder.get_conditions():
+                parts = cond.split(" ", 2)
+                if len(parts) < 2 or parts[1] == "<>":
+                    continue
+                kind = "search" if parts[1] in ("LIKE", "ILIKE") else "filter"
+                advisor.note_ref(parts[0], kind)
+
+            if self.search_value.text().strip():
+                advisor.note_ref(self.search_column.currentText(), "search")
+
+            if self.group_mode.currentData() != "none":
+                for col in self._get_group_columns():
+                    advisor.note_ref(col, "group")
+
+            order_col = self.order_col.currentText().strip()
+            if order_col:
+                advisor.note_ref(order_col, "sort")
+        except Exception as e:
+            app_logger.error(f"index advisor: {e}")
 
-            cols = list(rows[0].keys())
-            self.table.setColumnCount(len(cols))
-            self.table.setHorizontalHeaderLabels(cols)
-            self.table.setRowCount(len(rows))
+    def _on_data_loaded(self, rows_count: int):
+        if self.result_model.rowCount() == 0:
+            self._header_sort = None
+            self.result_model.clear()
+            return
 
-            for r, row in enumerate(rows):
-                for c, col in enumerate(cols):
-                    self.table.setItem(r, c, QTableWidgetItem(str(row[col])))
+        # обновление правой панели
+        self._load_string_op_columns()
 
-                # подсветка нового столбца и обновление правой панели
-            self._highlight_string_column()
-            self._load_string_op_columns()
+        # обновляем список колонок для поиска и применяем текущий фильтр
+        self._update_result_search_columns()
+        self._apply_result_filter()
+
+        # результат отсортирован сервером по клику на заголовок — показываем стрелку
+        if self._header_sort is not None:
+            name, order = self._header_sort
+            self._header_sort = None
+            col = self.result_model.column_index(name)
+            if col >= 0:
+                show_sort_indicator(self.table, col, order)
+
+    def _sort_on_server(self, column: str, order):
+        """Клик по заголовку, а в модели не весь результат: ORDER BY и новый запрос."""
+        order_col = None
+        for i in range(self.order_col.count()):
+            item = self.order_col.itemText(i)
+            # в результате колонка table.col называется table_col
+            if item and column in (item, item.replace('"', "").replace(".", "_")):
+                order_col = item
+                break
+        if order_col is None:
+            QMessageBox.information(
+                self, "Сортировка",
+                f"По колонке {column} можно отсортировать только весь результат: "
+                "прокрутите таблицу до конца.",
+            )
+            return
+
+        self.order_col.setCurrentText(order_col)
+        self.order_dir.setCurrentText("DESC" if order == Qt.DescendingOrder else "ASC")
+        self._header_sort = (column, order)
+        self._load_data()
+
+    def _on_data_error(self, e: Exception):
+        self._header_sort = None
+        QMessageBox.critical(self, "Ошибка", f"Ошибка выполнения запроса:\n{e}")
+        app_logger.error(f"DataWindow SQL error: {e}")
 
-            # обновляем список колонок для поиска и применяем текущий фильтр
-            self._update_result_search_columns()
-            self._apply_result_filter()
+    def _export_result(self):
+        # выгрузка всего результата через COPY, без загрузки строк в таблицу
+        try:
+            sql = self._get_current_select_sql()
+        except Exception as e:
+            QMessageBox.critical(self, "Ошибка", f"Ошибка при сборке SQL:\n{e}")
+            return
+        export_result(self, self.db, sql, default_name=f"{self.join_info['table1']}_{self.join_info['table2']}")
 
+    def _explain_result(self):
+        # EXPLAIN ANALYZE текущего запроса, в транзакции с откатом
+        try:
+            sql = self._get_current_select_sql()
         except Exception as e:
-            QMessageBox.critical(self, "Ошибка", f"Ошибка выполнения запроса:\n{e}")
-            app_logger.error(f"DataWindow SQL error: {e}")
+            QMessageBox.critical(self, "Ошибка", f"Ошибка при сборке SQL:\n{e}")
+            return
+        wnd = ExplainWindow(self.db, sql, f"{self.join_info['table1']} + {self.join_info['table2']}", self)
+        wnd.show()
+
+    def _on_live_change(self, table: str, change: dict):
+        tables = (self.join_info["table1"], self.join_info["table2"], ALL_TABLES)
+        if table not in tables:
+            return
+        n = len(change["inserted"] | change["updated"] | change["deleted"])
+        what = f"{table}: изменено строк — {n}" if n and not change["full"] else "таблицы запроса"
+        self.lbl_stale.setText(f"Данные изменились ({what}). Результат мог устареть.")
+        self.stale_panel.show()
+
+    def _on_result_batch(self):
+        # новая пачка строк: подсветка и фильтр распространяются и на неё
+        self._highlight_string_column()
+        self._apply_result_filter()
+
+    def closeEvent(self, event):
+        self.live.close()
+        self.runner.cancel()
+        self.result_model.close()
+        super().closeEvent(event)
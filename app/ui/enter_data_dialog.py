@@ -5,8 +5,10 @@ from PySide6.QtWidgets import (
 )
 from PySide6.QtCore import Qt, QRegularExpression, QDate, QDateTime
 from PySide6.QtGui import QIntValidator, QDoubleValidator, QRegularExpressionValidator, QFont, QPalette, QColor
+from psycopg2 import errors
 
 from app.log.log import app_logger
+from app.ui.reference_picker import ReferencePicker
 from app.ui.theme import *
 
 
@@ -332,16 +334,8 @@ class EnterDataDialog(QDialog):
         # внешний ключ
         if name in fk_dict:
             ref_table = fk_dict[name]["ref_table"]
-            try:
-                options = self.db.get_reference_values(ref_table)
-                combo = QComboBox()
-                combo.addItem("")  # пустой вариант
-                for id_, label in options:
-                    combo.addItem(f"{id_}", userData=id_)
-                self._style_combo(combo)
-                return combo
-            except Exception as e:
-                app_logger.error(f"Ошибка загрузки значений из {ref_table}: {e}")
+            # поиск по подписи на сервере вместо первых 100 строк
+            return ReferencePicker(self.db, ref_table)
 
         # boolean
         if dtype_lower == "boolean":
@@ -456,6 +450,15 @@ class EnterDataDialog(QDialog):
             app_logger.info(f"INSERT INTO {table}: {row_data}")
             self.accept()
 
+        except errors.ExclusionViolation as e:
+            # ex_stays_room_period: номер уже занят на пересекающиеся даты
+            app_logger.error(f"Ошибка вставки: {e}")
+            QMessageBox.critical(
+                self, "Номер занят",
+                "Этот номер уже занят на выбранные даты.\n"
+                "Подберите другой номер в окне «Свободные номера»."
+            )
+
         except Exception as e:
             app_logger.error(f"Ошибка вставки: {e}")
             QMessageBox.critical(self, "Ошибка", f"Вставка не выполнена:\n{e}")
@@ -471,7 +474,9 @@ class EnterDataDialog(QDialog):
             enum_values = info["enum_values"]
 
             # получаем значение в зависимости от типа виджета
-            if isinstance(widget, QLineEdit):
+            if isinstance(widget, ReferencePicker):
+                value = widget.value()
+            elif isinstance(widget, QLineEdit):
                 value = widget.text().strip()
             elif isinstance(widget, QComboBox):
                 value = widget.currentText().strip()
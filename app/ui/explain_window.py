@@ -0,0 +1,256 @@
+import json
+
+from PySide6.QtWidgets import (
+    QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
+    QTreeWidget, QTreeWidgetItem, QHeaderView, QTabWidget, QPlainTextEdit,
+    QMessageBox,
+)
+from PySide6.QtCore import Qt
+from PySide6.QtGui import QColor, QBrush
+
+from app.log.log import app_logger
+from app.ui.query_runner import QueryRunner
+from app.ui.theme import *
+
+
+# сколько самых дорогих узлов подсвечивать
+TOP_NODES = 3
+# ошибка оценки строк, начиная с которой она подсвечивается
+BAD_ESTIMATE = 10
+
+_COLUMNS = ["Узел", "Время, мс", "Своё время, мс", "%", "Строки (факт / план)",
+            "Ошибка оценки", "Буферы (hit / read)", "Циклы"]
+
+# детали узла, которые показываются во всплывающей подсказке
+_DETAIL_KEYS = [
+    "Filter", "Index Cond", "Recheck Cond", "Hash Cond", "Merge Cond", "Join Filter",
+    "Sort Key", "Group Key", "Sort Method", "Rows Removed by Filter",
+    "Rows Removed by Join Filter", "Heap Fetches", "Workers Launched",
+]
+
+
+def _node_title(node: dict) -> str:
+    title = node.get("Node Type", "?")
+    if node.get("Join Type") and "Join" in title:
+        title = f"{node['Join Type']} {title}"
+    if node.get("Strategy") and title == "Aggregate":
+        title = f"{node['Strategy']} Aggregate"
+    if node.get("Index Name"):
+        title += f" using {node['Index Name']}"
+    if node.get("Relation Name"):
+        rel = node["Relation Name"]
+        alias = node.get("Alias")
+        title += f" on {rel}" + (f" {alias}" if alias and alias != rel else "")
+    elif node.get("CTE Name"):
+        title += f" on {node['CTE Name']}"
+    return title
+
+
+def _total_ms(node: dict) -> float:
+    # Actual Total Time — на один цикл
+    return node.get("Actual Total Time", 0.0) * node.get("Actual Loops", 1)
+
+
+def _self_ms(node: dict) -> float:
+    # время узла без дочерних (InitPlan/SubPlan тоже дочерние)
+    children = sum(_total_ms(c) for c in node.get("Plans", []))
+    return max(_total_ms(node) - children, 0.0)
+
+
+def _estimate_error(node: dict):
+    """(во сколько раз ошиблись, True — строк больше, чем ждали) или None."""
+    if "Actual Rows" not in node:
+        return None
+    actual = node["Actual Rows"] * node.get("Actual Loops", 1)
+    planned = node.get("Plan Rows", 0) * node.get("Actual Loops", 1)
+    hi, lo = max(actual, planned), max(min(actual, planned), 1)
+    return hi / lo, actual > planned
+
+
+class ExplainWindow(QMainWindow):
+    """План запроса EXPLAIN (ANALYZE, BUFFERS) деревом узлов.
+
+    Запрос выполняется по-настоящему, но в транзакции с откатом
+    (Database.explain). Самые дорогие по собственному времени узлы
+    подсвечиваются, как и узлы с сильной ошибкой оценки строк.
+    """
+
+    def __init__(self, db, sql_text: str, title: str = "План запроса", parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.sql_text = sql_text
+
+        self.setWindowTitle(f"EXPLAIN — {title}")
+        self.resize(1200, 700)
+
+        self.setStyleSheet(f"""
+            QMainWindow {{
+                background-color: {WINDOW_BG};
+                color: {TEXT_MAIN};
+            }}
+            QLabel {{
+                color: {TEXT_SOFT};
+            }}
+            QTreeWidget, QPlainTextEdit {{
+                background-color: {CENTRAL_BG};
+                color: {TEXT_MAIN};
+                border: 1px solid {CARD_BORDER};
+                border-radius: 8px;
+            }}
+            QHeaderView::section {{
+                background-color: {CARD_BG};
+                color: {TEXT_SOFT};
+                padding: 6px;
+                border: none;
+                border-right: 1px solid {CARD_BORDER};
+                font-weight: bold;
+            }}
+            QPushButton {{
+                background-color: {BTN_BG};
+                color: {BTN_TEXT};
+                border: 1px solid {BTN_BORDER};
+                border-radius: 8px;
+                padding: 6px 14px;
+            }}
+            QPushButton:hover {{
+                background-color: {BTN_BG_HOVER};
+            }}
+        """)
+
+        self._build_ui()
+        self._run()
+
+    def _build_ui(self):
+        central = QWidget()
+        self.setCentralWidget(central)
+        layout = QVBoxLayout(central)
+        layout.setContentsMargins(12, 12, 12, 12)
+        layout.setSpacing(8)
+
+        top = QHBoxLayout()
+        self.lbl_summary = QLabel("")
+        top.addWidget(self.lbl_summary, 1)
+        self.btn_rerun = QPushButton("Повторить")
+        self.btn_rerun.clicked.connect(self._run)
+        top.addWidget(self.btn_rerun)
+        layout.addLayout(top)
+
+        tabs = QTabWidget()
+        layout.addWidget(tabs, 1)
+
+        self.tree = QTreeWidget()
+        self.tree.setColumnCount(len(_COLUMNS))
+        self.tree.setHeaderLabels(_COLUMNS)
+        self.tree.setAlternatingRowColors(False)
+        header = self.tree.header()
+        header.setSectionResizeMode(0, QHeaderView.Stretch)
+        for i in range(1, len(_COLUMNS)):
+            header.setSectionResizeMode(i, QHeaderView.ResizeToContents)
+        header.setStretchLastSection(False)
+        tabs.addTab(self.tree, "Дерево")
+
+        self.raw = QPlainTextEdit()
+        self.raw.setReadOnly(True)
+        tabs.addTab(self.raw, "JSON")
+
+        sql_view = QPlainTextEdit(self.sql_text)
+        sql_view.setReadOnly(True)
+        tabs.addTab(sql_view, "SQL")
+
+        self.runner = QueryRunner(self.db, self)
+        layout.addWidget(self.runner.panel)
+
+    def _run(self):
+        self.tree.clear()
+        self.lbl_summary.setText("")
+        self.runner.run(
+            lambda: self.db.explain(self.sql_text),
+            self._show_plan,
+            self._on_error,
+            text="EXPLAIN ANALYZE…",
+        )
+
+    def _on_error(self, e: Exception):
+        QMessageBox.critical(self, "Ошибка", f"Ошибка EXPLAIN:\n{e}")
+        app_logger.error(f"EXPLAIN error: {e}")
+
+    def _show_plan(self, result: dict):
+        self.raw.setPlainText(json.dumps(result, ensure_ascii=False, indent=2))
+        root = result["Plan"]
+        total = _total_ms(root) or 1.0
+
+        # самые дорогие узлы по собственному времени
+        nodes = []
+        self._collect(root, nodes)
+        top = sorted(nodes, key=_self_ms, reverse=True)[:TOP_NODES]
+        self._top_ids = {id(n) for n in top if _self_ms(n) > 0}
+
+        self.tree.addTopLevelItem(self._make_item(root, total))
+        self.tree.expandAll()
+
+        planning = result.get("Planning Time", 0.0)
+        execution = result.get("Execution Time", 0.0)
+        self.lbl_summary.setText(
+            f"Планирование: {planning:.1f} мс · Выполнение: {execution:.1f} мс · "
+            f"узлов: {len(nodes)} · самые дорогие выделены"
+        )
+        app_logger.info(f"EXPLAIN: execution {execution:.1f} ms, {len(nodes)} nodes")
+
+    def _collect(self, node: dict, out: list):
+        out.append(node)
+        for child in node.get("Plans", []):
+            self._collect(child, out)
+
+    def _make_item(self, node: dict, total: float) -> QTreeWidgetItem:
+        self_ms = _self_ms(node)
+        share = self_ms / total * 100
+
+        rows = "—"
+        if "Actual Rows" in node:
+            rows = f"{node['Actual Rows']} / {node.get('Plan Rows', 0)}"
+
+        err = _estimate_error(node)
+        err_text = ""
+        if err is not None and err[0] >= 2:
+            err_text = f"×{err[0]:.0f} {'↑' if err[1] else '↓'}"
+
+        hit = node.get("Shared Hit Blocks", 0)
+        read = node.get("Shared Read Blocks", 0)
+        temp = node.get("Temp Read Blocks", 0) + node.get("Temp Written Blocks", 0)
+        buffers = f"{hit} / {read}" + (f" · temp {temp}" if temp else "")
+
+        name = _node_title(node)
+        if node.get("Parent Relationship") in ("InitPlan", "SubPlan"):
+            name = f"{node.get('Subplan Name') or node['Parent Relationship']}: {name}"
+
+        item = QTreeWidgetItem([
+            name,
+            f"{_total_ms(node):.2f}",
+            f"{self_ms:.2f}",
+            f"{share:.0f}",
+            rows,
+            err_text,
+            buffers,
+            str(node.get("Actual Loops", "")),
+        ])
+        for col in range(1, len(_COLUMNS)):
+            item.setTextAlignment(col, Qt.AlignRight | Qt.AlignVCenter)
+
+        details = [f"{k}: {node[k]}" for k in _DETAIL_KEYS if k in node]
+        if details:
+            item.setToolTip(0, "\n".join(details))
+
+        if id(node) in self._top_ids:
+            for col in range(len(_COLUMNS)):
+                item.setBackground(col, QBrush(QColor(DANGER_BG)))
+                item.setForeground(col, QBrush(QColor(DANGER_TEXT)))
+        if err is not None and err[0] >= BAD_ESTIMATE:
+            item.setForeground(5, QBrush(QColor(ACCENT_WARNING)))
+
+        for child in node.get("Plans", []):
+            item.addChild(self._make_item(child, total))
+        return item
+
+    def closeEvent(self, event):
+        self.runner.cancel()
+        super().closeEvent(event)
@@ -0,0 +1,95 @@
+from PySide6.QtWidgets import QFileDialog, QMessageBox, QProgressDialog
+from PySide6.QtCore import Qt, QThread, Signal
+
+from app.db.export import ExportCancelled, export_query
+from app.log.log import app_logger
+
+
+_FILTERS = {
+    "CSV (*.csv)": ("csv", False, ".csv"),
+    "CSV, gzip (*.csv.gz)": ("csv", True, ".csv.gz"),
+    "JSON Lines (*.jsonl)": ("jsonl", False, ".jsonl"),
+    "JSON Lines, gzip (*.jsonl.gz)": ("jsonl", True, ".jsonl.gz"),
+}
+
+
+# выгрузка в отдельном потоке: COPY может идти долго
+class ExportThread(QThread):
+    progress = Signal(int)
+    finished_ok = Signal(dict)
+    failed = Signal(str)
+
+    def __init__(self, db, sql, path, fmt, compress, params=None, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.sql = sql
+        self.path = path
+        self.fmt = fmt
+        self.compress = compress
+        self.params = params
+        self.cancelled = False
+
+    def run(self):
+        try:
+            res = export_query(
+                self.db, self.sql, self.path, fmt=self.fmt, params=self.params,
+                compress=self.compress, progress=self.progress.emit,
+                is_cancelled=lambda: self.cancelled,
+            )
+            self.finished_ok.emit(res)
+        except ExportCancelled:
+            self.failed.emit("")
+        except Exception as e:
+            self.failed.emit(str(e))
+
+
+def export_result(parent, db, sql: str, params=None, default_name: str = "result"):
+    """Спросить файл и формат, выгрузить результат запроса с прогрессом."""
+    if not sql or not sql.strip():
+        QMessageBox.warning(parent, "Экспорт", "Нет запроса для выгрузки.")
+        return
+
+    path, selected = QFileDialog.getSaveFileName(
+        parent, "Экспорт результата", f"{default_name}.csv", ";;".join(_FILTERS)
+    )
+    if not path:
+        return
+
+    fmt, compress, ext = _FILTERS.get(selected, ("csv", False, ".csv"))
+    if not path.lower().endswith(ext):
+        path += ext
+
+    dlg = QProgressDialog("Выгрузка…", "Отмена", 0, 0, parent)
+    dlg.setWindowTitle("Экспорт")
+    dlg.setWindowModality(Qt.WindowModal)
+    dlg.setMinimumDuration(300)
+
+    thread = ExportThread(db, sql, path, fmt, compress, params, parent)
+
+    def on_progress(written: int):
+        dlg.setLabelText(f"Записано {written / 1024 / 1024:.1f} МБ")
+
+    def on_done(res: dict):
+        dlg.close()
+        QMessageBox.information(
+            parent, "Экспорт",
+            f"Выгружено строк: {res['rows']}\n{res['path']}"
+        )
+
+    def on_failed(text: str):
+        dlg.close()
+        if not text:
+            app_logger.info(f"Экспорт в {path} отменён пользователем")
+            return
+        QMessageBox.critical(parent, "Ошибка экспорта", text)
+        app_logger.error(f"Ошибка экспорта: {text}")
+
+    def on_cancel():
+        thread.cancelled = True
+
+    thread.progress.connect(on_progress)
+    thread.finished_ok.connect(on_done)
+    thread.failed.connect(on_failed)
+    dlg.canceled.connect(on_cancel)
+    thread.start()
+    dlg.show()
@@ -0,0 +1,291 @@
+import os
+
+from PySide6.QtWidgets import (
+    QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QGridLayout,
+    QLabel, QComboBox, QLineEdit, QPushButton, QCheckBox, QProgressBar,
+    QTableWidget, QTableWidgetItem, QMessageBox, QHeaderView, QFileDialog,
+    QListWidget, QAbstractItemView,
+)
+from PySide6.QtCore import Qt, QThread, Signal
+
+from app.db.importer import CsvImporter
+from app.log.log import app_logger
+from app.ui.theme import *
+
+
+# фоновый поток импорта, чтобы окно не замирало на больших файлах
+class ImportThread(QThread):
+    progress = Signal(str, int, int)
+    finished_ok = Signal(dict)
+    failed = Signal(str)
+
+    def __init__(self, importer: CsvImporter, parent=None):
+        super().__init__(parent)
+        self.importer = importer
+        self.importer.progress = self.progress.emit
+
+    def run(self):
+        try:
+            self.finished_ok.emit(self.importer.run())
+        except Exception as e:
+            self.failed.emit(str(e))
+
+
+# мастер импорта CSV/TSV в clients / rooms / stays и др.
+class ImportWindow(QMainWindow):
+    DELIMITERS = [("Запятая ,", ","), ("Точка с запятой ;", ";"), ("Табуляция (TSV)", "\t")]
+    CONFLICT_MODES = [
+        ("Пропускать существующие", "nothing"),
+        ("Обновлять существующие", "update"),
+        ("Ошибка при совпадении", "error"),
+    ]
+
+    def __init__(self, db, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.thread = None
+
+        self.setWindowTitle("Импорт CSV / TSV")
+        self.resize(900, 620)
+
+        self.setStyleSheet(f"""
+            QMainWindow {{
+                background-color: {WINDOW_BG};
+                color: {TEXT_MAIN};
+            }}
+            QLabel {{
+                color: {TEXT_SOFT};
+            }}
+            QLineEdit, QComboBox, QListWidget {{
+                background-color: {CENTRAL_BG};
+                color: {TEXT_MAIN};
+                border: 2px solid {CARD_BORDER};
+                border-radius: 6px;
+                padding: 4px 8px;
+            }}
+            QTableWidget {{
+                background-color: {CENTRAL_BG};
+                color: {TEXT_MAIN};
+                gridline-color: #404040;
+                border: 1px solid {CARD_BORDER};
+            }}
+            QHeaderView::section {{
+                background-color: {CARD_BG};
+                color: {TEXT_SOFT};
+                padding: 6px;
+                border: none;
+                font-weight: bold;
+            }}
+            QPushButton {{
+                background-color: {BTN_BG};
+                color: {BTN_TEXT};
+                border: 1px solid {BTN_BORDER};
+                border-radius: 8px;
+                padding: 6px 14px;
+                font-size: 14px;
+            }}
+            QPushButton:hover {{
+                background-color: {BTN_BG_HOVER};
+            }}
+            QPushButton:disabled {{
+                background-color: #252937;
+                color: #9CA3AF;
+            }}
+            QCheckBox {{
+                color: {TEXT_MAIN};
+            }}
+        """)
+
+        self._build_ui()
+        self._load_tables()
+
+    def _build_ui(self):
+        central = QWidget()
+        self.setCentralWidget(central)
+
+        layout = QVBoxLayout(central)
+        layout.setContentsMargins(12, 12, 12, 12)
+        layout.setSpacing(10)
+
+        grid = QGridLayout()
+        grid.setHorizontalSpacing(10)
+        grid.setVerticalSpacing(8)
+        layout.addLayout(grid)
+
+        # файл
+        grid.addWidget(QLabel("Файл:"), 0, 0)
+        self.ed_path = QLineEdit()
+        self.ed_path.setPlaceholderText("CSV или TSV, кодировка UTF-8")
+        grid.addWidget(self.ed_path, 0, 1)
+        self.btn_browse = QPushButton("Выбрать…")
+        self.btn_browse.clicked.connect(self._choose_file)
+        grid.addWidget(self.btn_browse, 0, 2)
+
+        # таблица
+        grid.addWidget(QLabel("Таблица:"), 1, 0)
+        self.cb_table = QComboBox()
+        self.cb_table.currentTextChanged.connect(self._on_table_changed)
+        grid.addWidget(self.cb_table, 1, 1, 1, 2)
+
+        # разделитель и шапка
+        grid.addWidget(QLabel("Разделитель:"), 2, 0)
+        sep_row = QHBoxLayout()
+        self.cb_delimiter = QComboBox()
+        for text, value in self.DELIMITERS:
+            self.cb_delimiter.addItem(text, value)
+        sep_row.addWidget(self.cb_delimiter)
+        self.chk_header = QCheckBox("Первая строка — названия колонок")
+        self.chk_header.setChecked(True)
+        sep_row.addWidget(self.chk_header)
+        sep_row.addStretch()
+        grid.addLayout(sep_row, 2, 1, 1, 2)
+
+        # конфликты
+        grid.addWidget(QLabel("Совпадения:"), 3, 0)
+        self.cb_conflict = QComboBox()
+        for text, value in self.CONFLICT_MODES:
+            self.cb_conflict.addItem(text, value)
+        grid.addWidget(self.cb_conflict, 3, 1, 1, 2)
+
+        grid.addWidget(QLabel("Ключ совпадения:"), 4, 0, Qt.AlignTop)
+        self.list_key = QListWidget()
+        self.list_key.setSelectionMode(QAbstractItemView.MultiSelection)
+        self.list_key.setMaximumHeight(90)
+        grid.addWidget(self.list_key, 4, 1, 1, 2)
+
+        # запуск
+        run_row = QHBoxLayout()
+        self.btn_run = QPushButton("Импортировать")
+        self.btn_run.clicked.connect(self._run)
+        run_row.addWidget(self.btn_run)
+        self.progress = QProgressBar()
+        self.progress.setRange(0, 100)
+        self.progress.setValue(0)
+        run_row.addWidget(self.progress, 1)
+        layout.addLayout(run_row)
+
+        self.lbl_status = QLabel("")
+        self.lbl_status.setWordWrap(True)
+        layout.addWidget(self.lbl_status)
+
+        # отклонённые строки
+        layout.addWidget(QLabel("Отклонённые строки:"))
+        self.table_rejects = QTableWidget(0, 2)
+        self.table_rejects.setHorizontalHeaderLabels(["Строка файла", "Причина"])
+        self.table_rejects.horizontalHeader().setSectionResizeMode(1, QHeaderView.Stretch)
+        self.table_rejects.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        layout.addWidget(self.table_rejects, 1)
+
+    def _load_tables(self):
+        try:
+            tables = self.db.catalog.base_tables()
+        except Exception as e:
+            app_logger.error(f"Импорт: не удалось получить список таблиц: {e}")
+            tables = []
+        self.cb_table.clear()
+        self.cb_table.addItems(tables)
+
+    def _on_table_changed(self, table: str):
+        # по умолчанию ключ совпадения — первое UNIQUE-ограничение (не PK)
+        self.list_key.clear()
+        if not table:
+            return
+        cols = self.db.catalog.column_names(table)
+        self.list_key.addItems(cols)
+
+        uniques = self.db.catalog.constraints(table, ("u",))
+        default_key = uniques[0]["columns"] if uniques else []
+        for i in range(self.list_key.count()):
+            item = self.list_key.item(i)
+            item.setSelected(item.text() in default_key)
+
+    def _choose_file(self):
+        path, _ = QFileDialog.getOpenFileName(
+            self, "Файл для импорта", "", "CSV / TSV (*.csv *.tsv *.txt);;Все файлы (*)"
+        )
+        if not path:
+            return
+        self.ed_path.setText(path)
+        if path.lower().endswith(".tsv"):
+            self.cb_delimiter.setCurrentIndex(2)
+
+        # таблицу угадываем по имени файла: clients.csv -> clients
+        base = os.path.splitext(os.path.basename(path))[0].lower()
+        idx = self.cb_table.findText(base)
+        if idx >= 0:
+            self.cb_table.setCurrentIndex(idx)
+
+    def _run(self):
+        path = self.ed_path.text().strip()
+        table = self.cb_table.currentText()
+        if not path or not os.path.isfile(path):
+            QMessageBox.warning(self, "Импорт", "Выберите существующий файл.")
+            return
+        if not table:
+            QMessageBox.warning(self, "Импорт", "Выберите таблицу.")
+            return
+
+        on_conflict = self.cb_conflict.currentData()
+        key = [i.text() for i in self.list_key.selectedItems()]
+        if on_conflict != "error" and not key:
+            QMessageBox.warning(
+                self, "Импорт",
+                "Для пропуска или обновления существующих строк выберите ключ совпадения."
+            )
+            return
+
+        importer = CsvImporter(
+            self.db, table, path,
+            delimiter=self.cb_delimiter.currentData(),
+            header=self.chk_header.isChecked(),
+            conflict_columns=key if on_conflict != "error" else None,
+            on_conflict=on_conflict,
+        )
+
+        self.table_rejects.setRowCount(0)
+        self.progress.setValue(0)
+        self.lbl_status.setText("Импорт…")
+        self.btn_run.setEnabled(False)
+
+        self.thread = ImportThread(importer, self)
+        self.thread.progress.connect(self._on_progress)
+        self.thread.finished_ok.connect(self._on_done)
+        self.thread.failed.connect(self._on_failed)
+        self.thread.start()
+
+    def _on_progress(self, text: str, done: int, total: int):
+        self.lbl_status.setText(text)
+        if total:
+            self.progress.setValue(int(done * 100 / total))
+
+    def _on_done(self, report: dict):
+        self.btn_run.setEnabled(True)
+        self.progress.setValue(100)
+
+        self.lbl_status.setText(
+            f"Готово: вставлено {report['inserted']}, обновлено {report['updated']}, "
+            f"отклонено {report['rejected']} (прочитано корректных строк: {report['loaded']})."
+        )
+
+        rows = report["rejects"]
+        self.table_rejects.setRowCount(len(rows))
+        for r, row in enumerate(rows):
+            self.table_rejects.setItem(r, 0, QTableWidgetItem(str(row["line"])))
+            self.table_rejects.setItem(r, 1, QTableWidgetItem(row["reason"]))
+        if report["rejected"] > len(rows):
+            self.lbl_status.setText(
+                self.lbl_status.text() + f" Показаны первые {len(rows)} отклонённых строк."
+            )
+
+    def _on_failed(self, text: str):
+        self.btn_run.setEnabled(True)
+        self.lbl_status.setText("Импорт отменён, таблица не изменена.")
+        QMessageBox.critical(self, "Ошибка импорта", text)
+        app_logger.error(f"Ошибка импорта: {text}")
+
+    def closeEvent(self, event):
+        if self.thread is not None and self.thread.isRunning():
+            QMessageBox.information(self, "Импорт", "Дождитесь окончания импорта.")
+            event.ignore()
+            return
+        super().closeEvent(event)
@@ -0,0 +1,194 @@
+from PySide6.QtWidgets import (
+    QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
+    QTableWidget, QTableWidgetItem, QHeaderView, QAbstractItemView, QMessageBox,
+)
+from PySide6.QtCore import Qt
+
+from app.log.log import app_logger
+from app.ui.query_runner import QueryRunner
+from app.ui.theme import *
+
+
+_METHODS = {"btree": "B-tree", "gin": "GIN (массив)", "trgm": "GIN (триграммы)"}
+
+_COLUMNS = ["Таблица", "Колонка", "Индекс", "Использование", "Оценка", "SQL"]
+
+
+# советник индексов: что фильтровали / сортировали окна и каких индексов не хватает
+class IndexAdvisorWindow(QMainWindow):
+    def __init__(self, db, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.proposals: list[dict] = []
+
+        self.setWindowTitle("Советник индексов")
+        self.resize(1100, 520)
+
+        self.setStyleSheet(f"""
+            QMainWindow {{
+                background-color: {WINDOW_BG};
+                color: {TEXT_MAIN};
+            }}
+            QLabel {{
+                color: {TEXT_SOFT};
+            }}
+            QTableWidget {{
+                background-color: {CENTRAL_BG};
+                color: {TEXT_MAIN};
+                gridline-color: #404040;
+                border: 1px solid {CARD_BORDER};
+                border-radius: 8px;
+            }}
+            QTableWidget::item:selected {{
+                background-color: {ACCENT_PRIMARY};
+                color: {WINDOW_BG};
+            }}
+            QHeaderView::section {{
+                background-color: {CARD_BG};
+                color: {TEXT_SOFT};
+                padding: 6px;
+                border: none;
+                border-right: 1px solid {CARD_BORDER};
+                font-weight: bold;
+            }}
+            QPushButton {{
+                background-color: {BTN_BG};
+                color: {BTN_TEXT};
+                border: 1px solid {BTN_BORDER};
+                border-radius: 8px;
+                padding: 6px 14px;
+            }}
+            QPushButton:hover {{
+                background-color: {BTN_BG_HOVER};
+            }}
+            QPushButton:disabled {{
+                background-color: #252937;
+                color: #9CA3AF;
+            }}
+        """)
+
+        self._build_ui()
+        self._reload()
+
+    def _build_ui(self):
+        central = QWidget()
+        self.setCentralWidget(central)
+        layout = QVBoxLayout(central)
+        layout.setContentsMargins(12, 12, 12, 12)
+        layout.setSpacing(8)
+
+        self.lbl_info = QLabel(
+            "Колонки, по которым окна фильтровали, соединяли и сортировали данные "
+            "в этом сеансе, и индексы, которых для них нет (по pg_index)."
+        )
+        self.lbl_info.setWordWrap(True)
+        layout.addWidget(self.lbl_info)
+
+        self.table = QTableWidget(0, len(_COLUMNS))
+        self.table.setHorizontalHeaderLabels(_COLUMNS)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.SingleSelection)
+        header = self.table.horizontalHeader()
+        for i in range(len(_COLUMNS) - 1):
+            header.setSectionResizeMode(i, QHeaderView.ResizeToContents)
+        header.setSectionResizeMode(len(_COLUMNS) - 1, QHeaderView.Stretch)
+        self.table.itemSelectionChanged.connect(self._update_buttons)
+        self.table.itemDoubleClicked.connect(lambda _: self._create_selected())
+        layout.addWidget(self.table, 1)
+
+        buttons = QHBoxLayout()
+        self.btn_reload = QPushButton("Обновить")
+        self.btn_reload.clicked.connect(self._reload)
+        self.btn_reset = QPushButton("Сбросить статистику")
+        self.btn_reset.clicked.connect(self._reset)
+        self.btn_create = QPushButton("Создать индекс")
+        self.btn_create.clicked.connect(self._create_selected)
+        self.btn_search_indexes = QPushButton("Индексы для поиска гостей")
+        self.btn_search_indexes.clicked.connect(self._install_search_indexes)
+        buttons.addWidget(self.btn_reload)
+        buttons.addWidget(self.btn_reset)
+        buttons.addStretch()
+        buttons.addWidget(self.btn_search_indexes)
+        buttons.addWidget(self.btn_create)
+        layout.addLayout(buttons)
+
+        self.runner = QueryRunner(self.db, self)
+        layout.addWidget(self.runner.panel)
+
+        self._update_buttons()
+
+    def _reload(self):
+        self.runner.run(self.db.index_advisor.proposals, self._show, self._on_error,
+                        text="Анализ индексов…")
+
+    def _show(self, proposals: list[dict]):
+        self.proposals = proposals
+        self.table.setRowCount(len(proposals))
+        for i, p in enumerate(proposals):
+            values = [
+                p["table"], p["column"], _METHODS[p["method"]], p["reason"],
+                f"{p['score']:g}", ";\n".join(p["statements"]),
+            ]
+            for col, val in enumerate(values):
+                item = QTableWidgetItem(val)
+                if col == 4:
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.table.setItem(i, col, item)
+        self.table.resizeRowsToContents()
+
+        if not proposals:
+            self.lbl_info.setText(
+                "Предложений нет: либо индексы уже есть, либо окна ещё не выполняли "
+                "запросы с фильтрами и сортировкой в этом сеансе."
+            )
+        self._update_buttons()
+
+    def _update_buttons(self):
+        self.btn_create.setEnabled(bool(self.table.selectedItems()) and not self.runner.is_busy())
+
+    def _reset(self):
+        self.db.index_advisor.reset()
+        self._show([])
+
+    def _create_selected(self):
+        row = self.table.currentRow()
+        if row < 0 or row >= len(self.proposals):
+            return
+        p = self.proposals[row]
+
+        reply = QMessageBox.question(
+            self, "Создать индекс",
+            "Выполнить:\n\n" + ";\n".join(p["statements"]) + "\n\n"
+            "CONCURRENTLY не блокирует запись в таблицу, но на большой таблице займёт время.",
+            QMessageBox.Yes | QMessageBox.No,
+        )
+        if reply != QMessageBox.Yes:
+            return
+
+        def done(_):
+            QMessageBox.information(self, "Готово", f"Индекс {p['name']} создан.")
+            self._reload()
+
+        self.runner.run(lambda: self.db.index_advisor.create(p), done, self._on_error,
+                        text=f"Создание {p['name']}…")
+
+    def _install_search_indexes(self):
+        def done(created: list[str]):
+            if created:
+                QMessageBox.information(self, "Готово", "Созданы индексы:\n" + "\n".join(created))
+            else:
+                QMessageBox.information(self, "Готово", "Триграммные индексы для поиска уже есть.")
+            self._reload()
+
+        self.runner.run(self.db.install_search_indexes, done, self._on_error,
+                        text="Создание триграммных индексов…")
+
+    def _on_error(self, e: Exception):
+        QMessageBox.critical(self, "Ошибка", f"Ошибка советника индексов:\n{e}")
+        app_logger.error(f"index advisor: {e}")
+
+    def closeEvent(self, event):
+        self.runner.cancel()
+        super().closeEvent(event)
@@ -214,15 +214,7 @@ class JoinMasterDialog(QDialog):
 
     # загрузка таблиц
     def _load_tables(self):
-        q = """
-            SELECT table_name
-            FROM information_schema.tables
-            WHERE table_schema='public'
-            ORDER BY table_name;
-        """
-        with self.db.cursor() as cur:
-            cur.execute(q)
-            tables = [r["table_name"] for r in cur.fetchall()]
+        tables = self.db.catalog.tables()
 
         self.cb_table1.clear()
         self.cb_table2.clear()
@@ -269,9 +261,9 @@ class JoinMasterDialog(QDialog):
         self.cb_col2.clear()
         self.cb_col2.addItems(compatible)
 
-        # дефолт для client_id, если мы на stays
+        # дефолт для поля связи: client_id у stays, room_id у сводки по дням
         if compatible:
-            preferred = "client_id" if table2 == "stays" else None
+            preferred = {"stays": "client_id", "daily_room_stats": "room_id"}.get(table2)
             if preferred:
                 idx = self.cb_col2.findText(preferred)
                 if idx >= 0:
@@ -289,39 +281,16 @@ class JoinMasterDialog(QDialog):
         combo.addItems(cols)
 
     def _fetch_columns(self, table):
-        q = """
-            SELECT column_name
-            FROM information_schema.columns
-            WHERE table_name=%s
-            ORDER BY ordinal_position
-        """
-        with self.db.cursor() as cur:
-            cur.execute(q, (table,))
-            return [r["column_name"] for r in cur.fetchall()]
+        return self.db.catalog.column_names(table)
 
     def _fetch_columns_full(self, table):
-        # возвращает [{column_name, data_type}]
-        q = """
-            SELECT column_name, data_type
-            FROM information_schema.columns
-            WHERE table_name=%s
-        """
-        with self.db.cursor() as cur:
-            cur.execute(q, (table,))
-            return cur.fetchall()
+        # возвращает [{column_name, data_type, ...}]
+        return self.db.catalog.columns(table)
 
     def _get_column_type(self, table, column):
         if not table or not column:
             return None
-        q = """
-            SELECT data_type
-            FROM information_schema.columns
-            WHERE table_name=%s AND column_name=%s
-        """
-        with self.db.cursor() as cur:
-            cur.execute(q, (table, column))
-            res = cur.fetchone()
-            return res["data_type"] if res else None
+        return self.db.catalog.column_type(table, column)
 
     def _is_compatible(self, type1, type2):
         # примерная проверка на совместимость
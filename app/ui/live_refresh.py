@@ -0,0 +1,62 @@
+from PySide6.QtCore import QObject, QTimer, Signal
+
+from app.db.listener import ALL_TABLES
+
+
+class LiveRefresh(QObject):
+    """Подписка окна на изменения таблиц (LISTEN/NOTIFY через db.changes).
+
+    Уведомления приходят в потоке слушателя, сюда — уже в поток GUI.
+    Пачка уведомлений за delay_ms склеивается в одно событие
+    changed(table, change), где change — словарь:
+      inserted / updated / deleted — множества id,
+      full — id неизвестны (строк было слишком много или связь рвалась).
+    Для ALL_TABLES приходит только full.
+    """
+
+    changed = Signal(str, object)
+    _received = Signal(str, str, object)
+
+    def __init__(self, db, parent=None, delay_ms: int = 300):
+        super().__init__(parent)
+        self.db = db
+        self._pending: dict[str, dict] = {}
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(delay_ms)
+        self._timer.timeout.connect(self._flush)
+
+        self._received.connect(self._on_received)
+        self.db.changes.subscribe(self._notify)
+
+    def close(self):
+        self.db.changes.unsubscribe(self._notify)
+        self._timer.stop()
+        self._pending.clear()
+
+    def _notify(self, table: str, op: str, ids):
+        # поток слушателя: сигнал доставится в поток GUI через очередь
+        self._received.emit(table, op, ids)
+
+    def _on_received(self, table: str, op: str, ids):
+        p = self._pending.setdefault(table, {
+            "inserted": set(), "updated": set(), "deleted": set(), "full": False,
+        })
+        if ids is None or table == ALL_TABLES:
+            p["full"] = True
+        elif op == "DELETE":
+            p["deleted"].update(ids)
+            p["inserted"].difference_update(ids)
+            p["updated"].difference_update(ids)
+        elif op == "INSERT":
+            p["inserted"].update(ids)
+        else:
+            p["updated"].update(ids)
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def _flush(self):
+        pending, self._pending = self._pending, {}
+        for table, change in pending.items():
+            self.changed.emit(table, change)
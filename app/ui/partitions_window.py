@@ -0,0 +1,250 @@
+from PySide6.QtWidgets import (
+    QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QComboBox,
+    QPushButton, QSpinBox, QMessageBox, QAbstractItemView,
+)
+
+from app.db.partitions import DEFAULT_PARTITION, GRANULARITIES
+from app.log.log import app_logger
+from app.ui.query_runner import QueryRunner
+from app.ui.result_model import ResultTableModel, make_result_view
+from app.ui.theme import *
+
+
+def _size_text(n: int) -> str:
+    if n >= 1024 * 1024:
+        return f"{n / 1024 / 1024:.1f} МБ"
+    return f"{n // 1024} КБ"
+
+
+# секционирование stays по датам заезда (Database.partitions)
+class PartitionsWindow(QMainWindow):
+    def __init__(self, db, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self._names: list[str] = []
+
+        self.setWindowTitle("Секции stays")
+        self.resize(820, 520)
+
+        self.setStyleSheet(f"""
+            QMainWindow {{
+                background-color: {WINDOW_BG};
+                color: {TEXT_MAIN};
+            }}
+            QLabel {{
+                color: {TEXT_SOFT};
+            }}
+            QComboBox, QSpinBox {{
+                background-color: {CENTRAL_BG};
+                color: {TEXT_MAIN};
+                border: 1px solid {CARD_BORDER};
+                border-radius: 6px;
+                padding: 4px 8px;
+            }}
+            QTableView {{
+                background-color: {CENTRAL_BG};
+                color: {TEXT_MAIN};
+                gridline-color: #404040;
+                border: 1px solid {CARD_BORDER};
+                border-radius: 8px;
+            }}
+            QHeaderView::section {{
+                background-color: {CARD_BG};
+                color: {TEXT_SOFT};
+                padding: 6px;
+                border: none;
+                border-right: 1px solid {CARD_BORDER};
+                font-weight: bold;
+            }}
+            QPushButton {{
+                background-color: {BTN_BG};
+                color: {BTN_TEXT};
+                border: 1px solid {BTN_BORDER};
+                border-radius: 8px;
+                padding: 6px 14px;
+            }}
+            QPushButton:hover {{
+                background-color: {BTN_BG_HOVER};
+            }}
+            QPushButton:disabled {{
+                color: {TEXT_MUTED};
+            }}
+        """)
+
+        self._build_ui()
+        self._reload()
+
+    def _build_ui(self):
+        central = QWidget()
+        self.setCentralWidget(central)
+        layout = QVBoxLayout(central)
+        layout.setContentsMargins(12, 12, 12, 12)
+        layout.setSpacing(10)
+
+        self.lbl_status = QLabel("")
+        self.lbl_status.setWordWrap(True)
+        layout.addWidget(self.lbl_status)
+
+        top = QHBoxLayout()
+        layout.addLayout(top)
+
+        top.addWidget(QLabel("Шаг"))
+        self.cb_granularity = QComboBox()
+        for key, label in GRANULARITIES.items():
+            self.cb_granularity.addItem(label, key)
+        top.addWidget(self.cb_granularity)
+
+        top.addWidget(QLabel("Секций наперёд"))
+        self.sb_ahead = QSpinBox()
+        self.sb_ahead.setRange(0, 36)
+        self.sb_ahead.setValue(self.db.partitions_ahead)
+        top.addWidget(self.sb_ahead)
+
+        self.btn_convert = QPushButton("Секционировать")
+        self.btn_convert.clicked.connect(self._convert)
+        top.addWidget(self.btn_convert)
+
+        self.btn_future = QPushButton("Создать будущие секции")
+        self.btn_future.clicked.connect(self._ensure_future)
+        top.addWidget(self.btn_future)
+        top.addStretch(1)
+
+        self.result_model = ResultTableModel(self)
+        self.table = make_result_view(self.result_model, stretch=True)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.SingleSelection)
+        layout.addWidget(self.table, 1)
+
+        bottom = QHBoxLayout()
+        layout.addLayout(bottom)
+        bottom.addStretch(1)
+        self.btn_detach = QPushButton("Отсоединить")
+        self.btn_detach.clicked.connect(lambda: self._detach(archive=False))
+        bottom.addWidget(self.btn_detach)
+        self.btn_archive = QPushButton("В архив")
+        self.btn_archive.clicked.connect(lambda: self._detach(archive=True))
+        bottom.addWidget(self.btn_archive)
+
+        self.runner = QueryRunner(self.db, self)
+        layout.addWidget(self.runner.panel)
+
+    # состояние
+    def _reload(self):
+        def job():
+            if not self.db.partitions.is_partitioned():
+                return None
+            return self.db.partitions.partitions()
+
+        self.runner.run(job, self._show, self._on_error, text="Чтение секций…")
+
+    def _show(self, parts: list[dict] | None):
+        partitioned = parts is not None
+        self.btn_convert.setEnabled(not partitioned)
+        self.cb_granularity.setEnabled(not partitioned)
+        self.btn_future.setEnabled(partitioned)
+        self.btn_detach.setEnabled(partitioned)
+        self.btn_archive.setEnabled(partitioned)
+
+        if not partitioned:
+            self.lbl_status.setText(
+                "Таблица stays не секционирована. Преобразование пересоздаёт её как "
+                "PARTITION BY RANGE (check_in) с переносом данных, индексов и триггеров; "
+                "таблица блокируется на время переноса."
+            )
+            self._names = []
+            self.result_model.show_message("Секций нет")
+            return
+
+        rows = sum(p["rows"] for p in parts)
+        size = sum(p["bytes"] for p in parts)
+        self.lbl_status.setText(
+            f"stays секционирована: {len(parts)} секций, ~{rows} строк, {_size_text(size)}. "
+            f"Проживания вне диапазонов попадают в {DEFAULT_PARTITION}."
+        )
+        self._names = [p["name"] for p in parts]
+        table_rows = []
+        for p in parts:
+            if p["is_default"]:
+                period = "остальные даты"
+            else:
+                period = f"{p['start']:%d.%m.%Y} — {p['end']:%d.%m.%Y}"
+            table_rows.append({
+                "секция": p["name"],
+                "заезды": period,
+                "строк (оценка)": p["rows"],
+                "размер": _size_text(p["bytes"]),
+            })
+        self.result_model.set_rows(list(table_rows[0].keys()), table_rows)
+
+    # действия
+    def _convert(self):
+        granularity = self.cb_granularity.currentData()
+        ahead = self.sb_ahead.value()
+        reply = QMessageBox.question(
+            self,
+            "Секционирование",
+            f"Пересоздать stays как секционированную {GRANULARITIES[granularity]}?\n"
+            "Первичный ключ станет (id, check_in), ограничение пересечения периодов "
+            "заменит триггер. На время переноса таблица заблокирована.",
+            QMessageBox.Yes | QMessageBox.No,
+        )
+        if reply != QMessageBox.Yes:
+            return
+
+        def done(_):
+            QMessageBox.information(self, "Готово", "Таблица stays секционирована.")
+            self._reload()
+
+        self.runner.run(
+            lambda: self.db.partitions.convert(granularity, ahead),
+            done, self._on_error, text="Секционирование stays…",
+        )
+
+    def _ensure_future(self):
+        ahead = self.sb_ahead.value()
+
+        def done(created: list[str]):
+            if created:
+                QMessageBox.information(self, "Готово", "Созданы секции:\n" + "\n".join(created))
+            else:
+                QMessageBox.information(self, "Готово", "Все секции уже есть.")
+            self._reload()
+
+        self.runner.run(
+            lambda: self.db.partitions.ensure_future(ahead),
+            done, self._on_error, text="Создание секций…",
+        )
+
+    def _detach(self, archive: bool):
+        rows = self.table.selectionModel().selectedRows()
+        if not rows or rows[0].row() >= len(self._names):
+            QMessageBox.warning(self, "Секция", "Выберите секцию в таблице.")
+            return
+        name = self._names[rows[0].row()]
+        if name == DEFAULT_PARTITION:
+            QMessageBox.warning(self, "Секция", "Секцию по умолчанию отсоединять нельзя.")
+            return
+
+        where = "в схему archive" if archive else "отдельной таблицей"
+        reply = QMessageBox.question(
+            self,
+            "Отсоединить секцию",
+            f"Отсоединить {name} от stays и оставить {where}?\n"
+            "Проживания из неё пропадут из stays; сводка по дням сохранит их до пересчёта.",
+            QMessageBox.Yes | QMessageBox.No,
+        )
+        if reply != QMessageBox.Yes:
+            return
+
+        self.runner.run(
+            lambda: self.db.partitions.detach(name, archive),
+            lambda _: self._reload(), self._on_error, text="Отсоединение секции…",
+        )
+
+    def _on_error(self, e: Exception):
+        QMessageBox.critical(self, "Ошибка", f"Ошибка секционирования:\n{e}")
+        app_logger.error(f"partitions error: {e}")
+
+    def closeEvent(self, event):
+        self.runner.cancel()
+        super().closeEvent(event)
@@ -0,0 +1,152 @@
+import time
+
+from PySide6.QtWidgets import QWidget, QHBoxLayout, QLabel, QProgressBar, QPushButton
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal
+
+from app.db.cancel import CancelToken
+from app.log.log import app_logger
+from app.ui.theme import *
+
+
+class _JobSignals(QObject):
+    done = Signal(int, object, object)  # job_id, результат, отпечаток запроса
+    failed = Signal(int, object)
+
+
+class _Job(QRunnable):
+    def __init__(self, db, job_id: int, fn, token: CancelToken, signals: _JobSignals):
+        super().__init__()
+        self.db = db
+        self.job_id = job_id
+        self.fn = fn
+        self.token = token
+        self.signals = signals
+
+    def run(self):
+        self.db.metrics.reset_last()
+        try:
+            with self.db.cancellable(self.token):
+                res = self.fn()
+        except Exception as e:
+            self.signals.failed.emit(self.job_id, e)
+        else:
+            # отпечаток последнего запроса задачи — к нему пишется время отрисовки
+            self.signals.done.emit(self.job_id, res, self.db.metrics.last_fingerprint())
+
+
+class QueryRunner(QObject):
+    """Выполняет запросы окна в QThreadPool, не блокируя интерфейс.
+
+    run(fn, on_done) — fn() выполняется в фоновом потоке (внутри
+    db.cancellable), результат приходит в on_done(result) уже в потоке GUI.
+    Одновременно у окна идёт одна задача: новый run() отменяет предыдущую.
+    panel — строка «крутилка + Отмена», которую окно кладёт к себе в layout.
+    """
+
+    def __init__(self, db, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self._seq = 0
+        self._current = None  # (job_id, token, on_done, on_error, on_discard)
+        self._signals = _JobSignals()
+        self._signals.done.connect(self._on_done)
+        self._signals.failed.connect(self._on_failed)
+        self._discards = {}  # job_id -> on_discard для отменённых задач
+
+        self.panel = self._build_panel()
+        self.panel.hide()
+
+    def _build_panel(self) -> QWidget:
+        panel = QWidget()
+        row = QHBoxLayout(panel)
+        row.setContentsMargins(0, 0, 0, 0)
+        row.setSpacing(8)
+
+        # бесконечный прогресс-бар — крутилка
+        bar = QProgressBar()
+        bar.setRange(0, 0)
+        bar.setMaximumHeight(10)
+        bar.setTextVisible(False)
+        bar.setStyleSheet(f"""
+            QProgressBar {{
+                background-color: {CENTRAL_BG};
+                border: 1px solid {CARD_BORDER};
+                border-radius: 4px;
+            }}
+            QProgressBar::chunk {{
+                background-color: {ACCENT_PRIMARY};
+            }}
+        """)
+
+        self.lbl_busy = QLabel("")
+        self.lbl_busy.setStyleSheet(f"color: {TEXT_MUTED};")
+        self.btn_cancel = QPushButton("Отмена")
+        self.btn_cancel.clicked.connect(self.cancel)
+
+        row.addWidget(self.lbl_busy)
+        row.addWidget(bar, 1)
+        row.addWidget(self.btn_cancel)
+        return panel
+
+    def is_busy(self) -> bool:
+        return self._current is not None
+
+    def run(self, fn, on_done, on_error=None, on_discard=None,
+            text: str = "Выполняется запрос…"):
+        """on_discard(result) вызывается, если результат отменённой задачи
+        всё же пришёл (например, чтобы закрыть открытый поток)."""
+        self.cancel()
+
+        self._seq += 1
+        token = CancelToken()
+        self._current = (self._seq, token, on_done, on_error, on_discard)
+
+        self.lbl_busy.setText(text)
+        self.panel.show()
+        QThreadPool.globalInstance().start(
+            _Job(self.db, self._seq, fn, token, self._signals)
+        )
+
+    def cancel(self):
+        if self._current is None:
+            return
+        job_id, token, _, _, on_discard = self._current
+        self._current = None
+        if on_discard:
+            self._discards[job_id] = on_discard
+        token.cancel()
+        self.panel.hide()
+        app_logger.info("Фоновый запрос отменён")
+
+    def _take(self, job_id: int):
+        if self._current is None or self._current[0] != job_id:
+            return None
+        cur = self._current
+        self._current = None
+        self.panel.hide()
+        return cur
+
+    def _on_done(self, job_id: int, result, fp):
+        cur = self._take(job_id)
+        if cur is None:
+            on_discard = self._discards.pop(job_id, None)
+            if on_discard:
+                on_discard(result)
+            return
+        # on_done раскладывает результат по модели — это и есть фаза отрисовки
+        t0 = time.perf_counter()
+        cur[2](result)
+        self.db.metrics.record_render(fp, (time.perf_counter() - t0) * 1000)
+
+    def _on_failed(self, job_id: int, error: Exception):
+        self._discards.pop(job_id, None)
+        # ошибки отменённых задач не показываем; сюда доходят только
+        # ошибки текущей (в т.ч. отмена по statement_timeout)
+        cur = self._take(job_id)
+        if cur is None:
+            return
+        on_error = cur[3]
+        if on_error:
+            on_error(error)
+        else:
+            app_logger.error(f"Ошибка фонового запроса: {error}")
@@ -1,10 +1,16 @@
 from PySide6.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QLabel, QComboBox, QLineEdit, QPushButton,
-    QTableWidget, QTableWidgetItem, QMessageBox, QSpinBox, QHeaderView  # ← добавь
+    QMessageBox, QSpinBox,
 )
 from PySide6.QtCore import Qt
+from psycopg2 import sql
+from app.db.listener import ALL_TABLES
 from app.log.log import app_logger
+from app.ui.export_dialog import export_result
+from app.ui.live_refresh import LiveRefresh
+from app.ui.query_runner import QueryRunner
+from app.ui.result_model import ResultTableModel, make_result_view, show_sort_indicator
 from app.ui.theme import *
 
 # окно быстрого просмотра таблиц с минимальными фильтрами
@@ -14,6 +20,16 @@ class QuickViewWindow(QMainWindow):
         self.db = db
         self.is_first_load = True
 
+        # текущая страница и её граничные ключи
+        self._page = 1
+        self._page_first = None
+        self._page_last = None
+        self._has_prev = False
+        self._has_next = False
+        self._page_order = None  # (колонка, направление), для которых посчитаны ключи
+        self._page_args = (1, None, None)  # (page, after, before) последней загрузки
+        self._header_sort = None  # (колонка, порядок) сортировки, отданной серверу
+
         self.setWindowTitle("Быстрый просмотр")
         self.resize(900, 600)
 
@@ -38,18 +54,18 @@ class QuickViewWindow(QMainWindow):
                 color: {WINDOW_BG};
                 font-weight: bold;
             }}
-            QTableWidget {{
+            QTableView {{
                 background-color: {CENTRAL_BG};
                 color: {TEXT_MAIN};
                 gridline-color: #404040;
                 border: 1px solid {CARD_BORDER};
                 border-radius: 8px;
             }}
-            QTableWidget::item {{
+            QTableView::item {{
                 padding: 6px;
                 border-bottom: 1px solid {CARD_BORDER};
             }}
-            QTableWidget::item:selected {{
+            QTableView::item:selected {{
                 background-color: {ACCENT_PRIMARY};
                 color: {WINDOW_BG};
                 font-weight: bold;
@@ -151,22 +167,12 @@ class QuickViewWindow(QMainWindow):
         self._load_tables()
 
     def _get_column_type(self, table, column):
-        # возвращает data_type из information_schema для выбранной колонки
+        # возвращает data_type выбранной колонки из кэша схемы
         if not table or not column:
             return None
 
-        q = """
-              SELECT data_type
-              FROM information_schema.columns
-              WHERE table_schema = 'public'
-                AND table_name = %s
-                AND column_name = %s
-          """
         try:
-            with self.db.cursor() as cur:
-                cur.execute(q, (table, column))
-                row = cur.fetchone()
-                return row["data_type"] if row else None
+            return self.db.catalog.column_type(table, column)
         except Exception as e:
             app_logger.error(e)
             return None
@@ -213,8 +219,8 @@ class QuickViewWindow(QMainWindow):
         self.cb_order_dir.addItems(["ASC", "DESC"])
         top2.addWidget(self.cb_order_dir)
 
-        # limit
-        lbl_limit = QLabel("LIMIT")
+        # размер страницы
+        lbl_limit = QLabel("НА СТРАНИЦЕ")
         lbl_limit.setStyleSheet(f"color: {ACCENT_SUCCESS}; font-size: 12px; font-weight: bold;")
         top2.addWidget(lbl_limit)
         self.limit_box = QSpinBox()
@@ -226,20 +232,45 @@ class QuickViewWindow(QMainWindow):
         # кнопка
         self.btn_apply = QPushButton("Применить")
         top2.addWidget(self.btn_apply)
+        self.btn_export = QPushButton("Экспорт…")
+        top2.addWidget(self.btn_export)
 
         self.btn_apply.clicked.connect(self._on_apply_clicked)
+        self.btn_export.clicked.connect(self._on_export_clicked)
         self.cb_table.currentTextChanged.connect(self._on_table_changed)
 
         # таблица
-        self.table = QTableWidget()
-        self.table.verticalHeader().setVisible(False)
-
-        header = self.table.horizontalHeader()
-        header.setStretchLastSection(True)
-        header.setSectionResizeMode(QHeaderView.Stretch)
+        # клик по заголовку: одна страница — сортировка на месте, иначе — запросом
+        self.result_model = ResultTableModel(self)
+        self.result_model.on_sort_request = self._sort_on_server
+        self.table = make_result_view(self.result_model, stretch=True, sortable=True)
 
         layout.addWidget(self.table)
 
+        # навигация по страницам (keyset: без OFFSET, по колонке сортировки + id)
+        pager = QHBoxLayout()
+        pager.addStretch(1)
+        self.btn_prev = QPushButton("◀ Назад")
+        self.lbl_page = QLabel("Стр. 1")
+        self.btn_next = QPushButton("Вперёд ▶")
+        pager.addWidget(self.btn_prev)
+        pager.addWidget(self.lbl_page)
+        pager.addWidget(self.btn_next)
+        layout.addLayout(pager)
+
+        self.btn_prev.clicked.connect(self._prev_page)
+        self.btn_next.clicked.connect(self._next_page)
+        self._update_page_controls()
+
+        # запрос выполняется в фоне: крутилка и кнопка отмены
+        self.runner = QueryRunner(self.db, self)
+        layout.addWidget(self.runner.panel)
+
+        # изменения таблицы с других рабочих мест: точечно, без перечитывания страницы
+        self.live_runner = QueryRunner(self.db, self)
+        self.live = LiveRefresh(self.db, self)
+        self.live.changed.connect(self._on_live_change)
+
     def _on_table_changed(self):
         self._load_columns()
         self._load_data()
@@ -261,17 +292,8 @@ class QuickViewWindow(QMainWindow):
         if not table:
             return
 
-        q = """
-                SELECT column_name
-                FROM information_schema.columns
-                WHERE table_schema = 'public' AND table_name = %s
-                ORDER BY ordinal_position;
-            """
-
         try:
-            with self.db.cursor() as cur:
-                cur.execute(q, (table,))
-                cols = [r["column_name"] for r in cur.fetchall()]
+            cols = self.db.catalog.column_names(table)
         except Exception as e:
             QMessageBox.critical(self, "Ошибка", str(e))
             app_logger.error(e)
@@ -282,95 +304,264 @@ class QuickViewWindow(QMainWindow):
         self.cb_column.addItems(cols)
         self.cb_order_col.addItems(cols)
 
+        # enum сортируется по порядку меток, а не по алфавиту
+        self.result_model.enum_orders = {
+            c["column_name"]: self.db.get_enum_labels(c["udt_name"])
+            for c in self.db.catalog.columns(table)
+            if c["data_type"] == "USER-DEFINED"
+        }
+
     # загрузка данных
-    def _build_sql(self):
+    def _build_where(self):
+        """Условие поиска по выбранной колонке: (текст WHERE без слова WHERE, параметры)."""
         table = self.cb_table.currentText()
         col = self.cb_column.currentText()
         flt = self.filter_edit.text().strip()
+
+        if not flt:
+            return "", []
+
+        # поиск по типу колонки
+        col_type = self._get_column_type(table, col)
+        numeric_types = {
+            "integer", "bigint", "smallint",
+            "numeric", "real", "double precision"
+        }
+
+        if col_type in numeric_types:
+            # лучше проверка чисел
+            try:
+                return f'"{col}" = %s', [float(flt)]
+            except ValueError:
+                # если не число - ищем как текст
+                return f'"{col}"::text ILIKE %s', [f"%{flt}%"]
+        if col_type == "boolean":
+            # true / false / да / нет
+            txt = flt.lower()
+            if txt in ("true", "t", "1", "yes", "y", "да"):
+                return f"{col} = %s", [True]
+            if txt in ("false", "f", "0", "no", "n", "нет"):
+                return f"{col} = %s", [False]
+            return f"{col}::text ILIKE %s", [f"%{flt}%"]
+
+        # строки, даты и всё остальное — мягкий поиск по подстроке
+        return f"{col}::text ILIKE %s", [f"%{flt}%"]
+
+    def _build_sql(self, offset: int | None = None):
+        """Запрос с фильтром и сортировкой; offset — страница в режиме OFFSET."""
+        table = self.cb_table.currentText()
         order_col = self.cb_order_col.currentText()
         order_dir = self.cb_order_dir.currentText()
-        limit = self.limit_box.value()
 
         # базовый запрос
         q = f"SELECT * FROM {table}"
-        params = []
+        where, params = self._build_where()
+        if where:
+            q += f" WHERE {where}"
 
-        # поиск по типу колонки
-        if flt:
-            col_type = self._get_column_type(table, col)
-            numeric_types = {
-                "integer", "bigint", "smallint",
-                "numeric", "real", "double precision"
-            }
-
-            if col_type in numeric_types:
-                # лучше проверка чисел
-                try:
-                    num_val = float(flt)
-                    q += f' WHERE "{col}" = %s'
-                    params.append(num_val)
-                except ValueError:
-                    # если не число - ищем как текст
-                    q += f' WHERE "{col}"::text ILIKE %s'
-                    params.append(f"%{flt}%")
-            elif col_type == "boolean":
-                # true / false / да / нет
-                txt = flt.lower()
-                if txt in ("true", "t", "1", "yes", "y", "да"):
-                    q += f" WHERE {col} = %s"
-                    params.append(True)
-                elif txt in ("false", "f", "0", "no", "n", "нет"):
-                    q += f" WHERE {col} = %s"
-                    params.append(False)
-                else:
-                    q += f" WHERE {col}::text ILIKE %s"
-                    params.append(f"%{flt}%")
-            else:
-                # строки, даты и всё остальное — мягкий поиск по подстроке
-                q += f" WHERE {col}::text ILIKE %s"
-                params.append(f"%{flt}%")
-
-        # ORDER BY и LIMIT
         if order_col:
             q += f" ORDER BY {order_col} {order_dir}"
-        q += " LIMIT %s"
-        params.append(limit)
+        if offset is not None:
+            # на одну строку больше — чтобы узнать, есть ли следующая страница
+            q += " LIMIT %s OFFSET %s"
+            params += [self.limit_box.value() + 1, offset]
 
         return q + ";", params
 
+    def _uses_keyset(self) -> bool:
+        # keyset по (колонка сортировки, id) возможен, только если есть id
+        table = self.cb_table.currentText()
+        return "id" in self.db.catalog.column_names(table)
+
     def _load_data(self):
-        try:
-            sql, params = self._build_sql()
-
-            with self.db.cursor() as cur:
-                cur.execute(sql, params)
-                rows = cur.fetchall()
-
-            if not rows:
-                if not self.is_first_load:
-                    self.table.setRowCount(1)
-                    self.table.setColumnCount(1)
-                    self.table.setHorizontalHeaderLabels(["Результат"])
-                    item = QTableWidgetItem("Нет результатов по поиску")
-                    item.setTextAlignment(Qt.AlignCenter)
-                    self.table.setItem(0, 0, item)
-                else:
-                    self.table.setRowCount(0)
-                    self.table.setColumnCount(0)
-                return
-
-            cols = list(rows[0].keys())
-            self.table.setColumnCount(len(cols))
-            self.table.setHorizontalHeaderLabels(cols)
-            self.table.setRowCount(len(rows))
-
-            for r, row in enumerate(rows):
-                for c, col in enumerate(cols):
-                    self.table.setItem(r, c, QTableWidgetItem(str(row[col])))
+        self._load_page(1)
 
-        except Exception as e:
-            QMessageBox.critical(self, "Ошибка", f"Ошибка запроса:\n{e}")
-            app_logger.error(e)
+    def _load_page(self, page: int, after=None, before=None):
+        table = self.cb_table.currentText()
+        if not table:
+            return
+        order_col = self.cb_order_col.currentText() or None
+        direction = self.cb_order_dir.currentText()
+        page_size = self.limit_box.value()
+        self._page_args = (page, after, before)
+        self.live_runner.cancel()
+
+        if self._uses_keyset():
+            where, params = self._build_where()
+
+            def job():
+                return self.db.select_page(
+                    table, order_col, direction,
+                    where=[sql.SQL(where)] if where else None, params=params,
+                    after=after, before=before, page_size=page_size,
+                )
+        else:
+            # у представлений нет id — обычный OFFSET
+            query, params = self._build_sql(offset=(page - 1) * page_size)
+
+            def job():
+                res = self.db.cached_query(query, params)
+                rows, columns = res["rows"], res["columns"]
+                return {
+                    "rows": rows[:page_size],
+                    "columns": columns,
+                    "has_more": len(rows) > page_size,
+                }
+
+        # колонка поиска и сортировки — советнику индексов
+        if self._uses_keyset():
+            advisor = self.db.index_advisor
+            if self.filter_edit.text().strip():
+                where, _ = self._build_where()
+                kind = "search" if "ILIKE" in where else "filter"
+                advisor.note(table, self.cb_column.currentText(), kind)
+            if order_col:
+                advisor.note(table, order_col, "sort")
+
+        backward = before is not None
+        self.runner.run(
+            job,
+            lambda res: self._on_page_loaded(res, page, backward),
+            self._on_load_error,
+        )
+
+    def _on_page_loaded(self, res: dict, page: int, backward: bool):
+        rows = res["rows"]
+        self._page = page
+        if backward:
+            self._has_prev = res["has_more"]
+            self._has_next = True
+        else:
+            self._has_prev = page > 1
+            self._has_next = res["has_more"]
+
+        # граничные строки страницы — ключи для перехода вперёд / назад
+        order_col = self.cb_order_col.currentText()
+        self._page_order = (order_col, self.cb_order_dir.currentText())
+        if rows and "id" in rows[0]:
+            def bound(row):
+                if order_col and order_col != "id":
+                    return (row[order_col], row["id"])
+                return (row["id"],)
+            self._page_first = bound(rows[0])
+            self._page_last = bound(rows[-1])
+        else:
+            self._page_first = self._page_last = None
+
+        self._update_page_controls()
+
+        if rows:
+            self.result_model.set_rows(res["columns"], rows)
+            # страница из нескольких — порядок по заголовку знает только сервер
+            self.result_model.truncated = self._has_prev or self._has_next
+            if self._header_sort is not None:
+                col = self.result_model.column_index(self._header_sort[0])
+                if col >= 0:
+                    show_sort_indicator(self.table, col, self._header_sort[1])
+        elif not self.is_first_load:
+            self.result_model.show_message("Нет результатов по поиску")
+        else:
+            self.result_model.clear()
+
+        self._header_sort = None
+
+    def _sort_on_server(self, column: str, order):
+        """Клик по заголовку, а страниц несколько: ORDER BY и первая страница."""
+        if self.cb_order_col.findText(column) < 0:
+            return
+        self.cb_order_col.setCurrentText(column)
+        self.cb_order_dir.setCurrentText("DESC" if order == Qt.DescendingOrder else "ASC")
+        self._header_sort = (column, order)
+        self._load_data()
+
+    def _order_changed(self) -> bool:
+        # сортировку поменяли без «Применить» — старые ключи не годятся
+        current = (self.cb_order_col.currentText(), self.cb_order_dir.currentText())
+        if current != self._page_order:
+            self._load_data()
+            return True
+        return False
+
+    def _next_page(self):
+        if not self._has_next or self._order_changed():
+            return
+        self._load_page(self._page + 1, after=self._page_last)
+
+    def _prev_page(self):
+        if not self._has_prev or self._order_changed():
+            return
+        if self._page - 1 == 1:
+            # первая страница всегда читается с начала
+            self._load_page(1)
+        else:
+            self._load_page(self._page - 1, before=self._page_first)
+
+    def _update_page_controls(self):
+        self.btn_prev.setEnabled(self._has_prev)
+        self.btn_next.setEnabled(self._has_next)
+        self.lbl_page.setText(f"Стр. {self._page}")
+
+    def _reload_page(self):
+        self._load_page(*self._page_args)
+
+    # живое обновление
+    def _on_live_change(self, table: str, change: dict):
+        if not self.cb_table.currentText():
+            return
+        keyset = self._uses_keyset()
+        # у представлений базовые таблицы неизвестны — реагируем на любую
+        if keyset and table not in (self.cb_table.currentText(), ALL_TABLES):
+            return
+        if change["full"] or self.runner.is_busy() or not keyset:
+            # id неизвестны или страница ещё грузится — перечитываем только её
+            self._reload_page()
+            return
+
+        # удалённые строки убираем сразу, без запроса
+        self.result_model.remove_rows("id", change["deleted"])
+
+        ids = change["inserted"] | change["updated"]
+        if not ids:
+            return
+        where, params = self._build_where()
+        visible = self.result_model.key_values("id")
+
+        def job():
+            return self.db.select_by_ids(
+                table, ids, where=[sql.SQL(where)] if where else None, params=params,
+            )
+
+        self.live_runner.run(
+            job,
+            lambda rows: self._apply_live_rows(rows, ids, visible),
+            lambda e: app_logger.error(f"Живое обновление {table}: {e}"),
+        )
+
+    def _apply_live_rows(self, rows: list[dict], ids: set, visible: set):
+        found = {r["id"] for r in rows}
+        if found - visible:
+            # новая строка под фильтром: её место на страницах знает только запрос
+            self._reload_page()
+            return
+        self.result_model.update_rows("id", rows)
+        # изменённые строки, которые больше не подходят под фильтр
+        self.result_model.remove_rows("id", (ids & visible) - found)
+
+    def _on_load_error(self, e: Exception):
+        QMessageBox.critical(self, "Ошибка", f"Ошибка запроса:\n{e}")
+        app_logger.error(e)
+
+    def closeEvent(self, event):
+        self.live.close()
+        self.live_runner.cancel()
+        self.runner.cancel()
+        self.result_model.close()
+        super().closeEvent(event)
+
+    def _on_export_clicked(self):
+        # весь результат фильтра (все страницы) через COPY
+        query, params = self._build_sql()
+        export_result(self, self.db, query, params, default_name=self.cb_table.currentText())
 
     def _on_apply_clicked(self):
         self.is_first_load = False
@@ -0,0 +1,136 @@
+from PySide6.QtWidgets import QWidget, QVBoxLayout, QLineEdit, QCompleter
+from PySide6.QtCore import Qt, QTimer, QModelIndex
+from PySide6.QtGui import QStandardItemModel, QStandardItem
+
+from app.log.log import app_logger
+from app.ui.query_runner import QueryRunner
+from app.ui.theme import *
+
+
+_ID_ROLE = Qt.UserRole
+_MORE = "more"  # строка «Ещё…» в подсказках
+
+
+class ReferencePicker(QWidget):
+    """Выбор строки по внешнему ключу с поиском на сервере.
+
+    Ввод с паузой DEBOUNCE_MS ищет подписи через Database.search_reference()
+    в фоне; подсказки — в QCompleter, следующая страница — по пункту «Ещё…».
+    value() — id выбранной строки (или введённое число), иначе "".
+    """
+
+    DEBOUNCE_MS = 300
+    PAGE = 50
+
+    def __init__(self, db, table: str, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.table = table
+        self._selected = None  # (id, подпись)
+        self._text = ""  # строка поиска показанных подсказок
+        self._after = None  # ключ следующей страницы
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(2)
+
+        self.edit = QLineEdit()
+        self.edit.setPlaceholderText("Начните вводить для поиска…")
+        self.edit.setStyleSheet(f"""
+            background-color: {CENTRAL_BG};
+            color: {TEXT_MAIN};
+            border: 1px solid {CARD_BORDER};
+            border-radius: 4px;
+            padding: 6px;
+        """)
+        layout.addWidget(self.edit)
+
+        self.model = QStandardItemModel(self)
+        self.completer = QCompleter(self.model, self)
+        # подсказки уже отобраны сервером — не фильтруем их повторно
+        self.completer.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+        self.completer.setMaxVisibleItems(12)
+        self.completer.popup().setStyleSheet(f"""
+            background-color: {CENTRAL_BG};
+            color: {TEXT_MAIN};
+            border: 1px solid {CARD_BORDER};
+            selection-background-color: {ACCENT_PRIMARY};
+        """)
+        self.edit.setCompleter(self.completer)
+        self.completer.activated[QModelIndex].connect(self._on_activated)
+
+        self.runner = QueryRunner(self.db, self)
+        layout.addWidget(self.runner.panel)
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(self.DEBOUNCE_MS)
+        self._timer.timeout.connect(self._search)
+        self.edit.textEdited.connect(self._on_edited)
+
+        # первая страница — сразу, чтобы список можно было листать без ввода
+        QTimer.singleShot(0, self._search)
+
+    # значение
+    def value(self) -> str:
+        if self._selected is not None:
+            return str(self._selected[0])
+        text = self.edit.text().strip()
+        return text if text.isdigit() else ""
+
+    # поиск
+    def _on_edited(self, _text: str):
+        self._selected = None
+        self._timer.start()
+
+    def _search(self):
+        text = self.edit.text().strip()
+        self._load(text, None)
+
+    def _load(self, text: str, after):
+        def job():
+            return self.db.search_reference(self.table, text, after, self.PAGE)
+
+        def done(res: dict):
+            self._show(text, after, res)
+
+        self.runner.run(job, done, self._on_error, text="Поиск…")
+
+    def _show(self, text: str, after, res: dict):
+        # ответ на устаревший ввод не показываем
+        if text != self.edit.text().strip():
+            return
+
+        if after is None:
+            self.model.clear()
+        else:
+            # убираем прежний «Ещё…» — строки дописываются после него
+            last = self.model.rowCount() - 1
+            if last >= 0 and self.model.item(last).data(_ID_ROLE) == _MORE:
+                self.model.removeRow(last)
+
+        for id_, label in res["rows"]:
+            item = QStandardItem(f"{label}  [{id_}]")
+            item.setData(id_, _ID_ROLE)
+            self.model.appendRow(item)
+
+        self._text, self._after = text, res["after"]
+        if self._after is not None:
+            more = QStandardItem("Ещё…")
+            more.setData(_MORE, _ID_ROLE)
+            self.model.appendRow(more)
+
+        if self.model.rowCount() and self.edit.hasFocus():
+            self.completer.complete()
+
+    def _on_activated(self, index):
+        id_ = index.data(_ID_ROLE)
+        if id_ == _MORE:
+            # completer уже подставил «Ещё…» в поле — возвращаем строку поиска
+            QTimer.singleShot(0, lambda: self.edit.setText(self._text))
+            self._load(self._text, self._after)
+            return
+        self._selected = (id_, index.data())
+
+    def _on_error(self, e: Exception):
+        app_logger.error(f"Ошибка поиска в {self.table}: {e}")
@@ -0,0 +1,95 @@
+import re
+
+from PySide6.QtCore import Qt, QSortFilterProxyModel
+
+
+ALL_COLUMNS = "Все колонки"
+
+
+class ResultFilter:
+    """Фильтр по уже полученным строкам ResultTableModel.
+
+    Тексты колонок в нижнем регистре готовятся один раз на результат (для
+    новых пачек — дописываются), маска строк считается списковыми
+    выражениями по целой колонке, без вызовов Qt на каждую ячейку.
+
+    Запрос — слова через пробел, подходят строки, где нашлись все;
+    «колонка:текст» ищет в этой колонке, просто «текст» — в выбранной
+    (ALL_COLUMNS — в любой). В режиме regex весь запрос — одно регулярное
+    выражение без учёта регистра.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self._generation = None
+        self._lower: dict[int, list[str]] = {}  # колонка -> тексты в нижнем регистре
+
+    def _column(self, col: int) -> list[str]:
+        if self._generation != self.model.generation:
+            self._generation = self.model.generation
+            self._lower = {}
+        texts = self._lower.get(col)
+        if texts is None:
+            texts = [t.lower() for t in self.model.column_texts(col)]
+            self._lower[col] = texts
+        elif len(texts) < self.model.rowCount():
+            texts.extend(t.lower() for t in self.model.column_texts(col, len(texts)))
+        return texts
+
+    def _any(self, cols: list[int], match) -> list[bool]:
+        hit = [False] * self.model.rowCount()
+        for col in cols:
+            hit = [h or match(t) for h, t in zip(hit, self._column(col))]
+        return hit
+
+    def mask(self, text: str, column: str | None, regex: bool = False) -> list[bool] | None:
+        """None — фильтра нет, иначе для каждой строки: подходит ли она.
+
+        Ошибку в регулярном выражении отдаёт как re.error.
+        """
+        text = text.strip()
+        if not text or self.model.is_message():
+            return None
+
+        by_name = {c.lower(): i for i, c in enumerate(self.model.columns)}
+        if column and column != ALL_COLUMNS:
+            default_cols = [by_name[column.lower()]] if column.lower() in by_name else []
+        else:
+            default_cols = list(range(len(self.model.columns)))
+
+        if regex:
+            rx = re.compile(text, re.IGNORECASE)
+            return self._any(default_cols, lambda t: rx.search(t) is not None)
+
+        mask = None
+        for term in text.lower().split():
+            name, sep, value = term.partition(":")
+            if sep and value and name in by_name:
+                cols = [by_name[name]]
+            else:
+                cols, value = default_cols, term
+            hit = self._any(cols, lambda t, v=value: v in t)
+            mask = hit if mask is None else [m and h for m, h in zip(mask, hit)]
+        return mask
+
+
+class ResultFilterProxy(QSortFilterProxyModel):
+    """Прокси между ResultTableModel и view: показывает строки по маске ResultFilter."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._mask: list[bool] | None = None
+
+    def set_mask(self, mask: list[bool] | None):
+        self._mask = mask
+        self.invalidateFilter()
+
+    def sort(self, column: int, order=Qt.AscendingOrder):
+        # сортирует сама модель (с учётом типов и неполного результата);
+        # маску после этого пересчитывают по layoutChanged модели
+        self.sourceModel().sort(column, order)
+
+    def filterAcceptsRow(self, source_row: int, source_parent) -> bool:
+        mask = self._mask
+        # строки новой пачки до пересчёта маски не показываем
+        return mask is None or (source_row < len(mask) and mask[source_row])
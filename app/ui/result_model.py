@@ -0,0 +1,445 @@
+from PySide6.QtWidgets import QTableView, QHeaderView, QAbstractItemView
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex, QObject, QRunnable, QThreadPool, Signal
+from PySide6.QtGui import QColor, QFont
+
+from app.log.log import app_logger
+
+
+class _FetchSignals(QObject):
+    done = Signal(int, object)  # номер потока модели, пачка строк
+    failed = Signal(int, object)
+
+
+class _FetchJob(QRunnable):
+    """Следующая пачка из RowStream в QThreadPool (FETCH идёт на сервер)."""
+
+    def __init__(self, stream, stream_id: int, signals: _FetchSignals):
+        super().__init__()
+        self.stream = stream
+        self.stream_id = stream_id
+        self.signals = signals
+
+    def run(self):
+        try:
+            rows = self.stream.fetch_batch()
+        except Exception as e:
+            self.signals.failed.emit(self.stream_id, e)
+        else:
+            self.signals.done.emit(self.stream_id, rows)
+
+
+class ResultTableModel(QAbstractTableModel):
+    """Модель результата запроса для QTableView.
+
+    Строки хранятся компактно — кортежами исходных значений, текст
+    для ячейки строится только когда view её рисует. Если модели отдан
+    RowStream, следующие пачки подкачиваются через canFetchMore/fetchMore,
+    то есть по мере прокрутки: FETCH идёт в QThreadPool, строки добавляются,
+    когда пачка пришла, а пока она в пути, canFetchMore() отвечает False.
+
+    sort() (клик по заголовку) упорядочивает уже полученные строки без
+    запроса, если в модели весь результат; иначе порядок знает только
+    сервер, и модель зовёт on_sort_request(колонка, Qt.SortOrder).
+    """
+
+    def __init__(self, parent=None, none_text: str = ""):
+        super().__init__(parent)
+        self.none_text = none_text
+        self.columns: list[str] = []
+        self._rows: list[tuple] = []
+        self.stream = None
+        self._message = False  # одна строка-сообщение вместо данных
+
+        # подкачка в фоне: пачка в пути и номер текущего потока — ответ
+        # для уже закрытого потока (новый запрос, clear()) отбрасывается
+        self._fetching = False
+        self._stream_id = 0
+        self._fetch_signals = _FetchSignals()
+        self._fetch_signals.done.connect(self._on_fetched)
+        self._fetch_signals.failed.connect(self._on_fetch_failed)
+
+        self.on_batch = None  # вызывается после добавления каждой пачки
+        self.on_sort_request = None  # сортировка неполного результата — запросом
+        self.truncated = False  # в модели только часть результата (страница)
+        self.enum_orders: dict[str, list[str]] = {}  # колонка -> метки enum по порядку
+        # меняется при любой замене / правке строк (но не при дописывании пачки):
+        # по нему ResultFilter понимает, что его кэш колонок устарел
+        self.generation = 0
+
+        # подсветка вычисленного столбца
+        self._highlight_col = -1
+        self._highlight_bg = QColor("#064e3b")
+        self._highlight_header_bg = QColor("#047857")
+
+    # заполнение
+    def start(self, stream, rows: list[dict] | None = None) -> int:
+        """Показать первую пачку нового потока, вернуть число строк в ней.
+
+        rows — уже прочитанная первая пачка (см. start_async()).
+        """
+        self.close()
+        if rows is None:
+            rows = stream.fetch_batch()
+
+        self.beginResetModel()
+        self.generation += 1
+        self.stream = stream
+        self.truncated = False
+        self._message = False
+        self.columns = list(stream.columns)
+        self._rows = [self._pack(r) for r in rows]
+        self._highlight_col = -1
+        self.endResetModel()
+
+        if rows and self.on_batch:
+            self.on_batch()
+        return len(rows)
+
+    def start_async(self, runner, make_stream, on_done=None, on_error=None):
+        """Открыть поток и прочитать первую пачку в фоне через QueryRunner.
+
+        make_stream() выполняется в рабочем потоке, on_done(число строк)
+        и on_error(исключение) — в потоке GUI.
+        """
+        self.close()
+
+        def job():
+            stream = make_stream()
+            return stream, stream.fetch_batch()
+
+        def done(res):
+            n = self.start(*res)
+            if on_done:
+                on_done(n)
+
+        runner.run(job, done, on_error, on_discard=lambda res: res[0].close())
+
+    def start_cached_async(self, runner, db, query, max_rows: int = 5000,
+                           on_done=None, on_error=None):
+        """Как start_async(), но сначала через кэш результатов Database.
+
+        Результат до max_rows строк берётся из кэша (или кладётся в него),
+        больший — читается потоком с подкачкой при прокрутке.
+        """
+        self.close()
+
+        def job():
+            res = db.cached_query(query, max_rows=max_rows)
+            if res is not None:
+                return None, res
+            stream = db.stream(query)
+            return stream, stream.fetch_batch()
+
+        def done(res):
+            stream, data = res
+            if stream is None:
+                self.set_rows(data["columns"], data["rows"])
+                n = len(data["rows"])
+            else:
+                n = self.start(stream, data)
+            if on_done:
+                on_done(n)
+
+        def discard(res):
+            if res[0] is not None:
+                res[0].close()
+
+        runner.run(job, done, on_error, on_discard=discard)
+
+    def set_rows(self, columns: list[str], rows: list[dict]):
+        """Показать готовый (небольшой) результат без потока."""
+        self.close()
+        self.beginResetModel()
+        self.generation += 1
+        self.truncated = False
+        self._message = False
+        self.columns = list(columns)
+        self._rows = [self._pack(r) for r in rows]
+        self._highlight_col = -1
+        self.endResetModel()
+
+    def show_message(self, text: str, title: str = "Результат"):
+        self.close()
+        self.beginResetModel()
+        self.generation += 1
+        self.truncated = False
+        self._message = True
+        self.columns = [title]
+        self._rows = [(text,)]
+        self._highlight_col = -1
+        self.endResetModel()
+
+    def clear(self):
+        self.close()
+        self.beginResetModel()
+        self.generation += 1
+        self.truncated = False
+        self._message = False
+        self.columns = []
+        self._rows = []
+        self._highlight_col = -1
+        self.endResetModel()
+
+    def close(self):
+        if self.stream is None:
+            return
+        stream, self.stream = self.stream, None
+        self._stream_id += 1
+        if self._fetching:
+            # close() ждал бы, пока FETCH в рабочем потоке вернётся, — закрываем там же
+            self._fetching = False
+            QThreadPool.globalInstance().start(stream.close)
+        else:
+            stream.close()
+
+    def _pack(self, row) -> tuple:
+        if isinstance(row, dict):
+            return tuple(row[c] for c in self.columns)
+        return tuple(row)
+
+    # подкачка
+    def canFetchMore(self, parent=QModelIndex()) -> bool:
+        if parent.isValid():
+            return False
+        return self.stream is not None and not self.stream.exhausted and not self._fetching
+
+    def fetchMore(self, parent=QModelIndex()):
+        if not self.canFetchMore(parent):
+            return
+        self._fetching = True
+        QThreadPool.globalInstance().start(
+            _FetchJob(self.stream, self._stream_id, self._fetch_signals)
+        )
+
+    def _on_fetch_failed(self, stream_id: int, error: Exception):
+        if stream_id != self._stream_id:
+            return
+        self._fetching = False
+        app_logger.error(f"Ошибка подкачки строк: {error}")
+        self.close()
+        self.truncated = True
+
+    def _on_fetched(self, stream_id: int, rows: list[dict]):
+        if stream_id != self._stream_id:
+            return
+        self._fetching = False
+        if not rows:
+            return
+
+        start = len(self._rows)
+        self.beginInsertRows(QModelIndex(), start, start + len(rows) - 1)
+        self._rows.extend(self._pack(r) for r in rows)
+        self.endInsertRows()
+
+        if self.on_batch:
+            self.on_batch()
+
+    # доступ к данным
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.columns)
+
+    def value(self, row: int, col: int):
+        return self._rows[row][col]
+
+    def text(self, row: int, col: int) -> str:
+        val = self._rows[row][col]
+        return self.none_text if val is None else str(val)
+
+    def column_texts(self, col: int, start: int = 0) -> list[str]:
+        """Тексты ячеек колонки со строки start — как их показывает view."""
+        none = self.none_text
+        return [none if row[col] is None else str(row[col]) for row in self._rows[start:]]
+
+    def is_message(self) -> bool:
+        return self._message
+
+    def is_complete(self) -> bool:
+        """В модели весь результат запроса: поток дочитан, это не страница."""
+        if self.truncated or self.stream is None:
+            return not self.truncated
+        if self._fetching:
+            # последняя пачка может быть уже прочитана, но ещё не добавлена
+            return False
+        # поток, закрытый ради DDL (Database.close_streams()), дочитан не весь
+        return self.stream.exhausted and not self.stream.interrupted
+
+    def column_index(self, name: str) -> int:
+        try:
+            return self.columns.index(name)
+        except ValueError:
+            return -1
+
+    # точечные изменения (живое обновление)
+    def key_values(self, key: str) -> set:
+        col = self.column_index(key)
+        if col < 0 or self._message:
+            return set()
+        return {row[col] for row in self._rows}
+
+    def update_rows(self, key: str, rows: list[dict]) -> int:
+        """Заменить строки с теми же значениями key, вернуть число заменённых."""
+        col = self.column_index(key)
+        if col < 0 or self._message:
+            return 0
+        by_key = {r[key]: r for r in rows}
+        n = 0
+        for i, row in enumerate(self._rows):
+            new = by_key.get(row[col])
+            if new is None:
+                continue
+            self._rows[i] = self._pack(new)
+            self.generation += 1
+            self.dataChanged.emit(self.index(i, 0), self.index(i, len(self.columns) - 1))
+            n += 1
+        return n
+
+    def remove_rows(self, key: str, values) -> int:
+        """Убрать строки, у которых key входит в values."""
+        col = self.column_index(key)
+        if col < 0 or self._message:
+            return 0
+        values = set(values)
+        n = 0
+        for i in range(len(self._rows) - 1, -1, -1):
+            if self._rows[i][col] in values:
+                self.beginRemoveRows(QModelIndex(), i, i)
+                del self._rows[i]
+                self.generation += 1
+                self.endRemoveRows()
+                n += 1
+        return n
+
+    def data(self, index: QModelIndex, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.DisplayRole:
+            return self.text(index.row(), index.column())
+        if role == Qt.BackgroundRole and index.column() == self._highlight_col:
+            return self._highlight_bg
+        if role == Qt.TextAlignmentRole and self._message:
+            return int(Qt.AlignCenter)
+        return None
+
+    def headerData(self, section: int, orientation, role=Qt.DisplayRole):
+        if orientation != Qt.Horizontal:
+            if role == Qt.DisplayRole:
+                return str(section + 1)
+            return None
+        if section >= len(self.columns):
+            return None
+        if role == Qt.DisplayRole:
+            return self.columns[section]
+        if section == self._highlight_col:
+            if role == Qt.BackgroundRole:
+                return self._highlight_header_bg
+            if role == Qt.FontRole:
+                f = QFont()
+                f.setBold(True)
+                return f
+        return None
+
+    def flags(self, index: QModelIndex):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable
+
+    # сортировка
+    def _sort_key(self, col: int):
+        # значения уже типизированы psycopg2 (числа, даты, bool); enum приходит
+        # строкой — сортируем по порядку меток, как сервер
+        labels = self.enum_orders.get(self.columns[col])
+        if labels:
+            pos = {label: i for i, label in enumerate(labels)}
+            unknown = len(labels)
+            return lambda v: pos.get(v, unknown)
+        return lambda v: v.casefold() if isinstance(v, str) else v
+
+    def sort(self, column: int, order=Qt.AscendingOrder):
+        if self._message or not 0 <= column < len(self.columns) or not self._rows:
+            return
+        if not self.is_complete():
+            if self.on_sort_request:
+                self.on_sort_request(self.columns[column], order)
+            return
+
+        key = self._sort_key(column)
+        desc = order == Qt.DescendingOrder
+        rows = self._rows
+        # NULL — в конце при любом направлении, как NULLS LAST в select_page()
+        nulls = [i for i, row in enumerate(rows) if row[column] is None]
+        filled = [i for i, row in enumerate(rows) if row[column] is not None]
+        try:
+            keys = {i: key(rows[i][column]) for i in filled}
+            perm = sorted(filled, key=keys.__getitem__, reverse=desc)
+        except TypeError:
+            # несравнимые значения (json, смешанные типы) — по тексту ячейки
+            perm = sorted(filled, key=lambda i: str(rows[i][column]), reverse=desc)
+        perm += nulls
+
+        self.layoutAboutToBeChanged.emit()
+        new_pos = [0] * len(perm)
+        for new, old in enumerate(perm):
+            new_pos[old] = new
+        self._rows = [self._rows[i] for i in perm]
+        self.generation += 1
+        # выделение и текущая ячейка остаются на своих строках
+        old = self.persistentIndexList()
+        self.changePersistentIndexList(old, [self.index(new_pos[i.row()], i.column()) for i in old])
+        self.layoutChanged.emit()
+
+    # подсветка
+    def set_highlight_column(self, name: str | None):
+        col = self.column_index(name) if name else -1
+        if col == self._highlight_col:
+            return
+        self._highlight_col = col
+        if self._rows and self.columns:
+            self.dataChanged.emit(
+                self.index(0, 0),
+                self.index(len(self._rows) - 1, len(self.columns) - 1),
+                [Qt.BackgroundRole],
+            )
+        if self.columns:
+            self.headerDataChanged.emit(Qt.Horizontal, 0, len(self.columns) - 1)
+
+
+def make_result_view(model: ResultTableModel, stretch: bool = False,
+                     sortable: bool = False) -> QTableView:
+    """QTableView под ResultTableModel с общими для окон настройками.
+
+    sortable — клик по заголовку вызывает sort() текущей модели view (или
+    прокси над ней); новый результат сбрасывает стрелку сортировки.
+    """
+    view = QTableView()
+    view.setModel(model)
+    view.verticalHeader().setVisible(False)
+    view.setEditTriggers(QAbstractItemView.NoEditTriggers)
+    view.setHorizontalScrollMode(QAbstractItemView.ScrollPerPixel)
+    view.setHorizontalScrollBarPolicy(Qt.ScrollBarAsNeeded)
+
+    header = view.horizontalHeader()
+    if stretch:
+        header.setSectionResizeMode(QHeaderView.Stretch)
+    else:
+        header.setStretchLastSection(False)
+        header.setSectionResizeMode(QHeaderView.Interactive)
+
+    if sortable:
+        # не setSortingEnabled(): он сразу сортирует по первой колонке
+        header.setSectionsClickable(True)
+        header.setSortIndicatorShown(True)
+        header.setSortIndicator(-1, Qt.AscendingOrder)
+        header.sortIndicatorChanged.connect(lambda col, order: view.model().sort(col, order))
+        model.modelReset.connect(lambda: header.setSortIndicator(-1, Qt.AscendingOrder))
+    return view
+
+
+def show_sort_indicator(view: QTableView, column: int, order):
+    """Стрелка в заголовке без повторной сортировки (порядок уже дал сервер)."""
+    header = view.horizontalHeader()
+    header.blockSignals(True)
+    header.setSortIndicator(column, order)
+    header.blockSignals(False)
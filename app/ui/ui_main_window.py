@@ -1,6 +1,6 @@
 from PySide6.QtWidgets import (
     QVBoxLayout, QGridLayout, QPushButton,
-    QLabel, QFrame, QSizePolicy, QWidget
+    QLabel, QFrame, QSizePolicy, QWidget, QLineEdit
 )
 from PySide6.QtGui import QFont, QColor, QPalette
 from PySide6.QtCore import Qt
@@ -28,6 +28,25 @@ class UIMainWindow(object):
         header.setStyleSheet(f"color: {TEXT_SOFT};")
         main_layout.addWidget(header)
 
+        # быстрый поиск гостя / номера по индексу в памяти
+        self.quick_search = QLineEdit()
+        self.quick_search.setPlaceholderText("Быстрый поиск: паспорт, фамилия [имя] или номер комнаты")
+        self.quick_search.setClearButtonEnabled(True)
+        self.quick_search.setStyleSheet(f"""
+            QLineEdit {{
+                background-color: {CARD_BG};
+                color: {TEXT_MAIN};
+                border: 1px solid {CARD_BORDER};
+                border-radius: 8px;
+                padding: 8px 12px;
+                font-size: 14px;
+            }}
+            QLineEdit:focus {{
+                border-color: {ACCENT_PRIMARY};
+            }}
+        """)
+        main_layout.addWidget(self.quick_search)
+
         # блок 1
         structure_frame = self._block("База и структура ツ", kind="primary")
         structure_layout = structure_frame.layout()
@@ -41,6 +60,7 @@ class UIMainWindow(object):
         self.btn_alter = self._button("Изменить структуру")
         self.btn_types = self._button("Пользовательские типы")
         self.btn_reset_schema = self._button_danger("Сбросить базу")
+        self.btn_partitions = self._button("Секции stays")
 
         # ряд 1
         structure_grid.addWidget(self.btn_create_schema, 0, 0)
@@ -50,6 +70,9 @@ class UIMainWindow(object):
         structure_grid.addWidget(self.btn_types, 1, 0)
         structure_grid.addWidget(self.btn_reset_schema, 1, 1)
 
+        # ряд 3
+        structure_grid.addWidget(self.btn_partitions, 2, 0)
+
         main_layout.addWidget(structure_frame)
 
         # блок 2
@@ -64,12 +87,19 @@ class UIMainWindow(object):
         self.btn_quick_view = self._button("Быстрый просмотр")
         self.btn_add_data = self._button("Внести данные")
         self.btn_show_data = self._button("Показать данные")
+        self.btn_import = self._button("Импорт CSV")
+        self.btn_free_rooms = self._button("Свободные номера")
+        self.btn_daily_stats = self._button("Пересчитать сводку")
 
         # ряд 1
         data_grid.addWidget(self.btn_quick_view, 0, 0)
         data_grid.addWidget(self.btn_add_data, 0, 1)
         # ряд 2
-        data_grid.addWidget(self.btn_show_data, 1, 0, 1, 2)
+        data_grid.addWidget(self.btn_show_data, 1, 0)
+        data_grid.addWidget(self.btn_import, 1, 1)
+        # ряд 3
+        data_grid.addWidget(self.btn_free_rooms, 2, 0)
+        data_grid.addWidget(self.btn_daily_stats, 2, 1)
 
         main_layout.addWidget(data_frame)
 
@@ -84,9 +114,11 @@ class UIMainWindow(object):
 
         self.btn_views = self._button("Представления и CTE")
         self.btn_cte_builder = self._button("Создать CTE (подзапрос)")
+        self.btn_index_advisor = self._button("Советник индексов")
 
         queries_grid.addWidget(self.btn_views, 0, 0)
         queries_grid.addWidget(self.btn_cte_builder, 0, 1)
+        queries_grid.addWidget(self.btn_index_advisor, 1, 0)
 
         main_layout.addWidget(queries_frame)
 
@@ -108,11 +140,16 @@ class UIMainWindow(object):
                 self.btn_alter,
                 self.btn_types,
                 self.btn_reset_schema,
+                self.btn_partitions,
                 self.btn_quick_view,
                 self.btn_add_data,
                 self.btn_show_data,
+                self.btn_import,
+                self.btn_free_rooms,
+                self.btn_daily_stats,
                 self.btn_views,
                 self.btn_cte_builder,
+                self.btn_index_advisor,
         ):
             btn.setMaximumWidth(260)
 
@@ -2,7 +2,7 @@ from PySide6.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QLabel, QPushButton, QListWidget, QListWidgetItem,
     QTableWidget, QTableWidgetItem, QTabWidget, QMessageBox, QHeaderView,
-    QAbstractItemView,
+    QSpinBox,
 )
 from PySide6.QtCore import Qt
 from PySide6.QtGui import QColor
@@ -15,15 +15,42 @@ from app.log.log import app_logger
 from app.ui.cte_builder_window import CteBuilderWindow
 
 from app.ui.cte_storage import GLOBAL_SAVED_CTES
+from app.ui.result_model import ResultTableModel, make_result_view
+from app.ui.export_dialog import export_result
+from app.ui.query_runner import QueryRunner
 
 from app.ui.theme import *
 
 
+def _age_text(seconds) -> str:
+    seconds = int(seconds)
+    if seconds < 60:
+        return f"{seconds} с"
+    if seconds < 3600:
+        return f"{seconds // 60} мин"
+    if seconds < 86400:
+        return f"{seconds // 3600} ч"
+    return f"{seconds // 86400} дн"
+
+
+def _refresh_status_text(st: dict | None) -> str:
+    """Свежесть представления по записи RefreshScheduler.status()."""
+    if not st or st.get("last_refresh_at") is None:
+        text = "не обновлялось из приложения"
+    else:
+        text = f"обновлено {_age_text(st['age_sec'])} назад за {st['last_duration_ms']:.0f} мс"
+        if st.get("changes"):
+            text += f", с тех пор изменений: {st['changes']}"
+    if st and st.get("last_error"):
+        text += " · последняя попытка с ошибкой"
+    return text
+
+
 class ViewsWindow(QMainWindow):
     """
     Менеджер представлений PostgreSQL (VIEW / MATERIALIZED VIEW / CTE).
 
-    - слева: список VIEW, MATERIALIZED VIEW и сохранённых CTE;
+    - слева: список VIEW, MATERIALIZED VIEW (и инкрементальных) и сохранённых CTE;
     - справа: вкладки «Структура», «SQL / запрос», «Данные»;
     - кнопки: Показать данные, REFRESH MAT VIEW, Удалить VIEW/MAT VIEW,
       Обновить список, Создать через конструктор CTE.
@@ -37,6 +64,8 @@ class ViewsWindow(QMainWindow):
         self.saved_ctes = GLOBAL_SAVED_CTES
 
         self.current_obj: dict | None = None  # {'schema','name','kind',...}
+        self._details_obj: dict | None = None  # для какого объекта показаны структура и SQL
+        self.refresh_status: dict[str, dict] = {}  # имя -> RefreshScheduler.status()
 
         self.setWindowTitle("Представления и CTE")
         self.resize(1000, 650)
@@ -141,22 +170,10 @@ class ViewsWindow(QMainWindow):
         data_layout.setContentsMargins(4, 4, 4, 4)
         data_layout.setSpacing(6)
 
-        self.table_data = QTableWidget()
-
+        # данные читаются пачками по мере прокрутки;
         # нормальные размеры колонок + горизонтальный скролл
-        header_data = self.table_data.horizontalHeader()
-        header_data.setStretchLastSection(False)
-        header_data.setSectionResizeMode(QHeaderView.Interactive)
-
-        self.table_data.setHorizontalScrollMode(QAbstractItemView.ScrollPerPixel)
-        self.table_data.setHorizontalScrollBarPolicy(Qt.ScrollBarAsNeeded)
-
-        data_layout.addWidget(self.table_data, 1)
-
-        header = self.table_data.horizontalHeader()
-        header.setStretchLastSection(False)
-        header.setSectionResizeMode(QHeaderView.Interactive)
-
+        self.data_model = ResultTableModel(self)
+        self.table_data = make_result_view(self.data_model)
 
         data_layout.addWidget(self.table_data, 1)
 
@@ -172,18 +189,51 @@ class ViewsWindow(QMainWindow):
 
         self.btn_refresh_mat = QPushButton("REFRESH MATERIALIZED VIEW")
         self.btn_drop = QPushButton("Удалить VIEW / MAT VIEW")
+        self.btn_export = QPushButton("Экспорт данных…")
 
         bottom.addWidget(self.btn_refresh_mat)
+        bottom.addWidget(self.btn_export)
         bottom.addStretch()
         bottom.addWidget(self.btn_drop)
 
         right_layout.addLayout(bottom)
+
+        # свежесть и автообновление (RefreshScheduler)
+        self.lbl_refresh_status = QLabel("")
+        self.lbl_refresh_status.setStyleSheet("color: #d1d5db;")
+        self.lbl_refresh_status.setWordWrap(True)
+        right_layout.addWidget(self.lbl_refresh_status)
+
+        policy = QHBoxLayout()
+        policy.addWidget(QLabel("Автообновление: каждые"))
+        self.sb_interval = QSpinBox()
+        self.sb_interval.setRange(0, 10080)
+        self.sb_interval.setSuffix(" мин")
+        self.sb_interval.setSpecialValueText("—")
+        policy.addWidget(self.sb_interval)
+        policy.addWidget(QLabel("или после"))
+        self.sb_changes = QSpinBox()
+        self.sb_changes.setRange(0, 10_000_000)
+        self.sb_changes.setSingleStep(100)
+        self.sb_changes.setSuffix(" изменений")
+        self.sb_changes.setSpecialValueText("—")
+        policy.addWidget(self.sb_changes)
+        self.btn_save_policy = QPushButton("Сохранить")
+        policy.addWidget(self.btn_save_policy)
+        policy.addStretch()
+        right_layout.addLayout(policy)
+
+        # запросы и REFRESH идут в фоне: крутилка и кнопка отмены
+        self.runner = QueryRunner(self.db, self)
+        right_layout.addWidget(self.runner.panel)
         body_layout.addWidget(right, 1)
 
         # сигналы
         self.tabs.currentChanged.connect(self._on_tab_changed)
         self.btn_refresh_mat.clicked.connect(self._refresh_current_mat_view)
         self.btn_drop.clicked.connect(self._drop_current)
+        self.btn_export.clicked.connect(self._export_current)
+        self.btn_save_policy.clicked.connect(self._save_policy)
 
         self._update_buttons_state()
         self._clear_details()
@@ -201,27 +251,32 @@ class ViewsWindow(QMainWindow):
 
         rows = []
         try:
-            with self.db.cursor() as cur:
-                cur.execute(
-                    """
-                    SELECT table_schema AS schema, table_name AS name, 'VIEW' AS kind
-                    FROM information_schema.views
-                    WHERE table_schema = 'public'
-                    UNION ALL
-                    SELECT schemaname AS schema, matviewname AS name, 'MATERIALIZED VIEW' AS kind
-                    FROM pg_matviews
-                    WHERE schemaname = 'public'
-                    ORDER BY 1, 2;
-                    """
-                )
-                rows = cur.fetchall()
+            rows = [
+                {"schema": "public", "name": n, "kind": "VIEW"}
+                for n in self.db.catalog.views()
+            ] + [
+                {"schema": "public", "name": n, "kind": "MATERIALIZED VIEW"}
+                for n in self.db.catalog.mat_views()
+            ]
+            rows += [
+                {"schema": "public", "name": n, "kind": "INCREMENTAL"}
+                for n in self.db.incremental.names()
+            ]
         except Exception as e:
             app_logger.error(f"Ошибка загрузки списка представлений: {e}")
             QMessageBox.critical(self, "Ошибка", f"Не удалось загрузить список представлений:\n{e}")
 
+        try:
+            self.refresh_status = {st["name"]: st for st in self.db.mv_scheduler.status()}
+        except Exception as e:
+            app_logger.error(f"Ошибка чтения политик обновления: {e}")
+            self.refresh_status = {}
+
         # VIEW / MAT VIEW
         for row in rows:
             text = f"{row['schema']}.{row['name']} ({row['kind']})"
+            if row["kind"] != "VIEW":
+                text += f" — {_refresh_status_text(self.refresh_status.get(row['name']))}"
             item = QListWidgetItem(text)
             item.setData(Qt.UserRole, {
                 "schema": row["schema"],
@@ -230,6 +285,8 @@ class ViewsWindow(QMainWindow):
             })
             if row["kind"] == "VIEW":
                 item.setForeground(QColor("#93c5fd"))   # голубой
+            elif row["kind"] == "INCREMENTAL":
+                item.setForeground(QColor("#fcd34d"))   # янтарный
             else:
                 item.setForeground(QColor("#6ee7b7"))   # мятный
             self.list_views.addItem(item)
@@ -261,113 +318,195 @@ class ViewsWindow(QMainWindow):
 
         item = items[0]
         self.current_obj = item.data(Qt.UserRole)
-        self._load_details_for_current()
         self._update_buttons_state()
 
         # если уже открыта вкладка "Данные" — сразу обновим превью
+        # (структуру и SQL догрузит переход на их вкладку)
         if self.tabs.currentIndex() == 2:
+            self._details_obj = None
+            self.lbl_current.setText(self._current_title())
+            self.lbl_sql.setText("Определение объекта будет показано здесь.")
+            self.table_columns.setRowCount(0)
+            self._show_refresh_status()
             self._load_data_for_current()
+        else:
+            self._load_details_for_current()
 
     def _clear_details(self):
+        self._details_obj = None
         self.lbl_current.setText("Ничего не выбрано")
         self.lbl_sql.setText("Определение объекта будет показано здесь.")
         self.table_columns.setRowCount(0)
-        self.table_data.setRowCount(0)
-        self.table_data.setColumnCount(0)
+        self.data_model.clear()
+        self.lbl_refresh_status.setText("")
+
+    def _show_refresh_status(self):
+        kind = self.current_obj.get("kind") if self.current_obj else None
+        if kind not in ("MATERIALIZED VIEW", "INCREMENTAL"):
+            self.lbl_refresh_status.setText("")
+            self.sb_interval.setValue(0)
+            self.sb_changes.setValue(0)
+            return
+
+        st = self.refresh_status.get(self.current_obj["name"])
+        text = f"Свежесть: {_refresh_status_text(st)}"
+        if st and st.get("last_error"):
+            text += f"\nОшибка: {st['last_error']}"
+        self.lbl_refresh_status.setText(text)
+        st = st or {}
+        self.sb_interval.setValue((st.get("interval_sec") or 0) // 60)
+        self.sb_changes.setValue(st.get("after_changes") or 0)
+
+    def _reload_refresh_status(self):
+        """Перечитать свежесть после обновления, не сбрасывая выбор в списке."""
+        try:
+            self.refresh_status = {st["name"]: st for st in self.db.mv_scheduler.status()}
+        except Exception as e:
+            app_logger.error(f"Ошибка чтения политик обновления: {e}")
+            return
+        for i in range(self.list_views.count()):
+            item = self.list_views.item(i)
+            obj = item.data(Qt.UserRole)
+            if obj["kind"] in ("MATERIALIZED VIEW", "INCREMENTAL"):
+                item.setText(
+                    f"{obj['schema']}.{obj['name']} ({obj['kind']}) — "
+                    f"{_refresh_status_text(self.refresh_status.get(obj['name']))}"
+                )
+        self._show_refresh_status()
+
+    def _save_policy(self):
+        if not self.current_obj:
+            return
+        name = self.current_obj["name"]
+        interval = self.sb_interval.value() * 60
+        changes = self.sb_changes.value()
+
+        def done(_):
+            self._reload_refresh_status()
+
+        def failed(e):
+            app_logger.error(f"Ошибка сохранения политики обновления {name}: {e}")
+            QMessageBox.critical(self, "Ошибка", f"Не удалось сохранить политику обновления:\n{e}")
+
+        self.runner.run(
+            lambda: self.db.mv_scheduler.set_policy(name, interval, changes), done, failed,
+            text="Сохранение политики…",
+        )
 
     def _update_buttons_state(self):
         has_obj = self.current_obj is not None
         self.btn_open_data.setEnabled(has_obj)
+        self.btn_export.setEnabled(has_obj)
         self.btn_drop.setEnabled(
-            has_obj and self.current_obj.get("kind") in ("VIEW", "MATERIALIZED VIEW")
+            has_obj and self.current_obj.get("kind") in ("VIEW", "MATERIALIZED VIEW", "INCREMENTAL")
         )
-        is_mat = has_obj and self.current_obj.get("kind") == "MATERIALIZED VIEW"
+        is_mat = has_obj and self.current_obj.get("kind") in ("MATERIALIZED VIEW", "INCREMENTAL")
         self.btn_refresh_mat.setEnabled(is_mat)
+        for w in (self.sb_interval, self.sb_changes, self.btn_save_policy):
+            w.setEnabled(is_mat)
 
     def _on_tab_changed(self, index: int):
         """Автоподгрузка данных при переходе на вкладку «Данные»."""
         # 0 — Структура, 1 — SQL, 2 — Данные
-        if index == 2 and self.current_obj is not None:
+        if self.current_obj is None:
+            return
+        if index == 2:
             self._load_data_for_current()
+        elif self._details_obj is not self.current_obj:
+            self._load_details_for_current()
 
     # ------------------------------------------------------------------
     # Детали объекта
     # ------------------------------------------------------------------
 
     def _load_details_for_current(self):
+        """Структура и SQL выбранного объекта — через тот же QueryRunner, что и данные."""
         if not self.current_obj:
             return
 
-        kind = self.current_obj["kind"]
-        schema = self.current_obj.get("schema")
-        name = self.current_obj["name"]
+        obj = self.current_obj
+        kind = obj["kind"]
+        schema = obj.get("schema")
+        name = obj["name"]
 
+        self.lbl_current.setText(self._current_title())
+        self.table_columns.setRowCount(0)
         if kind == "CTE":
-            self.lbl_current.setText(f"{name} — CTE (подзапрос)")
-            inner_sql = self.current_obj.get("inner_sql", "")
+            inner_sql = obj.get("inner_sql", "")
             self.lbl_sql.setText(inner_sql or "Inner SELECT для CTE отсутствует.")
-            self._load_columns_for_cte(name, inner_sql)
-        else:
-            self.lbl_current.setText(f"{schema}.{name} — {kind}")
-            self._load_columns_for_view(schema, name)
-            self._load_definition_for_view(kind, schema, name)
 
-    def _load_columns_for_view(self, schema: str, name: str):
-        """Структура для VIEW и MATERIALIZED VIEW.
+            def job():
+                return self._fetch_cte_columns(name, inner_sql), None
+        else:
+            self.lbl_sql.setText("Загрузка определения…")
 
-        Сначала пробуем information_schema.columns, если пусто —
-        падаем обратно на pg_catalog (работает и для мат. представлений).
-        """
-        cols = []
-        try:
-            with self.db.cursor() as cur:
-                # обычный путь — information_schema
-                cur.execute(
-                    """
-                    SELECT ordinal_position, column_name, data_type
-                    FROM information_schema.columns
-                    WHERE table_schema = %s AND table_name = %s
-                    ORDER BY ordinal_position;
-                    """,
-                    (schema, name),
+            def job():
+                return (
+                    self._fetch_view_columns(schema, name),
+                    self._fetch_definition(kind, schema, name),
                 )
-                cols = cur.fetchall()
 
-                # если вдруг пусто (часть мат. представлений), берём из pg_catalog
-                if not cols:
-                    cur.execute(
-                        """
-                        SELECT
-                            a.attnum AS ordinal_position,
-                            a.attname AS column_name,
-                            pg_catalog.format_type(a.atttypid, a.atttypmod) AS data_type
-                        FROM pg_catalog.pg_attribute a
-                        JOIN pg_catalog.pg_class c ON a.attrelid = c.oid
-                        JOIN pg_catalog.pg_namespace n ON c.relnamespace = n.oid
-                        WHERE n.nspname = %s
-                          AND c.relname = %s
-                          AND a.attnum > 0
-                          AND NOT a.attisdropped
-                        ORDER BY a.attnum;
-                        """,
-                        (schema, name),
-                    )
-                    cols = cur.fetchall()
+        def done(res):
+            if obj is not self.current_obj:
+                return
+            columns, definition = res
+            self._details_obj = obj
+            self._show_columns(columns)
+            if definition is not None:
+                self.lbl_sql.setText(definition)
+
+        def failed(e):
+            app_logger.error(f"Ошибка загрузки описания {name}: {e}")
+            if obj is self.current_obj and kind != "CTE":
+                self.lbl_sql.setText("Не удалось получить SQL-определение для выбранного объекта.")
+
+        self.runner.run(job, done, failed, text=f"Структура {name}…")
+        self._show_refresh_status()
+
+    def _current_title(self) -> str:
+        obj = self.current_obj
+        if obj["kind"] == "CTE":
+            return f"{obj['name']} — CTE (подзапрос)"
+        return f"{obj.get('schema')}.{obj['name']} — {obj['kind']}"
+
+    def _show_columns(self, columns: list[tuple[str, str, str]]):
+        self.table_columns.setRowCount(0)
+        self.table_columns.setRowCount(len(columns))
+        for i, col in enumerate(columns):
+            for j, text in enumerate(col):
+                self.table_columns.setItem(i, j, QTableWidgetItem(text))
+
+    # выполняются в рабочем потоке QueryRunner — виджеты здесь не трогаем
+    def _fetch_view_columns(self, schema: str, name: str) -> list[tuple[str, str, str]]:
+        """Структура для VIEW и MATERIALIZED VIEW (из кэша схемы)."""
+        try:
+            cols = self.db.catalog.columns(name)
         except Exception as e:
             app_logger.error(f"Ошибка получения структуры {schema}.{name}: {e}")
-            cols = []
-
-        self.table_columns.setRowCount(0)
-        self.table_columns.setRowCount(len(cols))
-        for i, col in enumerate(cols):
-            self.table_columns.setItem(i, 0, QTableWidgetItem(str(col["ordinal_position"])))
-            self.table_columns.setItem(i, 1, QTableWidgetItem(col["column_name"]))
-            self.table_columns.setItem(i, 2, QTableWidgetItem(col["data_type"]))
+            return []
+        return [
+            (str(col["ordinal_position"]), col["column_name"], col["data_type"])
+            for col in cols
+        ]
 
-    def _load_definition_for_view(self, kind: str, schema: str, name: str):
+    def _fetch_definition(self, kind: str, schema: str, name: str) -> str:
         definition = None
         try:
-            with self.db.cursor() as cur:
+            if kind == "INCREMENTAL":
+                info = self.db.incremental.get(name)
+                if info:
+                    refreshed = info["refreshed_at"]
+                    lines = [
+                        self.db.incremental.build_query(info["spec"]),
+                        "",
+                        f"-- базовые таблицы: {', '.join(info['base_tables'])}",
+                        f"-- обновлено: {refreshed:%d.%m.%Y %H:%M:%S}" if refreshed else "-- ещё не обновлялось",
+                        f"-- изменений в журнале: {info['pending']}",
+                    ]
+                    definition = "\n".join(lines)
+                return definition or "Не удалось получить определение представления."
+
+            with self.db.read_cursor() as cur:
                 if kind == "VIEW":
                     cur.execute(
                         """
@@ -395,46 +534,32 @@ class ViewsWindow(QMainWindow):
         except Exception as e:
             app_logger.error(f"Ошибка получения SQL-определения для {schema}.{name}: {e}")
 
-        if definition:
-            self.lbl_sql.setText(definition)
-        else:
-            self.lbl_sql.setText("Не удалось получить SQL-определение для выбранного объекта.")
+        return definition or "Не удалось получить SQL-определение для выбранного объекта."
 
-    def _load_columns_for_cte(self, cte_name: str, inner_sql: str):
+    def _fetch_cte_columns(self, cte_name: str, inner_sql: str) -> list[tuple[str, str, str]]:
         """Структура CTE: выполняем WITH ... SELECT * FROM cte LIMIT 0 и читаем cursor.description."""
         if not inner_sql:
-            self.table_columns.setRowCount(0)
-            return
+            return []
 
         sql = f"WITH {cte_name} AS ({inner_sql}) SELECT * FROM {cte_name} LIMIT 0;"
         try:
-            with self.db.cursor() as cur:
+            with self.db.read_cursor() as cur:
                 cur.execute(sql)
                 desc = cur.description
         except Exception as e:
             app_logger.error(f"Ошибка получения структуры CTE {cte_name}: {e}")
-            self.table_columns.setRowCount(0)
-            return
-
-        if not desc:
-            self.table_columns.setRowCount(0)
-            return
+            return []
 
-        self.table_columns.setRowCount(len(desc))
-        for i, col in enumerate(desc):
-            name = col.name if hasattr(col, "name") else col[0]
-            self.table_columns.setItem(i, 0, QTableWidgetItem(str(i + 1)))
-            self.table_columns.setItem(i, 1, QTableWidgetItem(name))
-            self.table_columns.setItem(i, 2, QTableWidgetItem("-"))
+        return [
+            (str(i + 1), col.name if hasattr(col, "name") else col[0], "-")
+            for i, col in enumerate(desc or [])
+        ]
 
     # ------------------------------------------------------------------
     # Данные
     # ------------------------------------------------------------------
 
-    def _load_data_for_current(self):
-        if not self.current_obj:
-            return
-
+    def _current_data_sql(self) -> str | None:
         kind = self.current_obj["kind"]
         schema = self.current_obj.get("schema")
         name = self.current_obj["name"]
@@ -443,65 +568,127 @@ class ViewsWindow(QMainWindow):
             inner_sql = self.current_obj.get("inner_sql", "")
             if not inner_sql:
                 QMessageBox.warning(self, "CTE", "У этого CTE нет inner SELECT.")
-                return
-            sql = f"WITH {name} AS ({inner_sql}) SELECT * FROM {name} LIMIT 200;"
-        else:
-            sql = f'SELECT * FROM "{schema}"."{name}" LIMIT 200;'
+                return None
+            return f"WITH {name} AS ({inner_sql}) SELECT * FROM {name};"
+        return f'SELECT * FROM "{schema}"."{name}";'
 
-        app_logger.info(f"ViewsWindow data SQL: {sql}")
+    def _export_current(self):
+        if not self.current_obj:
+            return
+        sql = self._current_data_sql()
+        if sql:
+            export_result(self, self.db, sql, default_name=self.current_obj["name"])
 
-        try:
-            with self.db.cursor() as cur:
-                cur.execute(sql)
-                rows = cur.fetchall()
-        except Exception as e:
-            app_logger.error(f"Ошибка выборки данных: {e}")
-            QMessageBox.critical(self, "Ошибка", f"Не удалось получить данные:\n{e}")
+    def _load_data_for_current(self):
+        if not self.current_obj:
             return
 
-        if not rows:
-            self.table_data.setRowCount(0)
-            self.table_data.setColumnCount(0)
+        sql = self._current_data_sql()
+        if not sql:
             return
 
-        cols = list(rows[0].keys())
-        self.table_data.setColumnCount(len(cols))
-        self.table_data.setHorizontalHeaderLabels(cols)
-        self.table_data.setRowCount(len(rows))
+        app_logger.info(f"ViewsWindow data SQL: {sql}")
+
+        # повторное открытие того же представления — из кэша результатов
+        self.data_model.start_cached_async(
+            self.runner, self.db, sql,
+            on_done=self._on_data_loaded,
+            on_error=self._on_data_error,
+        )
+
+    def _on_data_loaded(self, rows_count: int):
+        if not rows_count:
+            self.data_model.clear()
 
-        for r_idx, row in enumerate(rows):
-            for c_idx, col in enumerate(cols):
-                val = row[col]
-                text = "" if val is None else str(val)
-                self.table_data.setItem(r_idx, c_idx, QTableWidgetItem(text))
+    def _on_data_error(self, e: Exception):
+        app_logger.error(f"Ошибка выборки данных: {e}")
+        QMessageBox.critical(self, "Ошибка", f"Не удалось получить данные:\n{e}")
 
     # ------------------------------------------------------------------
     # REFRESH / DROP
     # ------------------------------------------------------------------
 
     def _refresh_current_mat_view(self):
-        if not self.current_obj or self.current_obj.get("kind") != "MATERIALIZED VIEW":
+        if not self.current_obj or self.current_obj.get("kind") not in ("MATERIALIZED VIEW", "INCREMENTAL"):
             return
 
         schema = self.current_obj["schema"]
         name = self.current_obj["name"]
+        # открытый поток держит блокировку на представлении
+        self.data_model.close()
+
+        if self.current_obj["kind"] == "INCREMENTAL":
+            def done_incremental(res):
+                QMessageBox.information(
+                    self, "REFRESH",
+                    f"{schema}.{name}: изменений в журнале — {res['changes']}, "
+                    f"пересчитано групп — {res['groups']} за {res['duration_ms']:.0f} мс.",
+                )
+                self._reload_refresh_status()
+                self._load_details_for_current()
 
-        sql = f'REFRESH MATERIALIZED VIEW "{schema}"."{name}";'
-        try:
-            with self.db.cursor() as cur:
-                cur.execute(sql)
-            QMessageBox.information(self, "REFRESH", f"Материализованное представление {schema}.{name} обновлено.")
-            app_logger.info(f"REFRESH MATERIALIZED VIEW {schema}.{name}")
-        except Exception as e:
-            app_logger.error(f"Ошибка REFRESH MATERIALIZED VIEW {schema}.{name}: {e}")
-            QMessageBox.critical(self, "Ошибка", f"Не удалось обновить материализованное представление:\n{e}")
+            self.runner.run(
+                lambda: self.db.mv_scheduler.refresh(name), done_incremental, self._on_refresh_error,
+                text=f"REFRESH {name}…",
+            )
+            return
+
+        # CONCURRENTLY не блокирует читателей; для него нужен уникальный индекс
+        def plan():
+            if self.db.mat_view_unique_index(name):
+                return {"index": True, "key": None}
+            return {"index": False, "key": self.db.mat_view_key_candidate(name)}
+
+        self.runner.run(plan, lambda p: self._refresh_with_plan(schema, name, p),
+                        self._on_refresh_error, text=f"Проверка индексов {name}…")
+
+    def _refresh_with_plan(self, schema: str, name: str, plan: dict):
+        create_key = None
+
+        if not plan["index"] and plan["key"]:
+            reply = QMessageBox.question(
+                self,
+                "REFRESH",
+                "Обычный REFRESH блокирует чтение представления на всё время пересчёта.\n"
+                "REFRESH CONCURRENTLY не блокирует, но ему нужен уникальный индекс.\n\n"
+                f"Создать уникальный индекс по ({', '.join(plan['key'])}) "
+                "и обновить CONCURRENTLY?\n«Нет» — обычный REFRESH.",
+                QMessageBox.Yes | QMessageBox.No | QMessageBox.Cancel,
+            )
+            if reply == QMessageBox.Cancel:
+                return
+            if reply == QMessageBox.Yes:
+                create_key = plan["key"]
+
+        def job():
+            if create_key:
+                self.db.create_mat_view_unique_index(name, create_key)
+            # планировщик сам выберет CONCURRENTLY по индексу и запишет длительность
+            return self.db.mv_scheduler.refresh(name)
+
+        def done(res):
+            how = " (CONCURRENTLY)" if res.get("concurrently") else ""
+            QMessageBox.information(
+                self, "REFRESH",
+                f"Материализованное представление {schema}.{name} обновлено{how} за {res['duration_ms']:.0f} мс.",
+            )
+            app_logger.info(f"REFRESH MATERIALIZED VIEW{how} {schema}.{name}")
+            self._reload_refresh_status()
+
+        self.runner.run(job, done, self._on_refresh_error, text=f"REFRESH {name}…")
+
+    def _on_refresh_error(self, e: Exception):
+        name = self.current_obj["name"] if self.current_obj else ""
+        self._reload_refresh_status()
+        app_logger.error(f"Ошибка REFRESH MATERIALIZED VIEW {name}: {e}")
+        QMessageBox.critical(self, "Ошибка", f"Не удалось обновить материализованное представление:\n{e}")
 
     def _drop_current(self):
         if not self.current_obj:
             return
 
         kind = self.current_obj["kind"]
-        if kind not in ("VIEW", "MATERIALIZED VIEW"):
+        if kind not in ("VIEW", "MATERIALIZED VIEW", "INCREMENTAL"):
             QMessageBox.information(self, "Удаление", "Удалять можно только VIEW и MATERIALIZED VIEW.")
             return
 
@@ -518,19 +705,30 @@ class ViewsWindow(QMainWindow):
 
         if kind == "VIEW":
             sql = f'DROP VIEW IF EXISTS "{schema}"."{name}" CASCADE;'
-        else:
+        elif kind == "MATERIALIZED VIEW":
             sql = f'DROP MATERIALIZED VIEW IF EXISTS "{schema}"."{name}" CASCADE;'
+        else:
+            sql = None
 
-        try:
-            with self.db.cursor() as cur:
-                cur.execute(sql)
+        self.data_model.close()
+
+        def done(_):
             QMessageBox.information(self, "Удалено", f"{kind} {schema}.{name} удалено.")
             app_logger.info(f"Dropped {kind} {schema}.{name}")
             self._load_views_list()
-        except Exception as e:
+
+        def failed(e):
             app_logger.error(f"Ошибка удаления {kind} {schema}.{name}: {e}")
             QMessageBox.critical(self, "Ошибка", f"Не удалось удалить объект:\n{e}")
 
+        def job():
+            if sql is None:
+                self.db.incremental.drop(name)  # таблица и запись в реестре
+            else:
+                self.db.execute_ddl(sql)
+
+        self.runner.run(job, done, failed, text=f"Удаление {name}…")
+
     # ------------------------------------------------------------------
     # Конструктор CTE
     # ------------------------------------------------------------------
@@ -548,3 +746,8 @@ class ViewsWindow(QMainWindow):
         """Колбэк из CteBuilderWindow: сохраняем CTE в памяти и обновляем список."""
         self.saved_ctes[name] = inner_sql
         self._load_views_list()
+
+    def closeEvent(self, event):
+        self.runner.cancel()
+        self.data_model.close()
+        super().closeEvent(event)